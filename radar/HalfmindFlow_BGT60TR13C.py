@@ -6,6 +6,8 @@
 # % Email: info@radarmimo.com, mohammad.alaee@uni.lu
 # % Original code: https://github.com/radarmimo/Download-Center/tree/main/Short%20Courses/IEEE%20SPS%202024%20-%20Radar%20Signal%20Processing%20Mastery/Codes/Lecture%204
 # % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import asyncio
+import os
 import pprint
 import queue
 import sys
@@ -25,13 +27,35 @@ from ifxradarsdk.fmcw import DeviceFmcw
 from ifxradarsdk.fmcw.types import create_dict_from_sequence, FmcwSimpleSequenceConfig, FmcwSequenceChirp
 from pyqtgraph.Qt import QtCore
 from scipy.ndimage import uniform_filter1d
-from scipy.signal import lfilter, firwin, find_peaks
+from scipy.signal import lfilter
 from pythonosc.udp_client import SimpleUDPClient
+from pythonosc.osc_message_builder import OscMessageBuilder
 import paho.mqtt.client as mqtt
 import csv
 from datetime import datetime
 
+from multi_target import MultiTargetTracker
+from presence import PresenceStateMachine, ca_cfar
+from rolling_stats import MultiHorizonStats, RollingStats
+from checkpoint import load_checkpoint, save_checkpoint
+from breath_scaler import StreamingBreathScaler
+import spectral
+from estimators import create_breathing_estimator
+from async_runtime import AsyncRadarRuntime
+from mqtt_publisher import MqttPublisher, TopicPolicy
+from decimation import CoherentDecimator
+from event_log import EventLog
+from profiler import SamplingProfiler, install_signal_trigger, start_control_listener
+from breath_filter import LowLatencyBreathFilter, BreathPhasePredictor
+from acquisition_supervisor import AcquisitionSupervisor
+from stage_graph import StageGraph
+from history_store import TieredHistory
+from dsp_plan import DspConfig, PlanFile, make_dsp_plan, start_plan_listener
+
 DEBUG_MODE = True
+# Runtime: 'threads' (reader thread + polling processor thread + QTimer plots)
+# or 'asyncio' (event-driven frame reads, processing, OSC sends and periodic jobs, see async_runtime.py)
+RUNTIME = 'threads'
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # UDP Configuration
@@ -42,19 +66,63 @@ UDP_IP_ESP32 = "192.168.1.110" # Darcy's house
 UDP_PORT_ESP32 = 8888 # Replace with your UDP server port
 UDP_IP_MAX = "127.0.0.1"
 UDP_PORT_MAX = 8000
+osc_targets = [(UDP_IP_ESP32, UDP_PORT_ESP32), (UDP_IP_MAX, UDP_PORT_MAX)]
+osc_clients = None  # SimpleUDPClient per target, created once on first send
+osc_datagram_sender = None  # set by the asyncio runtime: callable(datagram, (ip, port))
+# On-demand profiler: `kill -USR1 <pid>`, or send OSC /profile [seconds] (or the text "profile [seconds]")
+# to 127.0.0.1:PROFILER_CONTROL_PORT. Writes profile_*.folded / profile_*_alloc.txt next to the breathlog.
+ENABLE_PROFILER_CONTROL = True
+PROFILER_CONTROL_PORT = 9010
+profile_duration = 10  # seconds
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 ENABLE_RANGE_PROFILE_PLOT = True
 ENABLE_PHASE_UNWRAP_PLOT = True
 ENABLE_VITALSIGNS_SPECTRUM = False
 ENABLE_ESTIMATION_PLOT = True
+# Session plot: breathing rate mean and min / max envelope over the last session_plot_seconds,
+# read from the tiered history (the other plots only span buffer_data_size samples)
+ENABLE_SESSION_PLOT = False
+session_plot_seconds = 2 * 3600
+session_plot_points = 1000  # buckets at most; the history picks the finest tier that fits
+# Demand-driven processing: stage -> stages it depends on. Outputs (the OSC / CSV / MQTT streams
+# and every plot curve) declare the stages they need; a stage only runs while an active output
+# needs it, so e.g. the heart path is skipped while no heart curve is visible.
+processing_stages = {
+    'slow_time': [],
+    'phase': ['slow_time'],
+    'breathing_filter': ['phase'],
+    'breathing_rate': ['breathing_filter'],
+    'breathing_spectrum': ['breathing_filter'],  # only computed separately for time-domain estimators
+    'breath_amplitude': ['breathing_filter'],
+    'heart_filter': ['phase'],
+    'heart_fft': ['heart_filter'],
+    'heart_rate': ['heart_fft'],
+    'raw_iq_fft': ['slow_time'],
+    'phase_fft': ['phase'],
+    'presence': [],
+}
+stage_graph = StageGraph(processing_stages)
+stage_graph.add_sink('outputs', ['breathing_rate', 'breath_amplitude', 'presence'])
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Device settings
 num_rx_antennas = 3
-frame_rate = 20  # Hz (equivalent to vital signs sampling rate when number of chirps is 1)
-number_of_chirps = 1
+vital_signs_sample_rate = 20  # Hz, rate of the breathing / heart processing chain
+# High frame-rate acquisition: frame at decimation_factor x vital_signs_sample_rate with several chirps
+# per frame; chirps are summed in the range FFT and CoherentDecimator averages decimation_factor frames,
+# so only the range FFT runs at the acquisition rate (better SNR / motion robustness, same DSP cost)
+HIGH_RATE_ACQUISITION = False
+if HIGH_RATE_ACQUISITION:
+    decimation_factor = 5  # 100 Hz frames
+    number_of_chirps = 4
+else:
+    decimation_factor = 1
+    number_of_chirps = 1
+frame_rate = vital_signs_sample_rate * decimation_factor  # Hz
+chirp_repetition_time = 0.001  # second
 samples_per_chirp = 64
-vital_signs_sample_rate = int(1 * frame_rate)
+if number_of_chirps * chirp_repetition_time >= 1 / frame_rate:
+    raise ValueError("number_of_chirps * chirp_repetition_time must be shorter than the frame time")
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Define constants
 file_path = ''
@@ -73,13 +141,33 @@ fft_size_range_profile = samples_per_chirp * 2
 object_distance_start_range = 0.5
 object_distance_stop_range = 1.2
 epsilon_value = 0.00000001
+# DSP precision: 'float64' or 'float32' (complex64 range FFT / slow-time, float32 filter outputs and
+# spectra, half the memory traffic). Phase histories and unwrapping always stay in float64;
+# see bench_precision.py for the accuracy cost against float64.
+DSP_PRECISION = 'float64'
+real_dtype = np.float32 if DSP_PRECISION == 'float32' else np.float64
+complex_dtype = np.complex64 if DSP_PRECISION == 'float32' else np.complex128
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # peak detection
 peak_finding_distance = 0.01
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# multi-target tracking (several people in the range profile, e.g. shared desks)
+ENABLE_MULTI_TARGET = False
+max_tracked_targets = 3
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 buffer_data_size = int(buffer_time * vital_signs_sample_rate)
 processing_data_size = int(processing_window_time * vital_signs_sample_rate)
-fft_size_vital_signs = processing_data_size * 4
+# Sub-bin peak interpolation ('gaussian', 'quadratic' or None) gives fractional-bin rates,
+# so the vital-signs FFT no longer needs 4x zero padding for usable b.p.m. resolution.
+# 2x padding + interpolation beats 4x without it (see bench_peak_interpolation.py);
+# 1x leaves too few bins in the breathing band for the peak search.
+peak_interpolation_method = 'gaussian'
+fft_padding_factor = 2 if peak_interpolation_method else 4
+fft_size_vital_signs = processing_data_size * fft_padding_factor
+# Breathing rate estimator: 'fft' (spectral peak) or 'zero_crossing' (time domain, breath-by-breath).
+# With 'zero_crossing' no breathing FFT runs unless the vital-signs spectrum plot shows it (stage_graph).
+BREATHING_RATE_ESTIMATOR = 'fft'
+breath_interval_window = 30  # breaths, for breath-to-breath interval variability
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 estimation_rate = vital_signs_sample_rate  # Hz
 estimation_index_breathing = buffer_data_size - estimation_time * estimation_rate
@@ -92,17 +180,37 @@ high_breathing = 0.6
 # Calculate normalized cutoff frequencies for heat rate
 low_heart = 0.85
 high_heart = 2.4
-nyquist_freq = 0.5 * vital_signs_sample_rate
 filter_order = vital_signs_sample_rate + 1
-breathing_b = firwin(filter_order, [low_breathing / nyquist_freq, high_breathing / nyquist_freq], pass_zero=False)
-heart_b = firwin(filter_order, [low_heart / nyquist_freq, high_heart / nyquist_freq], pass_zero=False)
-index_start_breathing = int(low_breathing / vital_signs_sample_rate * fft_size_vital_signs)
-index_end_breathing = int(high_breathing / vital_signs_sample_rate * fft_size_vital_signs)
-index_start_heart = int(low_heart / vital_signs_sample_rate * fft_size_vital_signs)
-index_end_heart = int(high_heart / vital_signs_sample_rate * fft_size_vital_signs)
+# The bands and object_distance_* range gate above are the initial DSP plan (dsp_plan.py): filter taps,
+# band indices and range bins, built once per configuration and read-only. The GUI regions, the plan
+# file and control messages swap in a whole new plan, which the processor adopts between frames.
+dsp_plan = None  # set by init_dsp_plan once max_range is known
+dsp_plan_lock = threading.Lock()
+DSP_PLAN_FILE = 'dsp_plan.json'  # optional, checked for changes every dsp_plan_file_check_interval
+dsp_plan_file_check_interval = 2.0  # second
+dsp_plan_file = PlanFile(DSP_PLAN_FILE)
+ENABLE_DSP_CONTROL = True
+DSP_CONTROL_PORT = 9011  # UDP on localhost: OSC /dsp/breathing low high, or text 'breathing low high'
+# Breathing filter: 'fir' (linear-phase plan.breathing_b over the processing window, (filter_order - 1) / 2
+# samples of delay) or 'low_latency' (IIR band-pass with persisted state on the new samples only,
+# no /amplitude detrend; see breath_filter.py). Low latency is meant for the LED sync stream.
+BREATHING_FILTER_MODE = 'fir'
+low_latency_filter_order = 2  # Butterworth prototype order (2 * order poles)
+# Short-horizon phase prediction of /amplitude by the measured pipeline delay ('low_latency' only)
+ENABLE_BREATH_PREDICTION = True
+led_output_latency = 0.05  # second, OSC transport + ESP32 LED update, added to the prediction horizon
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-data_queue = queue.Queue()
+# Bounded: if processing stalls, the oldest frames are dropped instead of growing memory for hours
+data_queue_size = 10 * frame_rate  # frames
+data_queue = queue.Queue(maxsize=data_queue_size)
+dropped_frames = 0
+# Processing clock; soak_harness.py swaps in a simulated clock to run hours of frames at accelerated speed
+clock = time.time
+# Catch-up: with this many frames queued, process_data drains the queue and processes the backlog
+# as one batch (one range-FFT call, one unwrap / filter / estimation pass) instead of frame by frame
+catch_up_threshold = 3
+max_catch_up_frames = processing_data_size // 2 * decimation_factor  # acquisition frames
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Initial time
@@ -124,17 +232,55 @@ baseline_breathing_rate = None  # Calculated baseline breathing rate
 max_breathing_rate = 20  # Maximum breathing rate (140% of baseline)
 baseline_calculated = False  # Flag to ensure baseline is calculated only once
 mean_breathing_rate = None  # Mean breathing rate
-bpm_buffer_size = frame_rate * 160
+bpm_buffer_size = vital_signs_sample_rate * 160
+brv_evaluation_interval = 1.0  # second
+# BRV focus rule: breathing-rate variability (std of the b.p.m. estimates over the 4 min horizon) above
+# this counts as erratic breathing and starts the intervention like a rate above max_breathing_rate.
+# Only applied once the 4 min horizon is full; None disables the rule.
+max_breathing_rate_variability = 3.0  # b.p.m.
+# With a time-domain estimator the rule also uses breath-to-breath intervals: std of the last
+# breath_interval_window intervals above this (seconds) counts as erratic. None disables it.
+max_breath_interval_variability = 1.0  # second
+ENABLE_BREATHING_BASELINE = False  # Derive max_breathing_rate from the first bpm_buffer_size estimates
+# Streaming breathing-rate statistics horizons (samples, None = whole session)
+breathing_stats_horizons = {
+    '30s': 30 * vital_signs_sample_rate,
+    'baseline': bpm_buffer_size,
+    '4min': 240 * vital_signs_sample_rate,
+    'session': None,
+}
+# Tiered breathing-rate history: (bucket seconds, buckets) per tier, finest first; each bucket keeps
+# count / sum / sum of squares / min / max. Serves BRV windows and the session plot, ~1.2 MB in total.
+history_tiers = (
+    (1 / vital_signs_sample_rate, 300 * vital_signs_sample_rate),  # 5 min at full rate
+    (1, 3600),  # 1 h
+    (10, 4320),  # 12 h
+    (60, 7 * 1440),  # 1 week
+)
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Warm start: pipeline state is saved periodically / on shutdown and restored on launch
+ENABLE_WARM_START = True
+checkpoint_path = 'pipeline_state.npz'
+checkpoint_interval = 60  # second
+checkpoint_max_age = 30 * 60  # second, older checkpoints are ignored
+# Global buffers saved in the checkpoint (restored in place)
+checkpoint_buffers = [
+    'radar_time_stamp', 'slow_time_buffer_data', 'I_Q_envelop', 'wrapped_phase_plot', 'unwrapped_phase_plot',
+    'filtered_breathing_plot', 'filtered_heart_plot', 'range_profile_peak_indices',
+    'breathing_rate_estimation_index', 'heart_rate_estimation_index',
+    'breathing_rate_estimation_value', 'heart_rate_estimation_value', 'scaled_breath_amplitude',
+]
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # data queue
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-def read_data(device):
+def read_data(supervisor):
+    """Reader thread; device failures are recovered by the AcquisitionSupervisor."""
     global frame_counter, radar_processor
     try:
         while radar_processor is None or not radar_processor.should_exit:
-            frame_contents = device.get_next_frame()
+            frame_contents = supervisor.read_frames()
             for frame in frame_contents:
-                data_queue.put(frame)
+                enqueue_frame(frame)
     except Exception as e:
         print(f"[Sensor Teminated] {e}")
         try:
@@ -144,210 +290,329 @@ def read_data(device):
         print("Program terminated")
         sys.exit(1)  # Terminate the program
 
+
+def enqueue_frame(frame, frames_queue=None):
+    """Put a frame on the (bounded) data queue, dropping the oldest one when it is full."""
+    global dropped_frames
+    frames_queue = data_queue if frames_queue is None else frames_queue
+    while True:
+        try:
+            frames_queue.put_nowait(frame)
+            return
+        except queue.Full:
+            try:
+                frames_queue.get_nowait()
+                dropped_frames += 1
+            except queue.Empty:
+                pass
+
+
+# Device reconnect: a failed frame read closes the device and reopens it with exponential backoff
+reconnect_initial_backoff = 0.5  # second
+reconnect_max_backoff = 30.0  # second
+
+
+def configure_device(device):
+    """Apply the acquisition sequence (at start-up and after every reconnect); returns the config."""
+    if num_rx_antennas == 3:
+        rx_mask = 7  # rx_mask = 7 means all three receive antennas are activated
+    elif num_rx_antennas == 2:
+        rx_mask = 3  # rx_mask = 7 means all three receive antennas are activated
+    else:
+        rx_mask = 1  # rx_mask = 7 means all three receive antennas are activated
+
+    config = FmcwSimpleSequenceConfig(
+        frame_repetition_time_s=1 / frame_rate,
+        chirp_repetition_time_s=chirp_repetition_time,
+        num_chirps=number_of_chirps,
+        tdm_mimo=True,
+        chirp=FmcwSequenceChirp(
+            start_frequency_Hz=58_000_000_000,
+            end_frequency_Hz=63_500_000_000,
+            sample_rate_Hz=1e6,
+            num_samples=samples_per_chirp,
+            rx_mask=rx_mask,
+            tx_mask=1,
+            tx_power_level=31,
+            lp_cutoff_Hz=500000,
+            hp_cutoff_Hz=80000,
+            if_gain_dB=33,
+        )
+    )
+    # num_rx_antennas = device.get_sensor_information()["num_rx_antennas"]
+    sequence = device.create_simple_sequence(config)
+    device.set_acquisition_sequence(sequence)
+
+    pp = pprint.PrettyPrinter()
+    pp.pprint(create_dict_from_sequence(sequence))
+    return config
+
+
+def on_device_disconnect(error):
+    try:
+        send_osc_messages(status=0)
+    except Exception as e:
+        print(f"[OSC ERROR] {e}")
+
+
+def on_device_reconnect(gap_start, gap_end):
+    if radar_processor is not None:
+        radar_processor.mark_acquisition_gap(gap_start, gap_end)
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # MQTT Configuration
 MQTT_BROKER = "homeassistant.local"  # Replace with your MQTT broker address
 MQTT_PORT = 1883  # Default MQTT port
 MQTT_TOPIC = "home/nanoleaf/cmd"  # Replace with your desired topic
-
-def configure_mqtt():
+MQTT_BREATHING_RATE_TOPIC = "home/halfmind/breathing_rate"
+MQTT_PRESENCE_TOPIC = "home/halfmind/presence"
+MQTT_USERNAME = "zhengyang"  # Replace with your MQTT username and password
+MQTT_PASSWORD = "raspberry"
+ENABLE_MQTT = False
+# Per-topic rate limit (seconds between publishes) and deadband; values in between are coalesced
+mqtt_policies = {
+    MQTT_TOPIC: TopicPolicy(min_interval=0.5, deadband=5),  # scaled breath amplitude, 0-100
+    MQTT_BREATHING_RATE_TOPIC: TopicPolicy(min_interval=5.0, deadband=1),
+    MQTT_PRESENCE_TOPIC: TopicPolicy(min_interval=1.0, deadband=0),
+}
+mqtt_publisher = None
+
+def configure_mqtt(client=None, flush_thread=True):
     """
-    Configure and connect to the MQTT broker with authentication.
+    Create the MQTT publisher and connect to the broker in the background (automatic reconnect).
+    client: optional paho-compatible client, e.g. one pointed at a local broker for testing.
+    flush_thread: False for the asyncio runtime, which runs the publisher's flush as a loop job.
     """
-    client = mqtt.Client()
-    client.username_pw_set("zhengyang", "raspberry")  # Replace with your MQTT username and password
-    client.connect(MQTT_BROKER, MQTT_PORT, 60)
-    return client
-
-def send_to_home_assistant(client, value):
+    if client is None:
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2)
+        client.username_pw_set(MQTT_USERNAME, MQTT_PASSWORD)
+    publisher = MqttPublisher(client, mqtt_policies)
+    publisher.start(MQTT_BROKER, MQTT_PORT, 60, flush_thread=flush_thread)
+    return publisher
+
+def send_to_home_assistant(publisher, value, topic=MQTT_TOPIC):
     """
-    Send the filtered breathing data to Home Assistant via MQTT.
+    Send a value to Home Assistant via MQTT. Non-blocking; the publisher drops unchanged values
+    and rate-limits each topic (mqtt_policies).
 
     Parameters:
-    client: MQTT client instance.
-    filtered_breathing_plot: The filtered breathing data to send.
+    publisher: MqttPublisher from configure_mqtt(), or None when MQTT is disabled.
+    value: The value to send (sent as an integer).
     """
-    # Convert the latest filtered breathing value to a string
-    client.publish(MQTT_TOPIC, int(value))
+    if publisher is not None:
+        publisher.publish(topic, int(value))
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # processing class
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 class RadarDataProcessor:
     def __init__(self):
-        self.buffer_size = 100
-        self.breath_stream = [] # Buffer to store the last 300 breath values
-        self.presence_max_buffer = []
+        # DSP plan in use; process_frames switches to a newly swapped-in one before a pass
+        self.dsp_plan = dsp_plan
+        self.last_plan_file_check = clock()
+        self.buffer_size = 100  # /amplitude normalisation window (samples)
+        # moving-average detrend length (samples); the low-latency band-pass already removes the trend
+        self.breath_detrend_size = 25 if BREATHING_FILTER_MODE == 'fir' else 0
+        self.breath_scaler = StreamingBreathScaler(self.buffer_size, self.breath_detrend_size)
         self.ema_alpha = 2 / (20 + 1)  # 1秒平滑，20帧/秒
         self.presence_ema = None
         self.last_presence = 0
         self.working_time = 0.0
         self._last_exist_time = None
         self.time_last_status_change = 0.0
-        # Add buffer for presence status (3 seconds)
-        self.presence_status_buffer = []
+        # CA-CFAR presence detection: thresholds are ratios over the local noise estimate, applied to the
+        # EMA of the ratio. Noise only (synthetic absence) the EMA stays below ~3.3 (median 2.3) and a
+        # person gives ~10, so entering needs 4.0 and staying only 3.0
+        self.cfar_guard_cells = 2
+        self.cfar_training_cells = 8
+        self.cfar_enter_threshold = 4.0
+        self.cfar_leave_threshold = 3.0
+        # Presence hysteresis (seconds), counters only so the hold windows cost nothing
+        self.presence_enter_seconds = 1.0
         self.presence_buffer_seconds = 5
+        self.presence_state = PresenceStateMachine(vital_signs_sample_rate, self.presence_enter_seconds,
+                                                   self.presence_buffer_seconds)
         # Add reset timer for phase unwrap
-        self.last_reset_time = time.time()
+        self.last_reset_time = clock()
         self.reset_interval = 500  # 3 minutes in seconds
+        # 'reanchor': shift the unwrapped phase in place, outputs never drop out
+        # 'reset': legacy full buffer reset (reset_phase_data)
+        self.reset_mode = 'reanchor'
+        # Frames that were processed in catch-up batches rather than one at a time
+        self.caught_up_frames = 0
+        # Coherent integration + decimation from frame_rate down to vital_signs_sample_rate
+        self.decimator = CoherentDecimator(decimation_factor)
+        # Low-latency breathing filter and /amplitude phase prediction
+        self.breath_filter = None
+        if BREATHING_FILTER_MODE == 'low_latency':
+            self.breath_filter = LowLatencyBreathFilter(self.dsp_plan.config.low_breathing,
+                                                        self.dsp_plan.config.high_breathing,
+                                                        vital_signs_sample_rate, low_latency_filter_order)
+        self.breath_predictor = BreathPhasePredictor(vital_signs_sample_rate)
+        self.breathing_rate_hz = None  # latest breathing estimate, for the predictor
+        self.pipeline_delay = 0.0  # second, last prediction horizon
         # Add exit flag for graceful shutdown
         self.should_exit = False
         # Add brv signal for anxiety intervention
         self.need_brv_intervention = False
         # Add timer for brv intervention
         self.brv_intervention_start_time = None
+        # Streaming breathing-rate statistics (BRV and baseline), O(1) per estimate
+        self.breath_stats = MultiHorizonStats(breathing_stats_horizons)
+        self.rate_history = TieredHistory(history_tiers)
+        self.breathing_rate_variability = 0.0
+        self.breath_interval_variability = 0.0  # seconds, time-domain estimators only
+        self.last_brv_evaluation_time = 0.0
+        self.breathing_rate_bpm = None  # latest breathing rate estimate (b.p.m.)
         self.last_csv_log_time = 0
         self.csv_writer = None
         self.csv_file = None
         self.csv_filename = None
+        self.csv_day = None
+        # Focus sessions and interventions, events_YYYYMMDD.csv next to the breathlogs
+        self.event_log = EventLog(clock=clock)
+        # Flush every CSV row (threaded runtime); the asyncio runtime flushes from a periodic job instead
+        self.csv_flush_each_row = True
         self.init_csv_logger()
-
-    def init_csv_logger(self):
-        now = datetime.now()
+        # Warm start: phase rotation applied to new slow-time samples so they continue the restored history
+        self.last_checkpoint_time = clock()
+        self.phase_rotation = 1.0 + 0j
+        self.align_phase_on_next_frame = False
+        # Device reconnects: (gap_start, gap_end) set by the reader thread, applied before the next frame
+        self.pending_acquisition_gap = None
+        self.time_base_gap = 0.0  # second, added to the time stamps of the first frames after a gap
+        # Stages that ran in the previous pass, see stage_graph
+        self.previous_stages = frozenset()
+        # Breathing rate estimator (selected by BREATHING_RATE_ESTIMATOR) and breath-to-breath intervals
+        self.breathing_estimator = create_breathing_estimator(BREATHING_RATE_ESTIMATOR, vital_signs_sample_rate,
+                                                              processing_data_size, fft_size_vital_signs,
+                                                              self.dsp_plan.config.low_breathing,
+                                                              self.dsp_plan.config.high_breathing, peak_finding_distance,
+                                                              peak_interpolation_method)
+        self.breath_interval_stats = RollingStats(breath_interval_window, value_min=0.0, value_max=15.0)
+        # Spectral peak confidence (0-1) of the latest breathing / heart rate estimate
+        self.breathing_rate_confidence = 0.0
+        self.heart_rate_confidence = 0.0
+        # Multi-target tracker, slots are processed together as one 2-D computation
+        self.multi_target = None
+        if ENABLE_MULTI_TARGET:
+            self.multi_target = MultiTargetTracker(max_tracked_targets, processing_data_size,
+                                                   fft_size_vital_signs, estimation_time * estimation_rate,
+                                                   interpolation=peak_interpolation_method,
+                                                   dtype=complex_dtype)
+
+    def init_csv_logger(self, timestamp=None):
+        now = datetime.fromtimestamp(clock() if timestamp is None else timestamp)
         self.csv_filename = f"breathlog_{now.strftime('%Y%m%d_%H%M%S')}.csv"
         self.csv_file = open(self.csv_filename, 'w', newline='')
         self.csv_writer = csv.writer(self.csv_file)
-        self.csv_writer.writerow(['timestamp', 'readable_time', 'breathing_rate', 'filtered_breath'])
+        self.csv_writer.writerow(['timestamp', 'readable_time', 'breathing_rate', 'filtered_breath', 'presence'])
+        self.csv_day = now.date()
 
-    def log_to_csv(self, timestamp, readable_time, breathing_rate, filtered_breath):
+    def log_to_csv(self, timestamp, readable_time, breathing_rate, filtered_breath, presence):
         # Drop lines with error data (e.g., None, nan, inf, or negative/zero breathing rate)
         if (breathing_rate is None or filtered_breath is None or
             not isinstance(breathing_rate, (int, float)) or not isinstance(filtered_breath, (int, float)) or
             not (np.isfinite(breathing_rate) and np.isfinite(filtered_breath)) or
-            breathing_rate <= 0):
+            breathing_rate <= 0 or self.csv_file.closed):
             return
-        self.csv_writer.writerow([timestamp, readable_time, breathing_rate, filtered_breath])
-        self.csv_file.flush()
-
-    def calc_range_fft(self, data_queue):
-        if not data_queue.empty():
-            frame = data_queue.get()
-            _, num_chirps_per_frame, num_samples_per_chirp = np.shape(frame)
-            range_fft_antennas_buffer = np.zeros(int(fft_size_range_profile / 2), dtype=np.complex128)
-            for iAnt in range(num_rx_antennas):
-                # for iChirps in range(num_chirps_per_frame):
-                mat = frame[iAnt, :, :]
-                avgs = np.average(mat, 1).reshape(num_chirps_per_frame, 1)
-                mat = mat - avgs
-                mat = np.multiply(mat,
-                                  signal.windows.blackmanharris(num_samples_per_chirp).reshape(1,
-                                                                                               num_samples_per_chirp))
-                zp1 = np.pad(mat, ((0, 0), (0, fft_size_range_profile - num_samples_per_chirp)), 'constant')
-                range_fft = np.fft.fft(zp1, fft_size_range_profile) / num_samples_per_chirp
-                range_fft = 2 * range_fft[:, :int(fft_size_range_profile / 2)]
-                temp_range_fft = np.sum(range_fft, axis=0)
-                range_fft_antennas_buffer = temp_range_fft + range_fft_antennas_buffer
-            return range_fft_antennas_buffer / num_rx_antennas
+        # A new breathlog per day, so no single file grows for the whole deployment
+        if datetime.fromtimestamp(timestamp).date() != self.csv_day:
+            self.csv_file.close()
+            self.init_csv_logger(timestamp)
+        self.csv_writer.writerow([timestamp, readable_time, breathing_rate, filtered_breath, presence])
+        if self.csv_flush_each_row:
+            self.csv_file.flush()
+
+    def flush_csv(self):
+        if self.csv_file and not self.csv_file.closed:
+            self.csv_file.flush()
+
+    def calc_range_fft(self, frame):
+        if frame is not None:
+            return self.calc_range_fft_batch(np.asarray(frame)[np.newaxis])[0]
         return None, None
 
+    def calc_range_fft_batch(self, frames):
+        """
+        Range profiles of a stack of frames (frame x antenna x chirp x sample) in one FFT call.
+        Returns (frames x fft_size_range_profile / 2), antenna- and chirp-summed, antenna-averaged.
+        """
+        return spectral.range_fft(frames, fft_size_range_profile, num_rx_antennas, real_dtype)
+
     def find_signal_peaks(self, fft_windowed_signal, index_start, index_end, distance):
-        signal_region = fft_windowed_signal[index_start: index_end]
-        peaks, _ = find_peaks(signal_region,
-                              distance=int(max(1, distance * fft_size_vital_signs / vital_signs_sample_rate)))
-        # Filter peaks within the boundaries
-        # filtered_peaks = peaks[(peaks > 0) & (peaks < len(signal_region) - 1)]
-        rate_index = 0
-        filtered_peaks = peaks
-        if len(filtered_peaks) > 0:
-            best_peak_index = np.argmax(signal_region[filtered_peaks])
-            rate_index = filtered_peaks[best_peak_index] + index_start
-        return rate_index
+        """
+        Strongest peak between index_start and index_end, refined to a fractional bin with
+        peak_interpolation_method. Returns (rate_index, confidence), rate_index 0 if no peak.
+        """
+        distance_bins = distance * fft_size_vital_signs / vital_signs_sample_rate
+        return spectral.estimate_spectral_peak(fft_windowed_signal, index_start, index_end, distance_bins,
+                                               peak_interpolation_method)
 
     def vital_signs_fft(self, data, nFFT, data_length):
-        windowed_signal = np.multiply(data, signal.windows.blackmanharris(data_length))
-        zp2 = np.zeros(nFFT, dtype=np.complex128)
-        zp2[:data_length] = windowed_signal
-        fft_result = 1.0 / nFFT * np.abs(np.fft.fft(zp2)) + epsilon_value
-        return fft_result
+        return spectral.vital_signs_fft(data, nFFT, data_length, epsilon_value, real_dtype)
 
     def update_scaled_breath(self, new_value):
-        self.breath_stream.append(new_value)
-        if len(self.breath_stream) > self.buffer_size:
-            self.breath_stream.pop(0)
-        
-        if len(self.breath_stream) < self.buffer_size:
-            return None  # Wait until buffer fills
-
-        return self.scale_breath()
-
-    def scale_breath(self):
-        buf = np.array(self.breath_stream)
-
-        # Step 1: Detrend (high-pass effect)
-        detrended = buf - np.convolve(buf, np.ones(25)/25, mode='same')  # moving average subtraction
-
-        # Step 2: Normalize to 0–100 (scale current value only!)
-        breath_signal = detrended[-1]
-        recent = detrended[-100:]  # recent segment to track range
-        min_breath = np.min(recent)
-        max_breath = np.max(recent)
-        if max_breath - min_breath < 1e-5:
-            return 0  # avoid divide by zero, return 0
-
-        scaled = (breath_signal - min_breath) / (max_breath - min_breath) * 100
-        # If scaled is not a valid number, return 0
-        if not np.isfinite(scaled) or scaled is None:
-            return 0
-        return np.clip(scaled, 0, 100)
-
-    # def calculate_mean_breath(self, breath_per_minute):
-    #     """
-    #     Calculate the mean breath rate of the breath_per_minute.
-    #     If the breath_per_minute is None, return None.
-    #     If the breath_per_minute is not None, add to buffer
-    #     When the buffer is full, calculate the mean breath rate of the buffer.
-    #     If the buffer is not full, return None.
-    #     """
-    #     global mean_breathing_rate, bpm_buffer, baseline_calculated, baseline_breathing_rate, max_breathing_rate
-    #     if breath_per_minute is None:
-    #         return None
-    #     if len(bpm_buffer) > bpm_buffer_size:
-    #         bpm_buffer.pop(0)
-    #         bpm_buffer.append(breath_per_minute)
-    #         mean_breathing_rate = np.mean(bpm_buffer)
-    #         if not baseline_calculated:
-    #             baseline_breathing_rate = mean_breathing_rate
-    #             baseline_calculated = True
-    #             max_breathing_rate = baseline_breathing_rate * 1.4
-    #             print(f"Baseline breathing rate: {baseline_breathing_rate}, max breathing rate: {max_breathing_rate}")
-    #     else:
-    #         bpm_buffer.append(breath_per_minute)
-        
-    #     return mean_breathing_rate
+        """
+        Detrend (moving average subtraction) and normalize the newest breath value to 0–100
+        against the min / max of the last buffer_size detrended values.
+        Returns None until the buffer fills. Constant work per sample, see StreamingBreathScaler.
+        """
+        return self.breath_scaler.update(new_value)
 
-    def detect_presence_by_range_profile(self, range_fft_abs, max_range, threshold=0.002):
+    def calculate_mean_breath(self, breath_per_minute, samples=1):
+        """
+        Add breath_per_minute to the streaming breathing statistics, once per frame it stands for
+        (samples > 1 after a catch-up batch), so the horizons stay sized in frames.
+        When the baseline horizon (bpm_buffer_size samples) is full, return its mean breath rate,
+        otherwise return None. With ENABLE_BREATHING_BASELINE the first full baseline sets
+        baseline_breathing_rate and max_breathing_rate (140% of baseline).
         """
-        基于距离范围内的 range_fft_abs 最大值判断人体存在。
+        global mean_breathing_rate, baseline_calculated, baseline_breathing_rate, max_breathing_rate
+        if breath_per_minute is None:
+            return None
+        for _ in range(samples):
+            self.breath_stats.push(breath_per_minute)
+        baseline = self.breath_stats['baseline']
+        if not baseline.full:
+            return None
+        mean_breathing_rate = baseline.mean()
+        if ENABLE_BREATHING_BASELINE and not baseline_calculated:
+            baseline_breathing_rate = mean_breathing_rate
+            baseline_calculated = True
+            max_breathing_rate = baseline_breathing_rate * 1.4
+            print(f"Baseline breathing rate: {baseline_breathing_rate}, max breathing rate: {max_breathing_rate}")
+        return mean_breathing_rate
+
+    def detect_presence_by_range_profile(self, range_fft_abs_frames, threshold=None):
+        """
+        基于距离范围内的 range_fft_abs 相对 CA-CFAR 噪声估计的最大比值判断人体存在。
+        range_fft_abs_frames: 每帧一行 (catch-up 批处理时多帧)，EMA 与滞回计数器逐帧推进。
         返回 1 表示有人，0 表示无人。
-        对 presence_max 做缓存和EMA平滑。
+        对 CFAR 比值做EMA平滑，再经过门限滞回 (无人时用 enter 门限，有人时用 leave 门限) 和计数器滞回 (enter / leave 时间)。
+        threshold: 固定的 CFAR 比值门限，默认 None 即使用 self.cfar_enter_threshold / self.cfar_leave_threshold。
         """
-        start_bin = int(object_distance_start_range / max_range * (fft_size_range_profile / 2))
-        stop_bin = int(object_distance_stop_range / max_range * (fft_size_range_profile / 2))
-        presence_max = np.max(range_fft_abs[start_bin:stop_bin])
-        
-        # 缓存最新的presence_max
-        self.presence_max_buffer.append(presence_max)
-        if len(self.presence_max_buffer) > 60:  # 只保留最近2秒的数据
-            self.presence_max_buffer.pop(0)
-        # 用缓存做EMA
-        if self.presence_ema is None:
-            self.presence_ema = presence_max    
-        else:
-            self.presence_ema = self.ema_alpha * presence_max + (1 - self.ema_alpha) * self.presence_ema
-        
-        existence = 1 if self.presence_ema > threshold else 0
-        # print(f"presence_max: {presence_max:.6f}, presence_ema: {self.presence_ema:.6f}, buffer: {self.presence_max_buffer[-1]:.6f}")
-        
-        # presence_buffer_seconds buffer to avoid false positive
-        frame_rate = 20  # Hz, adjust if needed
-        buffer_len = int(self.presence_buffer_seconds * frame_rate)
-        self.presence_status_buffer.append(existence)
-        if len(self.presence_status_buffer) > buffer_len:
-            self.presence_status_buffer.pop(0)
-        # Only allow switch to 'not present' if buffer contains no 1
-        if existence == 0 and 1 in self.presence_status_buffer:
-            existence = 1
+        start_bin, stop_bin = self.dsp_plan.start_index_range, self.dsp_plan.stop_index_range
+        for range_fft_abs in np.atleast_2d(range_fft_abs_frames):
+            noise = ca_cfar(range_fft_abs, self.cfar_guard_cells, self.cfar_training_cells)
+            presence_ratio = np.max(range_fft_abs[start_bin:stop_bin] / (noise[start_bin:stop_bin] + epsilon_value))
+
+            # 对CFAR比值做EMA
+            if self.presence_ema is None:
+                self.presence_ema = presence_ratio
+            else:
+                self.presence_ema = self.ema_alpha * presence_ratio + (1 - self.ema_alpha) * self.presence_ema
+
+            # Hysteresis: switch to 'present' after presence_enter_seconds above the enter threshold and
+            # to 'not present' after presence_buffer_seconds below the leave threshold
+            if threshold is not None:
+                frame_threshold = threshold
+            elif self.presence_state.state:
+                frame_threshold = self.cfar_leave_threshold
+            else:
+                frame_threshold = self.cfar_enter_threshold
+            existence = self.presence_state.update(self.presence_ema > frame_threshold)
         
         # send OSC message if presence status changes
         if existence != self.last_presence:
@@ -365,209 +630,440 @@ class RadarDataProcessor:
         return existence
 
     def process_data(self):
+        """
+        Threaded runtime: poll data_queue and process one frame at a time. When the backlog reaches
+        catch_up_threshold frames, all queued frames are processed together as one batch.
+        """
+        while not self.should_exit:
+            time.sleep(0.001)
+
+            current_time = clock()
+            self.run_periodic_jobs(current_time)
+
+            if not data_queue.empty():
+                self.process_frames(self.drain_frames(data_queue), current_time)
+
+        # Final checkpoint once the loop has stopped, so no frame is half-applied
+        if ENABLE_WARM_START:
+            self.save_state()
+
+    def run_periodic_jobs(self, current_time):
+        """Phase reset / re-anchor, BRV evaluation and checkpoints (threaded runtime)."""
+        # Check if it's time to reset phase data (every 3 minutes)
+        if current_time - self.last_reset_time >= self.reset_interval:
+            self.reset_phase()
+        if current_time - self.last_brv_evaluation_time >= brv_evaluation_interval:
+            self.evaluate_brv()
+        if ENABLE_WARM_START and current_time - self.last_checkpoint_time >= checkpoint_interval:
+            self.save_state()
+        if current_time - self.last_plan_file_check >= dsp_plan_file_check_interval:
+            self.last_plan_file_check = current_time
+            poll_dsp_plan_file()
+
+    def reset_phase(self):
+        if self.reset_mode == 'reanchor':
+            self.reanchor_phase_data()
+        else:
+            self.reset_phase_data()
+
+    def evaluate_brv(self):
+        """Update breathing_rate_variability from the streaming statistics (4 min window)."""
+        self.breathing_rate_variability = self.calculate_breathing_rate_variability(240)
+        self.breath_interval_variability = self.calculate_breath_interval_variability()
+        self.last_brv_evaluation_time = clock()
+
+    def breathing_is_erratic(self):
+        """BRV focus rule, see max_breathing_rate_variability and max_breath_interval_variability."""
+        if (max_breathing_rate_variability is not None and self.breath_stats['4min'].full and
+                self.breathing_rate_variability > max_breathing_rate_variability):
+            return True
+        return (max_breath_interval_variability is not None and self.breath_interval_stats.full and
+                self.breath_interval_variability > max_breath_interval_variability)
+
+    def drain_frames(self, frames_queue):
+        """
+        Next frame from frames_queue, or, with a backlog of catch_up_threshold or more frames,
+        up to max_catch_up_frames queued frames at once (oldest first).
+        """
+        frames = [frames_queue.get()]
+        if frames_queue.qsize() + 1 >= catch_up_threshold:
+            while len(frames) < max_catch_up_frames:
+                try:
+                    frames.append(frames_queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.caught_up_frames += len(frames) - 1
+        return frames
+
+    def process_frame(self, frame, current_time=None):
+        """Run the full processing chain for one radar frame."""
+        self.process_frames([frame], current_time)
+
+    def process_frames(self, frames, current_time=None):
+        """
+        Run the processing chain for one or more consecutive radar frames.
+        All frames are range-FFT'd as one batch, decimated to vital_signs_sample_rate and appended to
+        the slow-time history together; unwrap, filters and rate estimation then run once over the
+        new samples. Returns early while a decimation block is still incomplete.
+        """
         global slow_time_buffer_data, I_Q_envelop, range_fft_abs, wrapped_phase_plot, unwrapped_phase_plot, \
             filtered_breathing_plot, filtered_heart_plot, buffer_raw_I_Q_fft, phase_unwrap_fft, breathing_fft, \
             heart_fft, breathing_rate_estimation_index, heart_rate_estimation_index, \
             neulog_respiration_peak_index, neulog_pulse_peak_index, neulog_respiration_fft, neulog_pulse_fft, \
-            start_time, radar_time_stamp, range_profile_peak_index, range_profile_peak_indices
-        counter = 0
-        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-
-        while not self.should_exit:
-            time.sleep(0.001)
-            
-            # Check if it's time to reset phase data (every 3 minutes)
-            current_time = time.time()
-            if current_time - self.last_reset_time >= self.reset_interval:
-                self.reset_phase_data()
-            
-            if not data_queue.empty():
-                time_passed = current_time - start_time
-                start_time = current_time
-
-                radar_time_stamp = np.roll(radar_time_stamp, -1)
-                radar_time_stamp[-1] = radar_time_stamp[-2] + time_passed
-                # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-                range_fft_antennas_buffer = self.calc_range_fft(data_queue)
-                # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-                if range_fft_antennas_buffer is not None:
-                    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-                    # slow_time_index += 1
-                    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-                    range_fft_abs = np.abs(range_fft_antennas_buffer)
-                    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-                    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-                    slow_time_buffer_data = np.roll(slow_time_buffer_data, -1)
-                    I_Q_envelop = np.roll(I_Q_envelop, -1)
-
-                    start_index_range = int(object_distance_start_range / max_range * fft_size_range_profile / 2)
-                    stop_index_range = int(object_distance_stop_range / max_range * fft_size_range_profile / 2)
-
-                    range_profile_peak_indices = np.roll(range_profile_peak_indices, -1)
-                    range_profile_peak_indices[-1] = np.argmax(
-                        range_fft_abs[start_index_range: stop_index_range]) + start_index_range
-
-                    range_profile_peak_index = int(np.mean(range_profile_peak_indices[-2 * vital_signs_sample_rate:]))
-                    if max_index_processing:
-                        slow_time_buffer_data[-1] = range_fft_antennas_buffer[range_profile_peak_index]
-                    else:
-                        slow_time_buffer_data[-1] = np.mean(
-                            range_fft_antennas_buffer[start_index_range:stop_index_range])
-
-                    I_Q_envelop[-1] = np.abs(slow_time_buffer_data[-1])
-
-                    counter += 1
-                    # if counter > processing_update_interval * vital_signs_sample_rate:
-                    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-                    # phase unwrap
-                    wrapped_phase = np.angle(slow_time_buffer_data[-counter:])
-                    wrapped_phase_plot = np.roll(wrapped_phase_plot, -counter)
-                    wrapped_phase_plot[-counter:] = wrapped_phase[-counter:]
-
-                    unwrapped_phase_plot = np.roll(unwrapped_phase_plot, -counter)
-                    unwrapped_phase_plot[-counter:] = wrapped_phase_plot[-counter:]
-
-                    unwrapped_phase = np.unwrap(unwrapped_phase_plot[-processing_data_size:])
-                    unwrapped_phase_plot[-processing_data_size:] = unwrapped_phase
-                    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-                    # filter
-                    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-                    filtered_breathing = lfilter(breathing_b, 1, unwrapped_phase_plot[-processing_data_size:])
-                    # cycle1, trend = sm.tsa.filters.hpfilter(filtered_breathing)
-                    # filtered_breathing = uniform_filter1d(cycle1, size=2 * vital_signs_sample_rate)
-                    filtered_breathing_plot = np.roll(filtered_breathing_plot, -counter)
-                    filtered_breathing_plot[-counter:] = filtered_breathing[-counter:]
-                    recorded_time = current_time
-
-                    cycle2, trend = sm.tsa.filters.hpfilter(unwrapped_phase_plot[-processing_data_size:],
-                                                            3 * vital_signs_sample_rate)
-                    filtered_heart = lfilter(heart_b, 1, cycle2)
-                    filtered_heart_plot = np.roll(filtered_heart_plot, -counter)
-                    filtered_heart_plot[-counter:] = filtered_heart[-counter:]
-                    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-                    # Vital Signs FFT
-                    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-                    buffer_raw_I_Q_fft = self.vital_signs_fft(slow_time_buffer_data[-processing_data_size:],
-                                                              fft_size_vital_signs,
-                                                              processing_data_size)
-                    phase_unwrap_fft = self.vital_signs_fft(unwrapped_phase_plot[-processing_data_size:],
-                                                            fft_size_vital_signs,
-                                                            processing_data_size)
-                    breathing_fft = self.vital_signs_fft(filtered_breathing_plot[-processing_data_size:],
-                                                         fft_size_vital_signs,
-                                                         processing_data_size)
-                    heart_fft = self.vital_signs_fft(filtered_heart_plot[-processing_data_size:], fft_size_vital_signs,
-                                                     processing_data_size)
-
-                    # Breathing and heart rate estimation
-                    breathing_rate_estimation_index = np.roll(breathing_rate_estimation_index, -1)
-                    breathing_rate_estimation_index[-1] = breathing_rate_estimation_index[-2]
-                    rate_index_br = self.find_signal_peaks(breathing_fft, index_start_breathing,
-                                                           index_end_breathing, peak_finding_distance)
-                    
-                    if rate_index_br != 0:
-                        breathing_rate_estimation_index[-1] = rate_index_br
-                        xb = x_axis_vital_signs_spectrum[
-                            round(fft_size_vital_signs / 2 + np.mean(
-                                breathing_rate_estimation_index[estimation_index_breathing:]))] * 60
-                        breathing_rate_bpm = round(xb) - 2
-                        # --- Send breathing rate via OSC ---
-                        if breathing_rate_bpm > 0:
-                            try:
-                                if max_breathing_rate is None:
-                                    send_osc_messages(breathpm=breathing_rate_bpm)
-                                elif breathing_rate_bpm > max_breathing_rate:
-                                    send_osc_messages(breathpm=max_breathing_rate)
-                                    if self.need_brv_intervention == False:
-                                        self.need_brv_intervention = True
-                                        self.brv_intervention_start_time = time.time()
-                                        print(f"[{time.strftime('%H:%M:%S', time.localtime())}] intervention started")
-                                        send_osc_messages(brvsignal=1)
-                                elif breathing_rate_bpm > 12:
-                                    send_osc_messages(breathpm=breathing_rate_bpm-2)
-                                    # Only stop intervention if at least 3 seconds have passed
-                                    if self.need_brv_intervention == True:
-                                        if self.brv_intervention_start_time is not None and (time.time() - self.brv_intervention_start_time >= 3):
-                                            self.need_brv_intervention = False
-                                            self.brv_intervention_start_time = None
-                                            print(f"[{time.strftime('%H:%M:%S', time.localtime())}] intervention stopped")
-                                            send_osc_messages(brvsignal=0)
-                                else:
-                                    send_osc_messages(breathpm=breathing_rate_bpm)
-                                    # Only stop intervention if at least 3 seconds have passed
-                                    if self.need_brv_intervention == True:
-                                        if self.brv_intervention_start_time is not None and (time.time() - self.brv_intervention_start_time >= 3):
-                                            self.need_brv_intervention = False
-                                            self.brv_intervention_start_time = None
-                                            print(f"[{time.strftime('%H:%M:%S', time.localtime())}] intervention stopped")
-                                            send_osc_messages(brvsignal=0)
-                            except Exception as e:
-                                print(f"OSC send error: {e}")
-                    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-                    heart_rate_estimation_index = np.roll(heart_rate_estimation_index, -1)
-                    heart_rate_estimation_index[-1] = heart_rate_estimation_index[-2]
-                    rate_index_hr = self.find_signal_peaks(heart_fft, index_start_heart,
-                                                           index_end_heart, peak_finding_distance)
-                    if rate_index_hr != 0:
-                        heart_rate_estimation_index[-1] = rate_index_hr
-
-                    # Stream filtered_breathing_plot in real-time via OSC
-                    breath_amplitude = self.update_scaled_breath(filtered_breathing_plot[-1])
-                    send_osc_messages(amplitude=breath_amplitude)
-                    
-                    # Update scaled breath amplitude buffer for plotting
-                    global scaled_breath_amplitude
-                    if breath_amplitude is not None:
-                        scaled_breath_amplitude = np.roll(scaled_breath_amplitude, -1)
-                        scaled_breath_amplitude[-1] = breath_amplitude
-                    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-                    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-                    counter = 0
-
-                    # Detect presence
-                    presence_status = self.detect_presence_by_range_profile(range_fft_abs, max_range)
-
-                    # Track working time
-                    if not hasattr(self, 'working_time'):
-                        self.working_time = 0.0
-                        self._last_exist_time = None
-                    if presence_status == 1:
-                        if self._last_exist_time is None:
-                            self._last_exist_time = time.time()
+            start_time, radar_time_stamp, range_profile_peak_index, range_profile_peak_indices, \
+            tracked_target_bins, tracked_target_rates
+        if current_time is None:
+            current_time = clock()
+        if self.pending_acquisition_gap is not None:
+            self.resume_after_gap()
+        plan = dsp_plan  # one plan for the whole pass, whatever is swapped in meanwhile
+        if plan is not self.dsp_plan:
+            self.apply_dsp_plan(plan)
+        range_fft_frames = self.decimator.push(self.calc_range_fft_batch(frames))
+        counter = len(range_fft_frames)
+        if counter == 0:
+            return
+        active_stages = stage_graph.active  # one snapshot per pass; plots may toggle stages meanwhile
+        time_passed = current_time - start_time
+        start_time = current_time
+
+        # Backlogged frames are spread evenly over the time since the last processing pass
+        radar_time_stamp = np.roll(radar_time_stamp, -counter)
+        radar_time_stamp[-counter:] = radar_time_stamp[-counter - 1] + self.time_base_gap + \
+            time_passed * np.arange(1, counter + 1) / counter
+        self.time_base_gap = 0.0
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        range_fft_antennas_buffer = range_fft_frames[-1]
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # slow_time_index += 1
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        range_fft_abs_frames = np.abs(range_fft_frames)
+        range_fft_abs = range_fft_abs_frames[-1]
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        slow_time_buffer_data = np.roll(slow_time_buffer_data, -counter)
+        I_Q_envelop = np.roll(I_Q_envelop, -counter)
+
+        start_index_range, stop_index_range = plan.start_index_range, plan.stop_index_range
+
+        range_profile_peak_indices = np.roll(range_profile_peak_indices, -counter)
+        range_profile_peak_indices[-counter:] = np.argmax(
+            range_fft_abs_frames[:, start_index_range: stop_index_range], axis=1) + start_index_range
+
+        # Per frame: mean of the peak indices over the 2 s ending at that frame
+        smoothing_size = 2 * vital_signs_sample_rate
+        cumulative = np.cumsum(np.concatenate(([0.0], range_profile_peak_indices[-(smoothing_size + counter - 1):])))
+        frame_peak_indices = ((cumulative[smoothing_size:] - cumulative[:-smoothing_size]) /
+                              smoothing_size).astype(int)
+        range_profile_peak_index = int(frame_peak_indices[-1])
+        if max_index_processing:
+            slow_time_buffer_data[-counter:] = range_fft_frames[np.arange(counter), frame_peak_indices]
+        else:
+            slow_time_buffer_data[-counter:] = np.mean(
+                range_fft_frames[:, start_index_range:stop_index_range], axis=1)
+
+        if self.align_phase_on_next_frame:
+            self.phase_rotation = np.exp(1j * (np.angle(slow_time_buffer_data[-counter - 1]) -
+                                               np.angle(slow_time_buffer_data[-counter])))
+            self.align_phase_on_next_frame = False
+        slow_time_buffer_data[-counter:] *= self.phase_rotation
+
+        I_Q_envelop[-counter:] = np.abs(slow_time_buffer_data[-counter:])
+
+        if self.multi_target is not None:
+            self.update_multi_target(range_fft_frames, range_fft_abs_frames, plan)
+
+        # if counter > processing_update_interval * vital_signs_sample_rate:
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # phase unwrap
+        wrapped_phase = np.angle(slow_time_buffer_data[-counter:])
+        wrapped_phase_plot = np.roll(wrapped_phase_plot, -counter)
+        wrapped_phase_plot[-counter:] = wrapped_phase[-counter:]
+
+        unwrapped_phase_plot = np.roll(unwrapped_phase_plot, -counter)
+        unwrapped_phase_plot[-counter:] = wrapped_phase_plot[-counter:]
+
+        unwrapped_phase = np.unwrap(unwrapped_phase_plot[-processing_data_size:])
+        unwrapped_phase_plot[-processing_data_size:] = unwrapped_phase
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # filter
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        if self.breath_filter is not None:
+            filtered_breathing = self.breath_filter.push(unwrapped_phase_plot[-counter:])
+        else:
+            filtered_breathing = lfilter(plan.breathing_b, 1, unwrapped_phase_plot[-processing_data_size:])
+        # cycle1, trend = sm.tsa.filters.hpfilter(filtered_breathing)
+        # filtered_breathing = uniform_filter1d(cycle1, size=2 * vital_signs_sample_rate)
+        filtered_breathing_plot = np.roll(filtered_breathing_plot, -counter)
+        filtered_breathing_plot[-counter:] = filtered_breathing[-counter:]
+        recorded_time = current_time
+
+        filtered_heart_plot = np.roll(filtered_heart_plot, -counter)
+        if 'heart_filter' in active_stages:
+            cycle2, trend = sm.tsa.filters.hpfilter(unwrapped_phase_plot[-processing_data_size:],
+                                                    3 * vital_signs_sample_rate)
+            filtered_heart = lfilter(plan.heart_b, 1, cycle2)
+            # Right after the stage is switched on, fill the whole window rather than the new samples
+            fill = counter if 'heart_filter' in self.previous_stages else processing_data_size
+            filtered_heart_plot[-fill:] = filtered_heart[-fill:]
+        else:
+            filtered_heart_plot[-counter:] = 0
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # Vital Signs FFT
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        if 'raw_iq_fft' in active_stages:
+            buffer_raw_I_Q_fft = self.vital_signs_fft(slow_time_buffer_data[-processing_data_size:],
+                                                      fft_size_vital_signs,
+                                                      processing_data_size)
+        if 'phase_fft' in active_stages:
+            phase_unwrap_fft = self.vital_signs_fft(unwrapped_phase_plot[-processing_data_size:],
+                                                    fft_size_vital_signs,
+                                                    processing_data_size)
+        if 'heart_fft' in active_stages:
+            heart_fft = self.vital_signs_fft(filtered_heart_plot[-processing_data_size:], fft_size_vital_signs,
+                                             processing_data_size)
+
+        # Breathing and heart rate estimation: one history entry per frame, so the averaging window
+        # stays estimation_time seconds after a catch-up batch (the batch's estimate fills its frames)
+        breathing_rate_estimation_index = np.roll(breathing_rate_estimation_index, -counter)
+        breathing_rate_estimation_index[-counter:] = breathing_rate_estimation_index[-counter - 1]
+        rate_index_br = self.estimate_breathing_rate(counter)
+
+        if rate_index_br != 0:
+            breathing_rate_estimation_index[-counter:] = rate_index_br
+            xb = spectrum_index_to_hz(np.mean(breathing_rate_estimation_index[estimation_index_breathing:])) * 60
+            breathing_rate_bpm = round(xb) - 2
+            self.breathing_rate_bpm = breathing_rate_bpm
+            if breathing_rate_bpm > 0:
+                self.calculate_mean_breath(breathing_rate_bpm, counter)
+                self.rate_history.append(current_time, breathing_rate_bpm)
+                send_to_home_assistant(mqtt_publisher, breathing_rate_bpm, MQTT_BREATHING_RATE_TOPIC)
+            # --- Send breathing rate via OSC ---
+            if breathing_rate_bpm > 0:
+                try:
+                    if max_breathing_rate is None:
+                        send_osc_messages(breathpm=breathing_rate_bpm)
+                    elif breathing_rate_bpm > max_breathing_rate:
+                        send_osc_messages(breathpm=max_breathing_rate)
+                    elif breathing_rate_bpm > 12:
+                        send_osc_messages(breathpm=breathing_rate_bpm-2)
                     else:
-                        if self._last_exist_time is not None:
-                            self.working_time += time.time() - self._last_exist_time
-                            now_str = time.strftime('%H:%M:%S', time.localtime())
-                            print(f"[{now_str}] User focused for {self.working_time / 60:.2f} minutes")
-                            self.working_time = 0.0
-                            self._last_exist_time = None
-
-                    # CSV logging at 1Hz
-                    now = time.time()
-                    if now - self.last_csv_log_time >= 1.0:
-                        self.last_csv_log_time = now
-                        timestamp = now
-                        readable_time = datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S')
-                        # Use breathing_rate_bpm if available, else None
-                        br = breathing_rate_bpm if 'breathing_rate_bpm' in locals() else None
-                        filtered_breath = filtered_breathing_plot[-1] if filtered_breathing_plot is not None else None
-                        self.log_to_csv(timestamp, readable_time, br, filtered_breath)
+                        send_osc_messages(breathpm=breathing_rate_bpm)
+                    too_fast = max_breathing_rate is not None and breathing_rate_bpm > max_breathing_rate
+                    if too_fast or self.breathing_is_erratic():
+                        if self.need_brv_intervention == False:
+                            self.need_brv_intervention = True
+                            self.brv_intervention_start_time = clock()
+                            print(f"[{time.strftime('%H:%M:%S', time.localtime())}] intervention started")
+                            self.event_log.log('intervention_start')
+                            send_osc_messages(brvsignal=1)
+                    elif self.need_brv_intervention == True:
+                        # Only stop intervention if at least 3 seconds have passed
+                        if self.brv_intervention_start_time is not None and (clock() - self.brv_intervention_start_time >= 3):
+                            self.event_log.log('intervention_stop', clock() - self.brv_intervention_start_time)
+                            self.need_brv_intervention = False
+                            self.brv_intervention_start_time = None
+                            print(f"[{time.strftime('%H:%M:%S', time.localtime())}] intervention stopped")
+                            send_osc_messages(brvsignal=0)
+                except Exception as e:
+                    print(f"OSC send error: {e}")
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        if 'heart_rate' in active_stages:
+            heart_rate_estimation_index = np.roll(heart_rate_estimation_index, -counter)
+            heart_rate_estimation_index[-counter:] = heart_rate_estimation_index[-counter - 1]
+            rate_index_hr, self.heart_rate_confidence = self.find_signal_peaks(
+                heart_fft, plan.index_start_heart, plan.index_end_heart, peak_finding_distance)
+            if rate_index_hr != 0:
+                heart_rate_estimation_index[-counter:] = rate_index_hr
+        self.previous_stages = active_stages
+
+        # Stream filtered_breathing_plot in real-time via OSC (only the newest value after a catch-up batch)
+        global scaled_breath_amplitude
+        breath_values = filtered_breathing_plot[-counter:]
+        if self.breath_filter is not None and ENABLE_BREATH_PREDICTION:
+            breath_values = breath_values.copy()
+            breath_values[-1] = self.predict_breath(current_time)
+        for value in breath_values:
+            breath_amplitude = self.update_scaled_breath(value)
+            # Update scaled breath amplitude buffer for plotting
+            if breath_amplitude is not None:
+                scaled_breath_amplitude = np.roll(scaled_breath_amplitude, -1)
+                scaled_breath_amplitude[-1] = breath_amplitude
+        send_osc_messages(amplitude=breath_amplitude)
+        if breath_amplitude is not None:
+            send_to_home_assistant(mqtt_publisher, breath_amplitude)
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+        # Detect presence
+        presence_status = self.detect_presence_by_range_profile(range_fft_abs_frames)
+        send_to_home_assistant(mqtt_publisher, presence_status, MQTT_PRESENCE_TOPIC)
+
+        # Track working time
+        if not hasattr(self, 'working_time'):
+            self.working_time = 0.0
+            self._last_exist_time = None
+        if presence_status == 1:
+            if self._last_exist_time is None:
+                self._last_exist_time = clock()
+                self.event_log.log('focus_start', timestamp=self._last_exist_time)
+        else:
+            if self._last_exist_time is not None:
+                self.working_time += clock() - self._last_exist_time
+                now_str = time.strftime('%H:%M:%S', time.localtime())
+                print(f"[{now_str}] User focused for {self.working_time / 60:.2f} minutes")
+                self.event_log.log('focus_end', self.working_time)
+                self.working_time = 0.0
+                self._last_exist_time = None
+
+        # CSV logging at 1Hz
+        now = clock()
+        if now - self.last_csv_log_time >= 1.0:
+            self.last_csv_log_time = now
+            timestamp = now
+            readable_time = datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S')
+            # Use breathing_rate_bpm if available, else None
+            br = self.breathing_rate_bpm
+            filtered_breath = float(filtered_breathing_plot[-1]) if filtered_breathing_plot is not None else None
+            # presence: hysteresis state at this row, so analyses can drop rows logged with nobody there
+            self.log_to_csv(timestamp, readable_time, br, filtered_breath, presence_status)
+
+
+    def estimate_breathing_rate(self, new_samples):
+        """
+        Run the selected breathing rate estimator on the filtered breathing history.
+        Returns the rate as a (fractional) vital-signs spectrum index, 0 if there is no estimate,
+        so the estimation history, plots and b.p.m. conversion are shared by all estimators.
+        """
+        global breathing_fft
+        rate_hz, self.breathing_rate_confidence = self.breathing_estimator.update(filtered_breathing_plot,
+                                                                                  new_samples)
+        if rate_hz > 0:
+            self.breathing_rate_hz = rate_hz
+        if self.breathing_estimator.spectrum is not None:
+            breathing_fft = self.breathing_estimator.spectrum
+        elif 'breathing_spectrum' in stage_graph:
+            breathing_fft = self.vital_signs_fft(filtered_breathing_plot[-processing_data_size:],
+                                                 fft_size_vital_signs, processing_data_size)
+        for interval in self.breathing_estimator.pop_intervals():
+            self.breath_interval_stats.push(interval)
+        return rate_hz * fft_size_vital_signs / vital_signs_sample_rate
+
+    def predict_breath(self, current_time):
+        """
+        Newest filtered breath value advanced by the pipeline delay: filter phase delay at the
+        current breathing rate, decimation (half a block), processing time since the frames were
+        taken off the queue and led_output_latency.
+        """
+        horizon = (clock() - current_time + led_output_latency +
+                   (decimation_factor - 1) / 2 / frame_rate)
+        if self.breathing_rate_hz is not None:
+            horizon += self.breath_filter.phase_delay(self.breathing_rate_hz)
+        self.pipeline_delay = horizon
+        return self.breath_predictor.predict(filtered_breathing_plot[-2:], self.breathing_rate_hz, horizon)
+
+    def calculate_breath_interval_variability(self):
+        """
+        Standard deviation (seconds) of the last breath_interval_window breath-to-breath intervals.
+        Only available with a time-domain estimator; returns 0.0 otherwise.
+        """
+        std = self.breath_interval_stats.std()
+        return 0.0 if std is None else std
+
+    def update_multi_target(self, range_fft_frames, range_fft_abs_frames, plan):
+        """
+        Track several people and estimate the breathing rate of each tracked range bin.
+        range_fft_frames holds one range profile per new frame; the tracker follows every frame,
+        the rate estimation runs once. Rates are sent as one /targets OSC message, one value per
+        slot (0 = no target).
+        """
+        global tracked_target_bins, tracked_target_rates
+        for range_fft_antennas_buffer, frame_range_fft_abs in zip(range_fft_frames[:-1], range_fft_abs_frames[:-1]):
+            self.multi_target.update(range_fft_antennas_buffer, frame_range_fft_abs, plan.start_index_range,
+                                     plan.stop_index_range, estimate=False)
+        bins, rate_indices = self.multi_target.update(range_fft_frames[-1], range_fft_abs_frames[-1],
+                                                      plan.start_index_range, plan.stop_index_range,
+                                                      plan.breathing_b, plan.index_start_breathing,
+                                                      plan.index_end_breathing)
+        rates = np.zeros(len(rate_indices))
+        valid = rate_indices > 0
+        rates[valid] = np.round(spectrum_index_to_hz(rate_indices[valid]) * 60) - 2
+        tracked_target_bins = np.where(self.multi_target.tracker.confirmed, bins, -1)
+        tracked_target_rates = rates
+        send_osc_messages(targets=[int(rate) for rate in rates])
 
     def calculate_breathing_rate_variability(self, window_seconds=240):
         """
         Calculate the rolling standard deviation (variability) of the breathing rate estimation
         over the last `window_seconds` seconds (default 4 minutes).
         Returns the standard deviation of nonzero breathing rates in the window.
+        Windows matching a breathing_stats_horizons entry are read from the streaming statistics
+        in O(1); other windows are read from the tiered rate history (any length up to its span).
         """
         # Calculate how many samples correspond to the window
         window_size = int(window_seconds * vital_signs_sample_rate)
-        # Use the global breathing_rate_estimation_value buffer
-        window = breathing_rate_estimation_value[-window_size:]
-        # Only consider nonzero values (to avoid startup zeros)
-        valid = window[window > 0]
-        if len(valid) == 0:
-            return 0.0
-        return float(np.std(valid))
+        stats = self.breath_stats.horizon_for(window_size)
+        if stats is not None:
+            std = stats.std()
+            return 0.0 if std is None else std
+        # Only valid (nonzero) rates are in the history
+        history_stats = self.rate_history.stats(clock() - window_seconds, clock())
+        return 0.0 if history_stats is None else history_stats['std']
+
+    def reanchor_phase_data(self):
+        """
+        Drift correction without dropping outputs.
+        The unwrapped phase grows without bound as the target drifts. Subtracting a whole
+        number of 2*pi turns from the full history keeps it near zero while leaving the
+        wrapped phase, the unwrap of the next samples and the band-pass filtered outputs
+        unchanged, so /breathpm and /amplitude keep running and the presence EMA is kept.
+        """
+        global unwrapped_phase_plot
+        offset = 2 * np.pi * np.round(unwrapped_phase_plot[-1] / (2 * np.pi))
+        if offset != 0:
+            unwrapped_phase_plot -= offset
+            if self.breath_filter is not None:
+                self.breath_filter.shift(offset)  # IIR state follows its input
+        self.last_reset_time = clock()
+        print(f"[{time.strftime('%H:%M:%S', time.localtime())}] Phase re-anchored by {offset / (2 * np.pi):.0f} turns")
+
+    def apply_dsp_plan(self, plan):
+        """Switch to a new DspPlan between frames; the estimator and low-latency filter follow a breathing band change."""
+        previous, self.dsp_plan = self.dsp_plan, plan
+        band = (plan.config.low_breathing, plan.config.high_breathing)
+        if band != (previous.config.low_breathing, previous.config.high_breathing):
+            self.breathing_estimator.set_band(*band)
+            if self.breath_filter is not None:
+                self.breath_filter.set_band(*band, unwrapped_phase_plot[-processing_data_size:])
+
+    def mark_acquisition_gap(self, gap_start, gap_end):
+        """Called by the acquisition supervisor after a reconnect; applied in the processing thread."""
+        self.pending_acquisition_gap = (gap_start, gap_end)
+
+    def resume_after_gap(self):
+        """
+        Continue after a device reconnect with the existing histories and filter states: drop the
+        half-integrated decimation block, rotate the new phase onto the last sample before the gap
+        (as after a warm start), put the gap into the time base and log it. A focus period open at
+        the disconnect ends at gap_start: the outage is not counted as focus time.
+        """
+        global start_time
+        gap_start, gap_end = self.pending_acquisition_gap
+        self.pending_acquisition_gap = None
+        self.decimator.reset()
+        self.align_phase_on_next_frame = True
+        self.time_base_gap = gap_end - gap_start
+        start_time = gap_end
+        self.last_presence = 0  # status=0 was sent on disconnect; resend status=1 once present again
+        if self._last_exist_time is not None:
+            self.working_time += max(gap_start - self._last_exist_time, 0.0)
+            self.event_log.log('focus_end', self.working_time, timestamp=gap_start)
+            self.working_time = 0.0
+            self._last_exist_time = None
+        self.event_log.log('acquisition_gap', gap_end - gap_start, timestamp=gap_end)
+        print(f"[{time.strftime('%H:%M:%S', time.localtime())}] Acquisition resumed after "
+              f"{gap_end - gap_start:.1f} s gap")
 
     def reset_phase_data(self):
         """
@@ -607,26 +1103,154 @@ class RadarDataProcessor:
         I_Q_envelop.fill(0)
         
         # Reset internal buffers
-        self.breath_stream.clear()
-        self.presence_max_buffer.clear()
-        self.presence_status_buffer.clear()
+        self.breath_scaler.reset()
+        self.breathing_estimator.reset()
+        if self.breath_filter is not None:
+            self.breath_filter.reset()
+        self.breath_predictor.reset()
+        self.breathing_rate_hz = None
+        self.presence_state.reset()
         self.presence_ema = None
         
         # Update reset time
-        self.last_reset_time = time.time()
+        self.last_reset_time = clock()
         
         print(f"[{time.strftime('%H:%M:%S', time.localtime())}] Phase data reset completed to prevent accumulated errors")
     
+    def get_state(self):
+        """
+        Compact pipeline state for warm starts: slow-time and phase histories, filter outputs,
+        estimation histories, range-bin track, presence EMA / hysteresis, breath scaler
+        stream and breathing statistics (baseline).
+        """
+        state = {name: globals()[name] for name in checkpoint_buffers}
+        state.update({
+            'buffer_data_size': buffer_data_size,
+            'fft_size_vital_signs': fft_size_vital_signs,
+            'vital_signs_sample_rate': vital_signs_sample_rate,
+            'range_profile_peak_index': range_profile_peak_index,
+            'presence_ema': np.nan if self.presence_ema is None else self.presence_ema,
+            'last_presence': self.last_presence,
+            'presence_state': [self.presence_state.state, self.presence_state.detected_frames,
+                               self.presence_state.missed_frames],
+            'breath_stream': self.breath_scaler.get_state(),
+            'baseline_breathing_rate': np.nan if baseline_breathing_rate is None else baseline_breathing_rate,
+            'max_breathing_rate': np.nan if max_breathing_rate is None else max_breathing_rate,
+            'baseline_calculated': baseline_calculated,
+        })
+        state.update({f'breath_stats/{key}': value for key, value in self.breath_stats.get_state().items()})
+        state.update({f'rate_history/{key}': value for key, value in self.rate_history.get_state().items()})
+        return state
+
+    def restore_state(self, state):
+        """
+        Restore a state from get_state(). Returns False (and restores nothing) when the
+        checkpoint was made with a different buffer / FFT / sample-rate configuration.
+        """
+        global range_profile_peak_index, baseline_breathing_rate, max_breathing_rate, baseline_calculated
+        if (int(state['buffer_data_size']) != buffer_data_size or
+                int(state['fft_size_vital_signs']) != fft_size_vital_signs or
+                int(state['vital_signs_sample_rate']) != vital_signs_sample_rate):
+            print("[Checkpoint] configuration changed, starting cold")
+            return False
+        try:
+            self.breath_stats.set_state({key[len('breath_stats/'):]: value for key, value in state.items()
+                                         if key.startswith('breath_stats/')})
+        except (KeyError, ValueError) as e:
+            print(f"[Checkpoint] breathing statistics not restored: {e}")
+            self.breath_stats.reset()
+        try:
+            self.rate_history.set_state({key[len('rate_history/'):]: value for key, value in state.items()
+                                         if key.startswith('rate_history/')})
+        except (KeyError, ValueError) as e:
+            print(f"[Checkpoint] breathing rate history not restored: {e}")
+            self.rate_history = TieredHistory(history_tiers)
+        for name in checkpoint_buffers:
+            np.copyto(globals()[name], state[name])
+        range_profile_peak_index = int(state['range_profile_peak_index'])
+        self.presence_ema = None if np.isnan(state['presence_ema']) else float(state['presence_ema'])
+        self.last_presence = int(state['last_presence'])
+        (self.presence_state.state, self.presence_state.detected_frames,
+         self.presence_state.missed_frames) = (int(value) for value in state['presence_state'])
+        self.breath_scaler.set_state(state['breath_stream'])
+        if self.breath_filter is not None:
+            self.breath_filter.set_band(self.dsp_plan.config.low_breathing, self.dsp_plan.config.high_breathing,
+                                        unwrapped_phase_plot[-processing_data_size:])
+        if not np.isnan(state['baseline_breathing_rate']):
+            baseline_breathing_rate = float(state['baseline_breathing_rate'])
+        if not np.isnan(state['max_breathing_rate']):
+            max_breathing_rate = float(state['max_breathing_rate'])
+        baseline_calculated = bool(state['baseline_calculated'])
+        # Rotate the first new sample (and all after it) onto the restored phase
+        self.align_phase_on_next_frame = True
+        return True
+
+    def save_state(self):
+        try:
+            save_checkpoint(checkpoint_path, self.get_state())
+        except Exception as e:
+            print(f"[Checkpoint] save failed: {e}")
+        self.last_checkpoint_time = clock()
+
+    def restore_checkpoint(self):
+        """Restore the last checkpoint if it is recent enough, see checkpoint_max_age."""
+        state = load_checkpoint(checkpoint_path, max_age=checkpoint_max_age)
+        if state is not None and self.restore_state(state):
+            print(f"[Checkpoint] warm start from {checkpoint_path}")
+
     def stop(self):
         """Stop the processing thread"""
         self.should_exit = True
+        # Close open focus / intervention periods so the event log stays paired
+        if self._last_exist_time is not None:
+            self.event_log.log('focus_end', self.working_time + clock() - self._last_exist_time)
+            self._last_exist_time = None
+        if self.need_brv_intervention and self.brv_intervention_start_time is not None:
+            self.event_log.log('intervention_stop', clock() - self.brv_intervention_start_time)
+            self.need_brv_intervention = False
+        self.event_log.close()
         if self.csv_file:
             self.csv_file.close()
         print("Radar processor stopping...")
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-def send_osc_messages(status=None, breathpm=None, brvsignal=None, amplitude=None):
+def spectrum_index_to_hz(index):
+    """Frequency in Hz of a (fractional) vital-signs spectrum bin index."""
+    return index * vital_signs_sample_rate / fft_size_vital_signs
+
+
+class DatagramOscClient:
+    """OSC client that hands built datagrams to osc_datagram_sender (asyncio runtime)."""
+    def __init__(self, target):
+        self.target = target
+
+    def send_message(self, address, value):
+        builder = OscMessageBuilder(address=address)
+        for arg in (value if isinstance(value, list) else [value]):
+            builder.add_arg(arg)
+        osc_datagram_sender(builder.build().dgram, self.target)
+
+
+def set_osc_datagram_sender(sender):
+    """Route OSC through `sender(datagram, (ip, port))`, or back to SimpleUDPClient with None."""
+    global osc_datagram_sender, osc_clients
+    osc_datagram_sender = sender
+    osc_clients = None
+
+
+def get_osc_clients():
+    """OSC clients for osc_targets, created once instead of per message."""
+    global osc_clients
+    if osc_clients is None:
+        if osc_datagram_sender is not None:
+            osc_clients = [DatagramOscClient(target) for target in osc_targets]
+        else:
+            osc_clients = [SimpleUDPClient(ip, port) for ip, port in osc_targets]
+    return osc_clients
+
+
+def send_osc_messages(status=None, breathpm=None, brvsignal=None, amplitude=None, targets=None):
     """
     Send OSC messages to both ESP32 and local MaxMSP clients.
     Args:
@@ -634,12 +1258,9 @@ def send_osc_messages(status=None, breathpm=None, brvsignal=None, amplitude=None
         breathpm (int or None): Value for /breathpm
         brvsignal (int or None): Value for /brvsignal
         amplitude (float or None): Value for /amplitude
+        targets (list of int or None): Breathing rate per tracked target for /targets
     """
-    clients = [
-        SimpleUDPClient(UDP_IP_ESP32, UDP_PORT_ESP32),
-        SimpleUDPClient(UDP_IP_MAX, UDP_PORT_MAX)
-    ]
-    for client in clients:
+    for client in get_osc_clients():
         if status is not None:
             try:
                 client.send_message("/status", int(status))
@@ -661,6 +1282,11 @@ def send_osc_messages(status=None, breathpm=None, brvsignal=None, amplitude=None
                 client.send_message("/amplitude", float(amplitude))
             except Exception as e:
                 print(f"OSC send error (/amplitude): {e}")
+        if targets is not None:
+            try:
+                client.send_message("/targets", list(targets))
+            except Exception as e:
+                print(f"OSC send error (/targets): {e}")
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -674,6 +1300,9 @@ def update_plots():
         range_profile_plots[0][0].setData(x_axis_range_profile[min_range_index:], range_fft_abs[min_range_index:])
         range_profile_plots[3][0].setData([x_axis_range_profile[range_profile_peak_index]],
                                           [range_fft_abs[range_profile_peak_index]])
+        if ENABLE_MULTI_TARGET:
+            target_bins = tracked_target_bins[tracked_target_bins >= 0]
+            range_profile_plots[4][0].setData(x_axis_range_profile[target_bins], range_fft_abs[target_bins])
 
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # phase unwrap plot
@@ -698,14 +1327,12 @@ def update_plots():
         vital_signs_plots[2][0].setData(x_axis_vital_signs_spectrum, np.fft.fftshift(breathing_fft))
         vital_signs_plots[3][0].setData(x_axis_vital_signs_spectrum, np.fft.fftshift(heart_fft))
         if breathing_rate_estimation_index[estimation_index_breathing] > 0:
-            xb = x_axis_vital_signs_spectrum[
-                int(fft_size_vital_signs / 2 + np.mean(breathing_rate_estimation_index[estimation_index_breathing:]))]
-            yb = breathing_fft[int(np.mean(breathing_rate_estimation_index[estimation_index_breathing:]))]
+            xb = spectrum_index_to_hz(np.mean(breathing_rate_estimation_index[estimation_index_breathing:]))
+            yb = breathing_fft[int(round(np.mean(breathing_rate_estimation_index[estimation_index_breathing:])))]
             vital_signs_plots[4][0].setData([xb], [yb])
         if heart_rate_estimation_index[estimation_index_heart] > 0:
-            xh = x_axis_vital_signs_spectrum[
-                int(fft_size_vital_signs / 2 + np.mean(heart_rate_estimation_index[estimation_index_heart:]))]
-            yh = heart_fft[int(np.mean(heart_rate_estimation_index[estimation_index_heart:]))]
+            xh = spectrum_index_to_hz(np.mean(heart_rate_estimation_index[estimation_index_heart:]))
+            yh = heart_fft[int(round(np.mean(heart_rate_estimation_index[estimation_index_heart:])))]
             vital_signs_plots[5][0].setData([xh], [yh])
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -713,19 +1340,23 @@ def update_plots():
         global breathing_rate_estimation_value, heart_rate_estimation_value
         if breathing_rate_estimation_index[estimation_index_breathing] > 0:
             breathing_rate_estimation_value = np.roll(breathing_rate_estimation_value, -1)
-            xb = x_axis_vital_signs_spectrum[
-                     round(fft_size_vital_signs / 2 + np.mean(
-                         breathing_rate_estimation_index[estimation_index_breathing:]))] * 60
+            xb = spectrum_index_to_hz(np.mean(breathing_rate_estimation_index[estimation_index_breathing:])) * 60
             breathing_rate_estimation_value[-1] = round(xb) - 2
             estimation_plots[0][0].setData(radar_time_stamp, breathing_rate_estimation_value)
 
         if heart_rate_estimation_index[estimation_index_heart] > 0:
             heart_rate_estimation_value = np.roll(heart_rate_estimation_value, -1)
-            xh = x_axis_vital_signs_spectrum[
-                     round(
-                         fft_size_vital_signs / 2 + np.mean(heart_rate_estimation_index[estimation_index_heart:]))] * 60
+            xh = spectrum_index_to_hz(np.mean(heart_rate_estimation_index[estimation_index_heart:])) * 60
             heart_rate_estimation_value[-1] = round(xh) - 2
             estimation_plots[1][0].setData(radar_time_stamp, heart_rate_estimation_value)
+    if ENABLE_SESSION_PLOT and radar_processor is not None:
+        now = time.time()
+        times, mean, minimum, maximum, _ = radar_processor.rate_history.query(now - session_plot_seconds, now,
+                                                                              session_plot_points)
+        minutes = (times - now) / 60
+        session_plots[0][0].setData(minutes, mean)
+        session_plots[1][0].setData(minutes, minimum)
+        session_plots[2][0].setData(minutes, maximum)
         # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -741,7 +1372,6 @@ app = QApplication([])
 # range profile plot setting up
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 def generate_range_profile_plot():
-    global object_distance_start_range, object_distance_stop_range
     plot = pg.plot(title='Range Profile')
     plot.showGrid(x=True, y=True, alpha=0.3)  
     plot.setBackground("w")
@@ -752,7 +1382,8 @@ def generate_range_profile_plot():
         ('lime', 'Sum of Rx channels'),
         ('red', 'Real'),
         ('blue', 'Imaginary'),
-        ('lightcoral', 'Selected Range Index')
+        ('lightcoral', 'Selected Range Index'),
+        ('dodgerblue', 'Tracked Targets')
     ]
     plot_objects = [[] for _ in range(len(plots))]
     for j, (color, name) in enumerate(plots):
@@ -764,6 +1395,11 @@ def generate_range_profile_plot():
             symbol_pen = pg.mkPen(None)
             symbol_brush = pg.mkBrush('lightcoral')
             plot_obj = plot.plot(pen=None, symbol='o', symbolPen=symbol_pen, symbolBrush=symbol_brush, symbolSize=15, name=f'{name}')
+        elif name == 'Tracked Targets':
+            symbol_pen = pg.mkPen(None)
+            symbol_brush = pg.mkBrush(color)
+            plot_obj = plot.plot(pen=None, symbol='t', symbolPen=symbol_pen, symbolBrush=symbol_brush, symbolSize=12, name=f'{name}')
+            plot_obj.setVisible(ENABLE_MULTI_TARGET)
         else:
             # Use orange for breathing data, otherwise keep original color
             line_color = 'orange' if 'breath' in name.lower() or 'Sum of Rx channels' in name else color
@@ -775,10 +1411,11 @@ def generate_range_profile_plot():
     linear_region_range_profle = pg.LinearRegionItem([object_distance_start_range, object_distance_stop_range], brush=(255, 255, 0, 20))
     plot.addItem(linear_region_range_profle)
     def region_changed():
-        global object_distance_start_range, object_distance_stop_range
         region = linear_region_range_profle.getRegion()
-        object_distance_start_range = region[0]
-        object_distance_stop_range = region[1]
+        try:
+            update_dsp_plan(range_start=region[0], range_stop=region[1])
+        except ValueError:
+            pass  # region dragged outside the range axis, keep the current gate
     linear_region_range_profle.sigRegionChanged.connect(region_changed)
     return plot, plot_objects
 
@@ -839,7 +1476,6 @@ if ENABLE_PHASE_UNWRAP_PLOT:
 # Breathing Spectrum plot setting up
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 def generate_vitalsigns_spectrum_plot():
-    global low_breathing, high_breathing, low_heart, high_heart, breathing_b, heart_b, index_start_breathing, index_end_breathing, index_start_heart, index_end_heart
     plot = pg.plot(title='Vital Signs Spectrum')
     plot.showGrid(x=True, y=True, alpha=0.3)
     plot.setBackground("w")
@@ -876,26 +1512,16 @@ def generate_vitalsigns_spectrum_plot():
     linear_region_breathing = pg.LinearRegionItem([low_breathing, high_breathing], brush=(255, 255, 0, 20))
     plot.addItem(linear_region_breathing, 'Breathing Linear Region')
     def linear_region_breathing_changed():
-        global low_breathing, high_breathing, breathing_b, index_start_breathing, index_end_breathing
         region = linear_region_breathing.getRegion()
         if (region[0] < vital_signs_sample_rate / 4 and region[1] < vital_signs_sample_rate / 2 and region[0] > 0 and region[1] > 0):
-            low_breathing = region[0]
-            high_breathing = region[1]
-            breathing_b = firwin(filter_order, [low_breathing / nyquist_freq, high_breathing / nyquist_freq], pass_zero=False)
-            index_start_breathing = int(low_breathing / vital_signs_sample_rate * fft_size_vital_signs)
-            index_end_breathing = int(high_breathing / vital_signs_sample_rate * fft_size_vital_signs)
+            update_dsp_plan(low_breathing=region[0], high_breathing=region[1])
     linear_region_breathing.sigRegionChanged.connect(linear_region_breathing_changed)
     linear_region_heart = pg.LinearRegionItem([low_heart, high_heart], brush=(255, 255, 0, 20))
     plot.addItem(linear_region_heart)
     def linear_region_heart_changed():
-        global low_heart, high_heart, heart_b, index_start_heart, index_end_heart
         region = linear_region_heart.getRegion()
         if (region[0] < vital_signs_sample_rate / 4 and region[1] < vital_signs_sample_rate / 2 and region[0] > 0 and region[1] > 0):
-            low_heart = region[0]
-            high_heart = region[1]
-            heart_b = firwin(filter_order, [low_heart / nyquist_freq, high_heart / nyquist_freq], pass_zero=False)
-            index_start_heart = int(low_heart / vital_signs_sample_rate * fft_size_vital_signs)
-            index_end_heart = int(high_heart / vital_signs_sample_rate * fft_size_vital_signs)
+            update_dsp_plan(low_heart=region[0], high_heart=region[1])
     linear_region_heart.sigRegionChanged.connect(linear_region_heart_changed)
     plot.setXRange(low_breathing, high_heart + 0.5)
     return plot, plot_objects
@@ -938,9 +1564,53 @@ def generate_estimation_plot():
 if ENABLE_ESTIMATION_PLOT:
     estimation_figure, estimation_plots = generate_estimation_plot()
     estimation_figure.show()
+
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Session plot setting up
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+def generate_session_plot():
+    plot = pg.plot(title='Session Breathing Rate')
+    plot.showGrid(x=True, y=True, alpha=0.3)
+    plot.setBackground("w")
+    plot.setLabel('bottom', 'Time [min]')
+    plot.setLabel('left', 'Rate [b.p.m.]')
+    plot.addLegend()
+    plot_objects = [[plot.plot(pen=pg.mkPen(color='orange', width=2), name='Mean')],
+                    [plot.plot(pen=pg.mkPen(color=(255, 165, 0, 80)), name='Min')],
+                    [plot.plot(pen=pg.mkPen(color=(255, 165, 0, 80)), name='Max')]]
+    plot.addItem(pg.FillBetweenItem(plot_objects[1][0], plot_objects[2][0], brush=(255, 165, 0, 40)))
+    return plot, plot_objects
+
+
+# Usage:
+if ENABLE_SESSION_PLOT:
+    session_figure, session_plots = generate_session_plot()
+    session_figure.show()
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Plot curves as stage-graph outputs: a curve's stages run while it is visible (legend toggles included)
+def register_plot_sink(name, curve, needs):
+    stage_graph.add_sink(name, needs, curve.isVisible())
+    curve.visibleChanged.connect(lambda: stage_graph.set_active(name, curve.isVisible()))
+
+
+if ENABLE_PHASE_UNWRAP_PLOT:
+    for index, needs in enumerate([['slow_time'], ['slow_time'], ['slow_time'], ['phase'], ['phase'],
+                                   ['breathing_filter'], ['heart_filter'], ['breath_amplitude']]):
+        register_plot_sink(f'phase_unwrap_plot/{index}', phase_unwrap_plots[index][0], needs)
+if ENABLE_VITALSIGNS_SPECTRUM:
+    for index, needs in enumerate([['raw_iq_fft'], ['phase_fft'], ['breathing_spectrum'], ['heart_fft'],
+                                   ['breathing_rate'], ['heart_rate']]):
+        register_plot_sink(f'vital_signs_plot/{index}', vital_signs_plots[index][0], needs)
+if ENABLE_ESTIMATION_PLOT:
+    register_plot_sink('estimation_plot/breathing', estimation_plots[0][0], ['breathing_rate'])
+    register_plot_sink('estimation_plot/heart', estimation_plots[1][0], ['heart_rate'])
+if ENABLE_SESSION_PLOT:
+    register_plot_sink('session_plot/mean', session_plots[0][0], ['breathing_rate'])
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 timer = QTimer()
 timer.timeout.connect(update_plots)
@@ -953,12 +1623,127 @@ def cleanup_on_exit():
     print("Cleaning up threads...")
     if radar_processor:
         radar_processor.stop()
+    if mqtt_publisher is not None:
+        mqtt_publisher.stop()
     if process_thread and process_thread.is_alive():
         process_thread.join(timeout=2)
     if data_thread and data_thread.is_alive():
         data_thread.join(timeout=2)
     print("Cleanup completed")
 
+
+def run_async_runtime(acquisition):
+    """
+    RUNTIME = 'asyncio': frame reads (executor), processing, OSC datagrams and the periodic jobs
+    (phase re-anchor / reset, BRV evaluation, CSV flush, MQTT flush, checkpoints, Qt events for the
+    plots) all run as tasks on one event loop.
+    """
+    radar_processor.csv_flush_each_row = False
+    jobs = [
+        (radar_processor.reset_interval, radar_processor.reset_phase),
+        (brv_evaluation_interval, radar_processor.evaluate_brv),
+        (1.0, radar_processor.flush_csv),
+        (dsp_plan_file_check_interval, poll_dsp_plan_file),
+        (figure_update_time / 1000, app.processEvents),  # drives the QTimer plot updates
+    ]
+    if ENABLE_WARM_START:
+        jobs.append((checkpoint_interval, radar_processor.save_state))
+    if mqtt_publisher is not None:
+        jobs.append((mqtt_publisher.tick, mqtt_publisher.flush))  # sends values held back by the rate limit
+    app.lastWindowClosed.connect(lambda: setattr(radar_processor, 'should_exit', True))
+    runtime = AsyncRadarRuntime([(acquisition.read_frames, radar_processor.process_frames)], jobs,
+                                should_exit=lambda: radar_processor.should_exit,
+                                catch_up_threshold=catch_up_threshold, max_batch=max_catch_up_frames)
+    set_osc_datagram_sender(runtime.send_datagram)
+
+    async def run():
+        try:
+            await runtime.run()
+        finally:
+            # Also on Ctrl-C (cancellation): asyncio.run then waits for the executor thread, which may be
+            # in the acquisition supervisor's reconnect loop until should_exit is set
+            radar_processor.should_exit = True
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        set_osc_datagram_sender(None)
+        if ENABLE_WARM_START:
+            radar_processor.save_state()
+        cleanup_on_exit()
+
+def init_dsp_plan(max_range_m):
+    """Initial DSP plan from the configured bands and range gate, then any changes in DSP_PLAN_FILE."""
+    global dsp_plan
+    dsp_plan = make_dsp_plan(DspConfig(low_breathing, high_breathing, low_heart, high_heart,
+                                       object_distance_start_range, object_distance_stop_range,
+                                       vital_signs_sample_rate, filter_order, fft_size_vital_signs,
+                                       fft_size_range_profile, max_range_m))
+    poll_dsp_plan_file()
+
+
+def update_dsp_plan(**changes):
+    """
+    Swap in the plan with changes applied; any thread (GUI, plan file, control listener). The plan is
+    built (or found in the cache) here and published by one assignment, so process_frames sees either
+    the old or the new plan for a whole pass. Raises ValueError for invalid parameters.
+    """
+    global dsp_plan
+    with dsp_plan_lock:  # concurrent updates of different parameters must not overwrite each other
+        dsp_plan = dsp_plan.with_changes(**changes)
+        return dsp_plan
+
+
+def poll_dsp_plan_file():
+    """Apply DSP_PLAN_FILE when it was created or modified since the last check."""
+    try:
+        changes = dsp_plan_file.poll()
+        if changes:
+            update_dsp_plan(**changes)
+            print(f"[DSP plan] {DSP_PLAN_FILE} applied: {changes}")
+    except (ValueError, OSError) as e:
+        print(f"[DSP plan] {DSP_PLAN_FILE} rejected: {e}")
+
+
+def init_buffers(max_range_m):
+    """Allocate the processing / plot histories (also used by soak_harness.py, which has no device)."""
+    global range_fft_abs, radar_time_stamp, slow_time_buffer_data, I_Q_envelop, wrapped_phase_plot, \
+        unwrapped_phase_plot, filtered_breathing_plot, filtered_heart_plot, buffer_raw_I_Q_fft, phase_unwrap_fft, \
+        breathing_fft, heart_fft, range_profile_peak_indices, breathing_rate_estimation_index, \
+        heart_rate_estimation_index, breathing_rate_estimation_value, heart_rate_estimation_value, \
+        scaled_breath_amplitude, tracked_target_bins, tracked_target_rates, x_axis_range_profile, \
+        x_axis_vital_signs_spectrum
+    range_fft_abs = np.zeros(int(fft_size_range_profile / 2), dtype=real_dtype)
+    radar_time_stamp = np.zeros(buffer_data_size)
+    slow_time_buffer_data = np.zeros(buffer_data_size, dtype=complex_dtype)
+    I_Q_envelop = np.zeros(buffer_data_size, dtype=real_dtype)
+    # Phase histories stay float64 whatever DSP_PRECISION is: the unwrapped phase accumulates
+    wrapped_phase_plot = np.zeros(buffer_data_size)
+    unwrapped_phase_plot = np.zeros(buffer_data_size)
+    filtered_breathing_plot = np.zeros(buffer_data_size, dtype=real_dtype)
+    filtered_heart_plot = np.zeros(buffer_data_size, dtype=real_dtype)
+    buffer_raw_I_Q_fft = np.zeros(fft_size_vital_signs, dtype=real_dtype)
+    phase_unwrap_fft = np.zeros(fft_size_vital_signs, dtype=real_dtype)
+    breathing_fft = np.zeros(fft_size_vital_signs, dtype=real_dtype)
+    heart_fft = np.zeros(fft_size_vital_signs, dtype=real_dtype)
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    range_profile_peak_indices = np.zeros(buffer_data_size)
+    breathing_rate_estimation_index = np.zeros(buffer_data_size)
+    heart_rate_estimation_index = np.zeros(buffer_data_size)
+    breathing_rate_estimation_value = np.zeros(buffer_data_size)
+    heart_rate_estimation_value = np.zeros(buffer_data_size)
+    # Add buffer for scaled breath amplitude
+    scaled_breath_amplitude = np.zeros(buffer_data_size, dtype=real_dtype)
+    # Multi-target tracking: range bin (-1 = free slot) and breathing rate per track slot
+    tracked_target_bins = -np.ones(max_tracked_targets, dtype=int)
+    tracked_target_rates = np.zeros(max_tracked_targets)
+    # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+    x_axis_range_profile = np.linspace(0, max_range_m, int(fft_size_range_profile / 2))
+    x_axis_vital_signs_spectrum = np.fft.fftshift(np.fft.fftfreq(fft_size_vital_signs, 1 / vital_signs_sample_rate))
+
+
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # main
@@ -967,42 +1752,17 @@ def cleanup_on_exit():
 if __name__ == "__main__":
 
     # connect to the device
-    with DeviceFmcw() as device:
+    acquisition = AcquisitionSupervisor(DeviceFmcw, configure_device,
+                                        on_disconnect=on_device_disconnect, on_reconnect=on_device_reconnect,
+                                        should_exit=lambda: radar_processor is not None and radar_processor.should_exit,
+                                        initial_backoff=reconnect_initial_backoff,
+                                        max_backoff=reconnect_max_backoff)
+    with acquisition:
+        device = acquisition.device
+        config = acquisition.config
         print("Radar SDK Version: " + get_version())
         print("UUID of board: " + device.get_board_uuid())
         print("Sensor: " + str(device.get_sensor_type()))
-
-        if num_rx_antennas == 3:
-            rx_mask = 7  # rx_mask = 7 means all three receive antennas are activated
-        elif num_rx_antennas == 2:
-            rx_mask = 3  # rx_mask = 7 means all three receive antennas are activated
-        else:
-            rx_mask = 1  # rx_mask = 7 means all three receive antennas are activated
-
-        config = FmcwSimpleSequenceConfig(
-            frame_repetition_time_s=1 / frame_rate,
-            chirp_repetition_time_s=0.001,
-            num_chirps=number_of_chirps,
-            tdm_mimo=True,
-            chirp=FmcwSequenceChirp(
-                start_frequency_Hz=58_000_000_000,
-                end_frequency_Hz=63_500_000_000,
-                sample_rate_Hz=1e6,
-                num_samples=samples_per_chirp,
-                rx_mask=rx_mask,
-                tx_mask=1,
-                tx_power_level=31,
-                lp_cutoff_Hz=500000,
-                hp_cutoff_Hz=80000,
-                if_gain_dB=33,
-            )
-        )
-        # num_rx_antennas = device.get_sensor_information()["num_rx_antennas"]
-        sequence = device.create_simple_sequence(config)
-        device.set_acquisition_sequence(sequence)
-
-        pp = pprint.PrettyPrinter()
-        pp.pprint(create_dict_from_sequence(sequence))
         # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
         # initialization
         # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -1013,45 +1773,43 @@ if __name__ == "__main__":
         min_range = 0.15
         min_range_index = int(min_range * fft_size_range_profile / 2)
         print('vital_signs_sample_rate = ', vital_signs_sample_rate, 'Hz')
+        print('frame_rate = ', frame_rate, 'Hz, decimation factor = ', decimation_factor)
         # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-        range_fft_abs = np.zeros(int(fft_size_range_profile / 2))
-        radar_time_stamp = np.zeros(buffer_data_size)
-        slow_time_buffer_data = np.zeros(buffer_data_size, dtype=np.complex128)
-        I_Q_envelop = np.zeros(buffer_data_size)
-        wrapped_phase_plot = np.zeros(buffer_data_size)
-        unwrapped_phase_plot = np.zeros(buffer_data_size)
-        filtered_breathing_plot = np.zeros(buffer_data_size)
-        filtered_heart_plot = np.zeros(buffer_data_size)
-        buffer_raw_I_Q_fft = np.zeros(fft_size_vital_signs)
-        phase_unwrap_fft = np.zeros(fft_size_vital_signs)
-        breathing_fft = np.zeros(fft_size_vital_signs)
-        heart_fft = np.zeros(fft_size_vital_signs)
-        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        range_profile_peak_indices = np.zeros(buffer_data_size)
-        breathing_rate_estimation_index = np.zeros(buffer_data_size)
-        heart_rate_estimation_index = np.zeros(buffer_data_size)
-        breathing_rate_estimation_value = np.zeros(buffer_data_size)
-        heart_rate_estimation_value = np.zeros(buffer_data_size)
-        # Add buffer for scaled breath amplitude
-        scaled_breath_amplitude = np.zeros(buffer_data_size)
-        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        x_axis_range_profile = np.linspace(0, max_range, int(fft_size_range_profile / 2))
-        x_axis_vital_signs_spectrum = np.linspace(-vital_signs_sample_rate / 2, vital_signs_sample_rate / 2,
-                                                  fft_size_vital_signs)
+        init_buffers(max_range)
+        init_dsp_plan(max_range)
         # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
         # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
         # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
         # Threads for reading data and processing
         # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
         # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-        data_thread = threading.Thread(target=read_data, args=(device,))
-        data_thread.start()
-        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
         # start_index = int(object_distance_start_range/max_range * samples_per_chirp)
         # end_index = int(object_distance_stop_range/max_range * samples_per_chirp)
         radar_processor = RadarDataProcessor()
-        process_thread = threading.Thread(target=radar_processor.process_data, args=())
+        if ENABLE_WARM_START:
+            radar_processor.restore_checkpoint()
+        if ENABLE_MQTT:
+            mqtt_publisher = configure_mqtt(flush_thread=RUNTIME != 'asyncio')
+        if ENABLE_PROFILER_CONTROL:
+            profiler = SamplingProfiler(os.path.dirname(os.path.abspath(radar_processor.csv_filename)))
+            install_signal_trigger(profiler, profile_duration)
+            try:
+                start_control_listener(profiler, PROFILER_CONTROL_PORT, profile_duration)
+            except OSError as e:
+                print(f"[Profiler] control port {PROFILER_CONTROL_PORT} unavailable: {e}")
+        if ENABLE_DSP_CONTROL:
+            try:
+                start_plan_listener(update_dsp_plan, DSP_CONTROL_PORT)
+            except OSError as e:
+                print(f"[DSP plan] control port {DSP_CONTROL_PORT} unavailable: {e}")
+        if RUNTIME == 'asyncio':
+            run_async_runtime(acquisition)
+            sys.exit(0)
+        data_thread = threading.Thread(target=read_data, args=(acquisition,), name='acquisition')
+        data_thread.start()
+        # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+        process_thread = threading.Thread(target=radar_processor.process_data, args=(), name='processing')
         process_thread.start()
 
         # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -0,0 +1,107 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % Acquisition supervisor: owns the radar device and reopens it when a frame
+# % read fails. The device is closed, reopened with exponential backoff and
+# % the acquisition sequence is re-applied; callers keep reading and only see
+# % an empty frame list while the device is down. on_reconnect(gap_start,
+# % gap_end) lets the pipeline mark the gap and carry on with its state.
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import time
+from contextlib import ExitStack
+
+
+class AcquisitionSupervisor:
+    """
+    open_device(): returns a new device as a context manager (e.g. DeviceFmcw).
+    configure(device): applies the acquisition sequence and returns its config.
+    on_disconnect(error) / on_reconnect(gap_start, gap_end): optional callbacks, called
+    from the reading thread.
+    should_exit(): stops the reconnect loop (checked between backoff slices).
+    Use as a context manager; the current device is closed on exit.
+    """
+
+    def __init__(self, open_device, configure, on_disconnect=None, on_reconnect=None,
+                 should_exit=lambda: False, initial_backoff=0.5, max_backoff=30.0,
+                 sleep=time.sleep, clock=time.time):
+        self.open_device = open_device
+        self.configure = configure
+        self.on_disconnect = on_disconnect
+        self.on_reconnect = on_reconnect
+        self.should_exit = should_exit
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.sleep = sleep
+        self.clock = clock
+        self.device = None
+        self.config = None
+        self.stack = None
+        self.reconnects = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def open(self):
+        stack = ExitStack()
+        try:
+            device = stack.enter_context(self.open_device())
+            self.config = self.configure(device)
+        except BaseException:
+            stack.close()
+            raise
+        self.stack, self.device = stack, device
+        return device
+
+    def close(self):
+        if self.stack is not None:
+            try:
+                self.stack.close()
+            except Exception as e:
+                print(f"[Acquisition] closing device failed: {e}")
+        self.stack = None
+        self.device = None
+
+    def read_frames(self):
+        """device.get_next_frame(); on failure the device is recovered and [] is returned."""
+        if self.device is None:
+            return []
+        try:
+            return self.device.get_next_frame()
+        except Exception as e:
+            self.recover(e)
+            return []
+
+    def recover(self, error):
+        """Close the failed device and reopen it with backoff. Returns False if should_exit stopped it."""
+        gap_start = self.clock()
+        print(f"[Acquisition] device error: {error}; reconnecting")
+        self.close()
+        if self.on_disconnect is not None:
+            self.on_disconnect(error)
+        backoff = self.initial_backoff
+        while self._wait(backoff):
+            try:
+                self.open()
+            except Exception as e:
+                backoff = min(backoff * 2, self.max_backoff)
+                print(f"[Acquisition] reconnect failed: {e}; retrying in {backoff:.1f} s")
+                continue
+            self.reconnects += 1
+            gap_end = self.clock()
+            print(f"[Acquisition] device reconnected after {gap_end - gap_start:.1f} s")
+            if self.on_reconnect is not None:
+                self.on_reconnect(gap_start, gap_end)
+            return True
+        return False
+
+    def _wait(self, seconds, step=0.1):
+        """Sleep in short slices so a shutdown is not held up by a long backoff."""
+        end = self.clock() + seconds
+        while not self.should_exit():
+            remaining = end - self.clock()
+            if remaining <= 0:
+                return True
+            self.sleep(min(step, remaining))
+        return False
@@ -0,0 +1,54 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % Benchmark: breathing-rate accuracy versus vital-signs FFT size, with and
+# % without sub-bin peak interpolation.
+# % Synthetic breathing phase (random rate 10-30 b.p.m., harmonics and noise) is
+# % run through the same window / FFT / peak search as the radar pipeline.
+# % Usage: python bench_peak_interpolation.py [trials]
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import sys
+import time
+
+import numpy as np
+from scipy.signal import firwin, lfilter
+
+import spectral
+
+vital_signs_sample_rate = 20
+processing_data_size = 20 * vital_signs_sample_rate
+low_breathing = 0.15
+high_breathing = 0.6
+breathing_b = firwin(vital_signs_sample_rate + 1,
+                     [low_breathing / (vital_signs_sample_rate / 2), high_breathing / (vital_signs_sample_rate / 2)],
+                     pass_zero=False)
+
+
+def synthetic_breathing(rate_hz, rng):
+    t = np.arange(processing_data_size) / vital_signs_sample_rate
+    phase = rng.uniform(0, 2 * np.pi)
+    data = np.sin(2 * np.pi * rate_hz * t + phase) + 0.2 * np.sin(4 * np.pi * rate_hz * t + 2 * phase)
+    data += 0.3 * rng.standard_normal(processing_data_size)
+    return lfilter(breathing_b, 1, data)
+
+
+def run(trials=300):
+    rng = np.random.default_rng(0)
+    rates = rng.uniform(10, 30, trials) / 60
+    signals = [synthetic_breathing(rate, rng) for rate in rates]
+    print(f"{'FFT size':>9} {'method':>10} {'MAE bpm':>9} {'max bpm':>9} {'us/est':>8}")
+    for padding in (1, 2, 4, 8):
+        fft_size = processing_data_size * padding
+        index_start = int(low_breathing / vital_signs_sample_rate * fft_size)
+        index_end = int(high_breathing / vital_signs_sample_rate * fft_size)
+        for method in (None, 'quadratic', 'gaussian'):
+            errors = []
+            start = time.perf_counter()
+            for rate, data in zip(rates, signals):
+                spectrum = spectral.vital_signs_fft(data, fft_size, processing_data_size)
+                index, _ = spectral.estimate_spectral_peak(spectrum, index_start, index_end, 1, method)
+                errors.append(abs(index * vital_signs_sample_rate / fft_size - rate) * 60)
+            elapsed = (time.perf_counter() - start) / trials * 1e6
+            print(f"{fft_size:>9} {str(method):>10} {np.mean(errors):>9.3f} {np.max(errors):>9.3f} {elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
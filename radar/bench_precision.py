@@ -0,0 +1,85 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % Benchmark: float32 / complex64 DSP precision against the float64 reference.
+# % Synthetic FMCW frames (target at a fixed range, chest motion from breathing
+# % and heartbeat, receiver noise) go through the pipeline's range FFT, slow-time
+# % extraction, float64 unwrap, breathing / heart filters and spectra in both
+# % precisions. Reports rate and spectrum differences, time and buffer bytes.
+# % Usage: python bench_precision.py [trials]
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import sys
+import time
+
+import numpy as np
+from scipy.signal import firwin, lfilter
+
+import spectral
+
+vital_signs_sample_rate = 20
+processing_data_size = 20 * vital_signs_sample_rate
+fft_size_vital_signs = 2 * processing_data_size
+num_rx_antennas = 3
+number_of_chirps = 1
+samples_per_chirp = 64
+fft_size_range_profile = 2 * samples_per_chirp
+wavelength = 3e8 / 60.75e9
+nyquist_freq = 0.5 * vital_signs_sample_rate
+breathing_b = firwin(vital_signs_sample_rate + 1, [0.15 / nyquist_freq, 0.6 / nyquist_freq], pass_zero=False)
+heart_b = firwin(vital_signs_sample_rate + 1, [0.85 / nyquist_freq, 2.4 / nyquist_freq], pass_zero=False)
+index_start_breathing = int(0.15 / vital_signs_sample_rate * fft_size_vital_signs)
+index_end_breathing = int(0.6 / vital_signs_sample_rate * fft_size_vital_signs)
+
+
+def synthetic_frames(breathing_hz, heart_hz, rng):
+    """(frames x antennas x chirps x samples) IF samples of one target whose range moves with the chest."""
+    t = np.arange(processing_data_size) / vital_signs_sample_rate
+    displacement = 4e-3 * np.sin(2 * np.pi * breathing_hz * t) + 2e-4 * np.sin(2 * np.pi * heart_hz * t)
+    phase = 4 * np.pi * displacement / wavelength
+    beat = 2 * np.pi * 12 / fft_size_range_profile  # target in range bin 12
+    n = np.arange(samples_per_chirp)
+    antenna_phase = rng.uniform(0, 2 * np.pi, num_rx_antennas)
+    frames = np.cos(beat * n[None, None, None, :] + phase[:, None, None, None] +
+                    antenna_phase[None, :, None, None])
+    frames = frames * 0.05 + 0.5
+    frames += 0.01 * rng.standard_normal(frames.shape)
+    return np.repeat(frames, number_of_chirps, axis=2)
+
+
+def run_chain(frames, real_dtype):
+    profiles = spectral.range_fft(frames, fft_size_range_profile, num_rx_antennas, real_dtype)
+    peak_bin = int(np.argmax(np.mean(np.abs(profiles), axis=0)))
+    slow_time = profiles[:, peak_bin]
+    # Phase accumulation in float64 regardless of the DSP precision
+    unwrapped_phase = np.unwrap(np.angle(slow_time).astype(np.float64))
+    filtered_breathing = lfilter(breathing_b, 1, unwrapped_phase).astype(real_dtype)
+    filtered_heart = lfilter(heart_b, 1, unwrapped_phase).astype(real_dtype)
+    breathing_fft = spectral.vital_signs_fft(filtered_breathing, fft_size_vital_signs, processing_data_size,
+                                             dtype=real_dtype)
+    heart_fft = spectral.vital_signs_fft(filtered_heart, fft_size_vital_signs, processing_data_size,
+                                         dtype=real_dtype)
+    index, _ = spectral.estimate_spectral_peak(breathing_fft, index_start_breathing, index_end_breathing)
+    rate_bpm = index * vital_signs_sample_rate / fft_size_vital_signs * 60
+    buffer_bytes = slow_time.nbytes + filtered_breathing.nbytes + filtered_heart.nbytes + \
+        breathing_fft.nbytes + heart_fft.nbytes + unwrapped_phase.nbytes
+    return rate_bpm, breathing_fft, heart_fft, buffer_bytes
+
+
+def run(trials=50):
+    rng = np.random.default_rng(0)
+    cases = [synthetic_frames(rng.uniform(10, 30) / 60, rng.uniform(60, 100) / 60, rng) for _ in range(trials)]
+    reference = [run_chain(frames, np.float64) for frames in cases]
+    print(f"{'precision':>9} {'rate diff bpm':>14} {'spectrum rel err':>17} {'ms/window':>10} {'buffer bytes':>13}")
+    for real_dtype in (np.float64, np.float32):
+        rate_diffs, spectrum_errors = [], []
+        start = time.perf_counter()
+        results = [run_chain(frames, real_dtype) for frames in cases]
+        elapsed = (time.perf_counter() - start) / trials * 1e3
+        for (rate, breathing_fft, heart_fft, _), (ref_rate, ref_breathing, ref_heart, _) in zip(results, reference):
+            rate_diffs.append(abs(rate - ref_rate))
+            spectrum_errors.append(max(np.max(np.abs(breathing_fft - ref_breathing)) / np.max(ref_breathing),
+                                       np.max(np.abs(heart_fft - ref_heart)) / np.max(ref_heart)))
+        print(f"{np.dtype(real_dtype).name:>9} {np.max(rate_diffs):>14.2e} {np.max(spectrum_errors):>17.2e} "
+              f"{elapsed:>10.2f} {results[0][3]:>13}")
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
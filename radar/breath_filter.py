@@ -0,0 +1,92 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % Low-latency breathing filter for the /amplitude (LED) stream.
+# % The default chain re-filters the processing window with a linear-phase
+# % firwin each pass, delaying the breath by (filter_order - 1) / 2 samples.
+# % Here the band-pass is an IIR (Butterworth, second-order sections) run on
+# % the new samples only, with its state (zi) kept between passes, and an
+# % optional short-horizon predictor advances the output by the measured
+# % pipeline delay.
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import numpy as np
+from scipy.signal import butter, sosfilt, sosfilt_zi, sosfreqz
+
+
+class LowLatencyBreathFilter:
+    """
+    Streaming band-pass with persisted state. push() filters only the new samples.
+    The input is the unwrapped phase, so a re-anchor (the whole history shifted by a
+    constant) must shift the state too: shift(offset) subtracts offset * sosfilt_zi,
+    the state a constant unit input settles to, and the output continues unchanged.
+    """
+
+    def __init__(self, low, high, sample_rate, order=2):
+        """order: Butterworth prototype order, the band-pass has 2 * order poles."""
+        self.sample_rate = sample_rate
+        self.order = order
+        self.set_band(low, high)
+
+    def set_band(self, low, high, history=None):
+        """Redesign for a new band; the state is rebuilt by filtering history (recent input) if given."""
+        sos = butter(self.order, [low, high], btype='bandpass', fs=self.sample_rate, output='sos')
+        unit_zi = sosfilt_zi(sos)
+        zi = None
+        if history is not None and len(history):
+            _, zi = sosfilt(sos, history, zi=unit_zi * history[0])
+        self.low, self.high = low, high
+        self.sos, self.unit_zi, self.zi = sos, unit_zi, zi
+
+    def reset(self):
+        self.zi = None
+
+    def push(self, samples):
+        samples = np.asarray(samples, dtype=float)
+        if len(samples) == 0:
+            return samples
+        if self.zi is None:
+            # Start as if the first sample had always been there: no step transient
+            self.zi = self.unit_zi * samples[0]
+        filtered, self.zi = sosfilt(self.sos, samples, zi=self.zi)
+        return filtered
+
+    def shift(self, offset):
+        """The input history moved by -offset (re-anchor): keep the output continuous."""
+        if self.zi is not None:
+            self.zi = self.zi - offset * self.unit_zi
+
+    def phase_delay(self, frequency):
+        """Phase delay (seconds) of the filter at frequency Hz; negative means a phase lead."""
+        _, response = sosfreqz(self.sos, worN=[frequency], fs=self.sample_rate)
+        return float(-np.angle(response[0]) / (2 * np.pi * frequency))
+
+
+class BreathPhasePredictor:
+    """
+    Advance a narrow-band breathing signal by tau seconds, treating it locally as a
+    sinusoid at the current breathing frequency w:
+        x(t + tau) ~ x(t) cos(w tau) + x'(t) / w sin(w tau)
+    x'/w comes from the previous sample, x[n-1] = x cos(w dt) - x'/w sin(w dt), which is
+    exact for a sinusoid (a plain backward difference would lag by half a sample).
+    """
+
+    def __init__(self, sample_rate, max_horizon=1.0):
+        self.sample_rate = sample_rate
+        self.max_horizon = max_horizon
+        self.previous = None
+
+    def reset(self):
+        self.previous = None
+
+    def predict(self, samples, frequency, horizon):
+        """Predicted value of the newest sample horizon seconds ahead (the newest sample unchanged without a rate)."""
+        samples = np.asarray(samples, dtype=float)
+        if len(samples) == 0:
+            return None
+        previous = samples[-2] if len(samples) > 1 else self.previous
+        self.previous = samples[-1]
+        if previous is None or not frequency or frequency <= 0:
+            return float(samples[-1])
+        omega = 2 * np.pi * frequency
+        step = omega / self.sample_rate
+        quadrature = (samples[-1] * np.cos(step) - previous) / np.sin(step)  # x' / w
+        tau = float(np.clip(horizon, -self.max_horizon, self.max_horizon))
+        return float(samples[-1] * np.cos(omega * tau) + quadrature * np.sin(omega * tau))
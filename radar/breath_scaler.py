@@ -0,0 +1,80 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % Streaming 0-100 scaler for the /amplitude breath channel.
+# % Moving-average detrend with a running sum and monotonic-deque min / max,
+# % so each sample costs O(1) whatever the window length.
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+from collections import deque
+
+import numpy as np
+
+
+class StreamingBreathScaler:
+    """
+    Scale the latest filtered breath value to 0-100 against the min / max of the
+    last `window` detrended values. Detrending subtracts the moving average of the
+    last `detrend_size` raw values (0 = no detrend, for already band-passed input).
+    Returns None until `window` samples were seen.
+    """
+
+    def __init__(self, window=100, detrend_size=25):
+        self.window = window
+        self.detrend_size = detrend_size
+        self.reset()
+
+    def reset(self):
+        self.count = 0
+        self.raw = deque(maxlen=self.detrend_size)
+        self.raw_sum = 0.0
+        self.history = deque(maxlen=self.window)  # raw values, only used for checkpoints
+        self.min_deque = deque()  # (index, value), values increasing
+        self.max_deque = deque()  # (index, value), values decreasing
+
+    def update(self, value):
+        value = float(value)
+        if not np.isfinite(value):
+            return 0
+        self.history.append(value)
+        detrended = value
+        if self.detrend_size:
+            if len(self.raw) == self.detrend_size:
+                self.raw_sum -= self.raw[0]
+            self.raw.append(value)
+            self.raw_sum += value
+            if self.count % self.detrend_size == 0:
+                # Re-sum once per detrend window, O(1) amortised, to stop float drift
+                self.raw_sum = sum(self.raw)
+            detrended = value - self.raw_sum / len(self.raw)
+
+        index = self.count
+        self.count += 1
+        while self.min_deque and self.min_deque[-1][1] >= detrended:
+            self.min_deque.pop()
+        self.min_deque.append((index, detrended))
+        while self.max_deque and self.max_deque[-1][1] <= detrended:
+            self.max_deque.pop()
+        self.max_deque.append((index, detrended))
+        oldest = index - self.window + 1
+        if self.min_deque[0][0] < oldest:
+            self.min_deque.popleft()
+        if self.max_deque[0][0] < oldest:
+            self.max_deque.popleft()
+
+        if self.count < self.window:
+            return None  # Wait until the window fills
+        min_breath = self.min_deque[0][1]
+        max_breath = self.max_deque[0][1]
+        if max_breath - min_breath < 1e-5:
+            return 0  # avoid divide by zero, return 0
+        scaled = (detrended - min_breath) / (max_breath - min_breath) * 100
+        if not np.isfinite(scaled):
+            return 0
+        return float(np.clip(scaled, 0, 100))
+
+    def get_state(self):
+        """Last `window` raw values; enough to rebuild the scaler with set_state."""
+        return np.array(self.history, dtype=float)
+
+    def set_state(self, values):
+        self.reset()
+        for value in values:
+            self.update(value)
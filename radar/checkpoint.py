@@ -0,0 +1,40 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % Pipeline state checkpoints for warm starts.
+# % The state is a flat dict of numpy arrays / scalars stored as one .npz file.
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import os
+import time
+
+import numpy as np
+
+
+def save_checkpoint(path, state):
+    """
+    Write `state` to `path` atomically (temporary file + rename), so a crash
+    while saving never leaves a half-written checkpoint behind.
+    """
+    state = dict(state)
+    state['saved_at'] = time.time()
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as file:
+        np.savez(file, **{key: np.asarray(value) for key, value in state.items()})
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path, max_age=None):
+    """
+    Load a checkpoint written by save_checkpoint.
+    Returns None if the file does not exist, cannot be read, or is older than
+    `max_age` seconds.
+    """
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            state = {key: data[key] for key in data.files}
+    except Exception as e:
+        print(f"[Checkpoint] could not load {path}: {e}")
+        return None
+    if max_age is not None and time.time() - float(state.get('saved_at', 0)) > max_age:
+        return None
+    return state
@@ -0,0 +1,49 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % Localhost UDP control sockets shared by the profiler and the DSP plan.
+# % A datagram is either an OSC message (/<prefix>command arg ...) or text
+# % ("command arg ..."); both are parsed to (command, params) and handed to
+# % the owner's handler. Malformed datagrams and rejected arguments are logged
+# % and skipped, the listener thread keeps running.
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import socket
+import threading
+
+from pythonosc.osc_message import OscMessage, ParseError
+
+# Raised by parsing or by a handler for a message that cannot be applied
+REJECTED = (ParseError, ValueError, IndexError, TypeError)
+
+
+def parse_control_message(data, osc_prefix='/'):
+    """(command, params) of an OSC message under osc_prefix or a text command, else None."""
+    if OscMessage.dgram_is_message(data):
+        message = OscMessage(data)
+        if not message.address.startswith(osc_prefix):
+            return None
+        return message.address[len(osc_prefix):], list(message.params)
+    words = data.decode('utf-8', errors='replace').split()
+    if not words:
+        return None
+    return words[0], words[1:]
+
+
+def start_control_socket(handle, port, name, osc_prefix='/', host='127.0.0.1'):
+    """
+    Bind a UDP socket on host:port and call handle(command, params) for every message from a
+    listener thread; the thread blocks in recvfrom, so it costs nothing idle. Returns the socket.
+    """
+    control_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    control_socket.bind((host, port))
+
+    def listen():
+        while True:
+            data, _ = control_socket.recvfrom(1024)
+            try:
+                parsed = parse_control_message(data, osc_prefix)
+                if parsed is not None:
+                    handle(*parsed)
+            except REJECTED as e:
+                print(f"[{name}] rejected control message {data[:64]!r}: {e}")
+
+    threading.Thread(target=listen, name=f"{name.lower().replace(' ', '-')}-control", daemon=True).start()
+    return control_socket
@@ -0,0 +1,241 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % Incremental hourly / daily analytics over breathlog_*.csv and events_*.csv.
+# % Rollups per desk (sub-folder of the log root, one per device) and local
+# % hour: focus minutes, interventions, breathing-rate histogram (percentiles)
+# % and per-minute BRV histogram. Byte-offset watermarks per file are stored
+# % with the rollups, so each run only reads rows written since the last one.
+# % Usage: python daily_analytics.py [log_root]
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import csv
+import io
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+RATE_BINS = 61  # 0..60 b.p.m., 1 b.p.m. bins (logged rates are integers)
+BRV_BIN_WIDTH = 0.25  # b.p.m.
+BRV_BINS = 40  # 0..10 b.p.m.
+BRV_MIN_SAMPLES = 10  # logged seconds needed for a per-minute BRV value
+OPEN_MINUTE_TIMEOUT = 120  # seconds without writes before a log's last minute is closed
+STATE_VERSION = 1
+
+
+def new_bucket():
+    return {'focus_seconds': 0.0, 'interventions': 0, 'intervention_seconds': 0.0, 'samples': 0,
+            'rate_sum': 0.0, 'rate_hist': [0] * RATE_BINS, 'brv_hist': [0] * BRV_BINS}
+
+
+def local_hours(timestamps):
+    """Local hour number (hours since the epoch in local wall time) of each timestamp."""
+    timestamps = np.asarray(timestamps, dtype=float)
+    utc_hours = np.floor(timestamps / 3600).astype(np.int64)
+    offsets = {hour: datetime.fromtimestamp(hour * 3600).astimezone().utcoffset().total_seconds()
+               for hour in np.unique(utc_hours).tolist()}
+    offset = np.array([offsets[hour] for hour in utc_hours.tolist()]) if len(utc_hours) else np.zeros(0)
+    return np.floor((timestamps + offset) / 3600).astype(np.int64)
+
+
+def hour_key(local_hour):
+    return datetime.fromtimestamp(int(local_hour) * 3600, timezone.utc).strftime('%Y-%m-%d %H')
+
+
+def read_new_rows(path, offset):
+    """Complete CSV rows written after byte offset (header skipped). Returns (rows, new_offset)."""
+    with open(path, 'rb') as file:
+        file.seek(offset)
+        data = file.read()
+    end = data.rfind(b'\n') + 1
+    rows = [row for row in csv.reader(io.StringIO(data[:end].decode('utf-8', errors='replace')))
+            if row and row[0] != 'timestamp']
+    return rows, offset + end
+
+
+def histogram_percentile(histogram, q, bin_width=1.0, centred=False):
+    histogram = np.asarray(histogram)
+    total = histogram.sum()
+    if total == 0:
+        return np.nan
+    index = int(np.searchsorted(np.cumsum(histogram), q * total))
+    return (index + (0.5 if centred else 0.0)) * bin_width
+
+
+class DailyAnalytics:
+    def __init__(self, log_root, state_path=None):
+        self.log_root = log_root
+        self.state_path = state_path or os.path.join(log_root, '.analytics_state.json')
+        self.state = {'version': STATE_VERSION, 'watermarks': {}, 'open_minutes': {}, 'hourly': {}}
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as file:
+                state = json.load(file)
+            if state.get('version') == STATE_VERSION:
+                self.state = state
+        except (OSError, ValueError):
+            pass
+
+    def bucket(self, desk, local_hour):
+        return self.state['hourly'].setdefault(desk, {}).setdefault(hour_key(local_hour), new_bucket())
+
+    def update(self, now=None):
+        """Read everything written since the last run; returns the number of new rows."""
+        now = time.time() if now is None else now
+        new_rows = 0
+        for root, _, names in os.walk(self.log_root):
+            desk = os.path.relpath(root, self.log_root)
+            desk = os.path.basename(os.path.abspath(self.log_root)) if desk == '.' else desk
+            for name in sorted(names):
+                is_breathlog = name.startswith('breathlog_') and name.endswith('.csv')
+                is_events = name.startswith('events_') and name.endswith('.csv')
+                if not (is_breathlog or is_events):
+                    continue
+                path = os.path.join(root, name)
+                key = os.path.relpath(path, self.log_root)
+                stat = os.stat(path)
+                mark = self.state['watermarks'].get(key, {'offset': 0})
+                if stat.st_size < mark['offset']:
+                    mark = {'offset': 0}  # rewritten file; its old rows stay in the rollups
+                rows, offset = [], mark['offset']
+                if stat.st_size > mark['offset']:
+                    rows, offset = read_new_rows(path, mark['offset'])
+                if is_breathlog:
+                    self.add_breathing(desk, key, rows)
+                    if not rows and now - stat.st_mtime > OPEN_MINUTE_TIMEOUT:
+                        self.close_minute(desk, key)
+                else:
+                    self.add_events(desk, rows)
+                self.state['watermarks'][key] = {'offset': offset}
+                new_rows += len(rows)
+        self.save()
+        return new_rows
+
+    def add_breathing(self, desk, key, rows):
+        parsed = []
+        for row in rows:
+            try:
+                parsed.append((float(row[0]), float(row[2])))
+            except (IndexError, ValueError):
+                continue
+        if not parsed:
+            return
+        timestamps, rates = np.array(parsed).T
+        hours = local_hours(timestamps)
+        rate_bins = np.clip(np.round(rates), 0, RATE_BINS - 1).astype(int)
+        unique_hours, hour_index = np.unique(hours, return_inverse=True)
+        histograms = np.bincount(hour_index * RATE_BINS + rate_bins,
+                                 minlength=len(unique_hours) * RATE_BINS).reshape(-1, RATE_BINS)
+        rate_sums = np.bincount(hour_index, weights=rates, minlength=len(unique_hours))
+        for i, local_hour in enumerate(unique_hours):
+            bucket = self.bucket(desk, local_hour)
+            bucket['rate_hist'] = (np.array(bucket['rate_hist']) + histograms[i]).tolist()
+            bucket['samples'] += int(histograms[i].sum())
+            bucket['rate_sum'] += float(rate_sums[i])
+
+        # Per-minute moments; the newest minute stays open until later rows (or the timeout) close it
+        minutes = np.floor(timestamps / 60).astype(np.int64)
+        unique_minutes, minute_index = np.unique(minutes, return_inverse=True)
+        moments = np.stack([np.bincount(minute_index, minlength=len(unique_minutes)).astype(float),
+                            np.bincount(minute_index, weights=rates),
+                            np.bincount(minute_index, weights=rates ** 2)], axis=1)
+        open_minute = self.state['open_minutes'].pop(key, None)
+        if open_minute is not None:
+            if open_minute[0] == unique_minutes[0]:
+                moments[0] += open_minute[1:]
+            else:
+                self.add_brv(desk, open_minute)
+        for minute, moment in zip(unique_minutes[:-1], moments[:-1]):
+            self.add_brv(desk, [minute, *moment])
+        self.state['open_minutes'][key] = [int(unique_minutes[-1]), *moments[-1].tolist()]
+
+    def close_minute(self, desk, key):
+        open_minute = self.state['open_minutes'].pop(key, None)
+        if open_minute is not None:
+            self.add_brv(desk, open_minute)
+
+    def add_brv(self, desk, minute_moments):
+        minute, count, total, squares = minute_moments
+        if count < BRV_MIN_SAMPLES:
+            return
+        brv = np.sqrt(max(squares / count - (total / count) ** 2, 0.0))
+        bucket = self.bucket(desk, local_hours([minute * 60])[0])
+        bucket['brv_hist'][min(int(brv / BRV_BIN_WIDTH), BRV_BINS - 1)] += 1
+
+    def add_events(self, desk, rows):
+        for row in rows:
+            try:
+                timestamp, event = float(row[0]), row[2]
+                duration = float(row[3]) if len(row) > 3 and row[3] else 0.0
+            except (IndexError, ValueError):
+                continue
+            if event == 'intervention_start':
+                self.bucket(desk, local_hours([timestamp])[0])['interventions'] += 1
+            elif event in ('focus_end', 'intervention_stop'):
+                field = 'focus_seconds' if event == 'focus_end' else 'intervention_seconds'
+                self.add_interval(desk, timestamp - duration, timestamp, field)
+
+    def add_interval(self, desk, start, end, field):
+        """Split [start, end) over the local hours it covers."""
+        while start < end:
+            local_hour = local_hours([start])[0]
+            hour_end = min(end, (start // 3600 + 1) * 3600)
+            self.bucket(desk, local_hour)[field] += hour_end - start
+            start = hour_end
+
+    def save(self):
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.state, file)
+        os.replace(tmp_path, self.state_path)
+
+    # ~~~ reports ~~~
+    @staticmethod
+    def summarise(bucket):
+        samples = bucket['samples']
+        return {
+            'focus_minutes': round(bucket['focus_seconds'] / 60, 2),
+            'interventions': bucket['interventions'],
+            'intervention_minutes': round(bucket['intervention_seconds'] / 60, 2),
+            'samples': samples,
+            'rate_mean': round(bucket['rate_sum'] / samples, 2) if samples else np.nan,
+            'rate_p10': histogram_percentile(bucket['rate_hist'], 0.1),
+            'rate_p50': histogram_percentile(bucket['rate_hist'], 0.5),
+            'rate_p90': histogram_percentile(bucket['rate_hist'], 0.9),
+            'brv_minutes': sum(bucket['brv_hist']),
+            'brv_p50': histogram_percentile(bucket['brv_hist'], 0.5, BRV_BIN_WIDTH, centred=True),
+            'brv_p90': histogram_percentile(bucket['brv_hist'], 0.9, BRV_BIN_WIDTH, centred=True),
+        }
+
+    def hourly_rows(self):
+        return [{'desk': desk, 'hour': hour, **self.summarise(bucket)}
+                for desk, hours in sorted(self.state['hourly'].items()) for hour, bucket in sorted(hours.items())]
+
+    def daily_rows(self):
+        rows = []
+        for desk, hours in sorted(self.state['hourly'].items()):
+            days = {}
+            for hour, bucket in hours.items():
+                day = days.setdefault(hour[:10], new_bucket())
+                for field, value in bucket.items():
+                    day[field] = (np.add(day[field], value).tolist() if isinstance(value, list)
+                                  else day[field] + value)
+            rows += [{'desk': desk, 'day': day, **self.summarise(bucket)} for day, bucket in sorted(days.items())]
+        return rows
+
+    def write_reports(self, folder=None):
+        folder = folder or self.log_root
+        for name, rows in (('analytics_hourly.csv', self.hourly_rows()), ('analytics_daily.csv', self.daily_rows())):
+            if not rows:
+                continue
+            with open(os.path.join(folder, name), 'w', newline='') as file:
+                writer = csv.DictWriter(file, fieldnames=list(rows[0]))
+                writer.writeheader()
+                writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    analytics = DailyAnalytics(sys.argv[1] if len(sys.argv) > 1 else '.')
+    start = time.perf_counter()
+    print(f"{analytics.update()} new rows in {time.perf_counter() - start:.2f} s")
+    analytics.write_reports()
@@ -0,0 +1,143 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % DSP plans: the tunable processing parameters (breathing / heart bands,
+# % range gate) together with everything derived from them (FIR taps, spectrum
+# % band indices, range-bin limits), built once per configuration (memoised)
+# % and immutable. The processor takes one plan per pass, so a change from the
+# % GUI, the plan file or a control message is applied whole between frames.
+# % Plan file: JSON with any of low_breathing, high_breathing, low_heart,
+# % high_heart, range_start, range_stop.
+# % Control messages (UDP, localhost): OSC /dsp/breathing low high,
+# % /dsp/heart low high, /dsp/range start stop, or the same as text, e.g.
+# % "breathing 0.1 0.5".
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import json
+import os
+from dataclasses import dataclass, replace
+from functools import lru_cache
+
+import numpy as np
+from scipy.signal import firwin
+
+from control_socket import start_control_socket
+
+TUNABLE = ('low_breathing', 'high_breathing', 'low_heart', 'high_heart', 'range_start', 'range_stop')
+COMMANDS = {'breathing': ('low_breathing', 'high_breathing'),
+            'heart': ('low_heart', 'high_heart'),
+            'range': ('range_start', 'range_stop')}
+
+
+@dataclass(frozen=True)
+class DspConfig:
+    """Everything a plan is derived from; hashable, so it is the memoisation key."""
+    low_breathing: float  # Hz
+    high_breathing: float
+    low_heart: float
+    high_heart: float
+    range_start: float  # m
+    range_stop: float
+    sample_rate: float  # Hz, vital-signs rate
+    filter_order: int  # FIR taps
+    fft_size_vital_signs: int
+    fft_size_range_profile: int
+    max_range: float  # m
+
+
+@dataclass(frozen=True, eq=False)
+class DspPlan:
+    """Derived parameters of one DspConfig; taps are read-only arrays shared by every user of the plan."""
+    config: DspConfig
+    breathing_b: np.ndarray
+    heart_b: np.ndarray
+    index_start_breathing: int
+    index_end_breathing: int
+    index_start_heart: int
+    index_end_heart: int
+    start_index_range: int
+    stop_index_range: int
+
+    def with_changes(self, **changes):
+        """Plan for this configuration with some tunables changed (memoised)."""
+        return make_dsp_plan(replace(self.config, **changes))
+
+
+def _band_taps(config, low, high):
+    nyquist = 0.5 * config.sample_rate
+    taps = firwin(config.filter_order, [low / nyquist, high / nyquist], pass_zero=False)
+    taps.flags.writeable = False
+    return taps
+
+
+def _spectrum_index(config, frequency):
+    return int(frequency / config.sample_rate * config.fft_size_vital_signs)
+
+
+def _range_bin(config, distance):
+    return int(distance / config.max_range * config.fft_size_range_profile / 2)
+
+
+@lru_cache(maxsize=64)
+def make_dsp_plan(config):
+    nyquist = 0.5 * config.sample_rate
+    for name, low, high in (('breathing', config.low_breathing, config.high_breathing),
+                            ('heart', config.low_heart, config.high_heart)):
+        if not 0 < low < high < nyquist:
+            raise ValueError(f"Invalid {name} band {low}-{high} Hz (0 < low < high < {nyquist} Hz)")
+    start_index_range = _range_bin(config, config.range_start)
+    stop_index_range = min(_range_bin(config, config.range_stop), config.fft_size_range_profile // 2)
+    if not 0 <= start_index_range < stop_index_range:
+        raise ValueError(f"Invalid range gate {config.range_start}-{config.range_stop} m")
+    return DspPlan(config=config,
+                   breathing_b=_band_taps(config, config.low_breathing, config.high_breathing),
+                   heart_b=_band_taps(config, config.low_heart, config.high_heart),
+                   index_start_breathing=_spectrum_index(config, config.low_breathing),
+                   index_end_breathing=_spectrum_index(config, config.high_breathing),
+                   index_start_heart=_spectrum_index(config, config.low_heart),
+                   index_end_heart=_spectrum_index(config, config.high_heart),
+                   start_index_range=start_index_range,
+                   stop_index_range=stop_index_range)
+
+
+def parse_plan_changes(values):
+    """Tunable changes from a dict (plan file); unknown keys raise ValueError."""
+    unknown = [key for key in values if key not in TUNABLE]
+    if unknown:
+        raise ValueError(f"Unknown DSP parameters {unknown}")
+    return {key: float(value) for key, value in values.items()}
+
+
+def parse_plan_command(command, params):
+    """Changes requested by a breathing / heart / range control command, else None."""
+    if command not in COMMANDS:
+        return None
+    low, high = (float(value) for value in params[:2])
+    return dict(zip(COMMANDS[command], (low, high)))
+
+
+class PlanFile:
+    """A JSON plan file checked by modification time; poll() returns its changes when it was (re)written."""
+
+    def __init__(self, path):
+        self.path = path
+        self.mtime = None
+
+    def poll(self):
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return None
+        if mtime == self.mtime:
+            return None
+        self.mtime = mtime
+        with open(self.path) as f:
+            return parse_plan_changes(json.load(f))
+
+
+def start_plan_listener(apply_changes, port, host='127.0.0.1'):
+    """UDP control socket on localhost; apply_changes(**changes) is called from the listener thread."""
+
+    def handle(command, params):
+        changes = parse_plan_command(command, params)
+        if changes is not None:
+            apply_changes(**changes)
+
+    return start_control_socket(handle, port, 'DSP plan', osc_prefix='/dsp/', host=host)
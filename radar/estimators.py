@@ -0,0 +1,150 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % Breathing-rate estimators behind one interface.
+# % 'fft'           : spectral peak of the filtered breathing window (default)
+# % 'zero_crossing' : time-domain breath detection on the filtered breathing
+# %                   signal, O(1) per sample, with breath-by-breath intervals
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+from abc import ABC, abstractmethod
+from collections import deque
+
+import numpy as np
+
+import spectral
+
+
+class BreathingRateEstimator(ABC):
+    """
+    update(filtered_breathing, new_samples) is called once per processed frame with the
+    filtered breathing history (newest sample last) and the number of new samples in it.
+    It returns (rate_hz, confidence); rate_hz is 0 when there is no estimate yet.
+    """
+    # Spectrum of the last update, for estimators that compute one (None otherwise)
+    spectrum = None
+
+    @abstractmethod
+    def update(self, filtered_breathing, new_samples):
+        pass
+
+    @abstractmethod
+    def set_band(self, low_hz, high_hz):
+        pass
+
+    def reset(self):
+        pass
+
+    def pop_intervals(self):
+        """Breath-to-breath intervals (seconds) detected since the last call."""
+        return []
+
+
+class SpectralRateEstimator(BreathingRateEstimator):
+    """Strongest spectral peak in the breathing band, refined to a fractional bin."""
+
+    def __init__(self, sample_rate, processing_data_size, fft_size, low_hz, high_hz,
+                 peak_distance_hz=0.01, interpolation='gaussian', epsilon=1e-8):
+        self.sample_rate = sample_rate
+        self.processing_data_size = processing_data_size
+        self.fft_size = fft_size
+        self.distance_bins = peak_distance_hz * fft_size / sample_rate
+        self.interpolation = interpolation
+        self.epsilon = epsilon
+        self.set_band(low_hz, high_hz)
+
+    def set_band(self, low_hz, high_hz):
+        self.index_start = int(low_hz / self.sample_rate * self.fft_size)
+        self.index_end = int(high_hz / self.sample_rate * self.fft_size)
+
+    def update(self, filtered_breathing, new_samples):
+        self.spectrum = spectral.vital_signs_fft(filtered_breathing[-self.processing_data_size:], self.fft_size,
+                                                 self.processing_data_size, self.epsilon)
+        index, confidence = spectral.estimate_spectral_peak(self.spectrum, self.index_start, self.index_end,
+                                                            self.distance_bins, self.interpolation)
+        return index * self.sample_rate / self.fft_size, confidence
+
+
+class ZeroCrossingRateEstimator(BreathingRateEstimator):
+    """
+    Adaptive zero-crossing breath detector.
+    A breath is an upward crossing of +k*RMS after the signal went below -k*RMS, where mean and
+    RMS are exponential running values (the short FIR band-pass leaves part of the phase offset).
+    Intervals outside the breathing band are rejected.
+    The rate is 60 / mean of the last `average_breaths` intervals; confidence is
+    1 - coefficient of variation of those intervals.
+    """
+
+    def __init__(self, sample_rate, low_hz, high_hz, hysteresis=0.3, rms_time=10.0, average_breaths=4,
+                 max_intervals=64):
+        self.sample_rate = sample_rate
+        self.hysteresis = hysteresis
+        self.rms_alpha = 1 / (rms_time * sample_rate)
+        self.average_breaths = average_breaths
+        self.intervals = deque(maxlen=max_intervals)
+        self.set_band(low_hz, high_hz)
+        self.reset()
+
+    def set_band(self, low_hz, high_hz):
+        self.min_interval = 1 / high_hz
+        self.max_interval = 1 / low_hz
+
+    def reset(self):
+        self.sample_index = 0
+        self.mean = None
+        self.mean_square = None
+        self.armed = False
+        self.last_breath_index = None
+        self.intervals.clear()
+        self.new_intervals = []
+
+    def update(self, filtered_breathing, new_samples):
+        for value in filtered_breathing[len(filtered_breathing) - new_samples:]:
+            self.push(float(value))
+        return self.rate()
+
+    def push(self, value):
+        """Process one sample, O(1)."""
+        if self.mean is None:
+            self.mean = value
+            self.mean_square = 0.0
+        else:
+            self.mean += self.rms_alpha * (value - self.mean)
+        value -= self.mean
+        self.mean_square += self.rms_alpha * (value * value - self.mean_square)
+        threshold = self.hysteresis * np.sqrt(self.mean_square)
+        if value < -threshold:
+            self.armed = True
+        elif self.armed and value > threshold:
+            self.armed = False
+            if self.last_breath_index is not None:
+                interval = (self.sample_index - self.last_breath_index) / self.sample_rate
+                if self.min_interval <= interval <= self.max_interval:
+                    self.intervals.append(interval)
+                    self.new_intervals.append(interval)
+            self.last_breath_index = self.sample_index
+        self.sample_index += 1
+        # No breath for longer than the slowest allowed interval: the rate is stale
+        if self.last_breath_index is not None and \
+                (self.sample_index - self.last_breath_index) / self.sample_rate > 2 * self.max_interval:
+            self.intervals.clear()
+            self.last_breath_index = None
+
+    def rate(self):
+        if len(self.intervals) < self.average_breaths:
+            return 0, 0.0
+        recent = np.array(self.intervals)[-self.average_breaths:]
+        mean_interval = float(np.mean(recent))
+        confidence = float(np.clip(1 - np.std(recent) / mean_interval, 0.0, 1.0))
+        return 1 / mean_interval, confidence
+
+    def pop_intervals(self):
+        intervals, self.new_intervals = self.new_intervals, []
+        return intervals
+
+
+def create_breathing_estimator(name, sample_rate, processing_data_size, fft_size, low_hz, high_hz,
+                               peak_distance_hz=0.01, interpolation='gaussian'):
+    if name == 'fft':
+        return SpectralRateEstimator(sample_rate, processing_data_size, fft_size, low_hz, high_hz,
+                                     peak_distance_hz, interpolation)
+    if name == 'zero_crossing':
+        return ZeroCrossingRateEstimator(sample_rate, low_hz, high_hz)
+    raise ValueError(f"Unknown breathing rate estimator: {name}")
@@ -0,0 +1,51 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % Persistent event log for presence (focus) sessions and BRV interventions.
+# % One append-only CSV per day (events_YYYYMMDD.csv) next to the breathlogs:
+# % timestamp, readable_time, event, duration (seconds, end events only).
+# % Events: focus_start / focus_end, intervention_start / intervention_stop,
+# % acquisition_gap (device reconnect, duration = time without frames).
+# % daily_analytics.py rolls these up incrementally.
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import csv
+import os
+import time
+from datetime import datetime
+
+EVENT_FIELDS = ['timestamp', 'readable_time', 'event', 'duration']
+
+
+class EventLog:
+    def __init__(self, folder='.', clock=time.time):
+        self.folder = folder
+        self.clock = clock
+        self.file = None
+        self.writer = None
+        self.day = None
+
+    def _open(self, now):
+        day = datetime.fromtimestamp(now).strftime('%Y%m%d')
+        if day == self.day:
+            return
+        self.close()
+        path = os.path.join(self.folder, f"events_{day}.csv")
+        is_new = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.file = open(path, 'a', newline='')
+        self.writer = csv.writer(self.file)
+        if is_new:
+            self.writer.writerow(EVENT_FIELDS)
+        self.day = day
+
+    def log(self, event, duration=None, timestamp=None):
+        """Append one event; rare, so every row is flushed."""
+        now = self.clock() if timestamp is None else timestamp
+        self._open(now)
+        readable_time = datetime.fromtimestamp(now).strftime('%Y-%m-%d %H:%M:%S')
+        self.writer.writerow([f"{now:.3f}", readable_time, event, '' if duration is None else f"{duration:.1f}"])
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+        self.file = None
+        self.writer = None
+        self.day = None
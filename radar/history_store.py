@@ -0,0 +1,135 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % Tiered (multi-resolution) history for long plots and BRV windows.
+# % Each tier is a ring of fixed-width time buckets holding count, sum, sum of
+# % squares, min and max, so a whole work session fits in bounded memory:
+# % the fine tier covers the last minutes at full rate, coarser tiers cover
+# % hours and days. append() touches one bucket per tier (O(1)); range
+# % queries read the finest tier that still covers the range.
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import numpy as np
+
+
+class HistoryTier:
+    """`capacity` buckets of `width` seconds; slot = bucket number % capacity."""
+
+    def __init__(self, width, capacity):
+        self.width = float(width)
+        self.capacity = int(capacity)
+        self.buckets = np.full(self.capacity, -1, dtype=np.int64)  # absolute bucket number per slot
+        self.count = np.zeros(self.capacity, dtype=np.int64)
+        self.total = np.zeros(self.capacity)
+        self.total_sq = np.zeros(self.capacity)
+        self.minimum = np.zeros(self.capacity)
+        self.maximum = np.zeros(self.capacity)
+
+    @property
+    def span(self):
+        """Seconds of history the tier holds."""
+        return self.width * self.capacity
+
+    def append(self, timestamp, value):
+        bucket = int(timestamp // self.width)
+        slot = bucket % self.capacity
+        if self.buckets[slot] != bucket:
+            # Bucket reuse: the slot held data from `capacity` buckets ago (or nothing)
+            self.buckets[slot] = bucket
+            self.count[slot] = 0
+            self.total[slot] = self.total_sq[slot] = 0.0
+            self.minimum[slot] = self.maximum[slot] = value
+        self.count[slot] += 1
+        self.total[slot] += value
+        self.total_sq[slot] += value * value
+        if value < self.minimum[slot]:
+            self.minimum[slot] = value
+        elif value > self.maximum[slot]:
+            self.maximum[slot] = value
+
+    def select(self, start, end):
+        """Slots of the non-empty buckets overlapping [start, end], oldest first."""
+        first, last = int(start // self.width), int(end // self.width)
+        first = max(first, last - self.capacity + 1)
+        buckets = np.arange(first, last + 1)
+        slots = buckets % self.capacity
+        valid = (self.buckets[slots] == buckets) & (self.count[slots] > 0)
+        return slots[valid]
+
+
+class TieredHistory:
+    """
+    tiers: (bucket width in seconds, number of buckets) per tier, finest first, e.g.
+    ((0.05, 6000), (1, 3600), (10, 4320), (60, 10080)): 5 min at 20 Hz, 1 h at 1 s,
+    12 h at 10 s and a week at 1 min (~1.2 MB per series).
+    """
+
+    def __init__(self, tiers):
+        self.tiers = [HistoryTier(width, capacity) for width, capacity in tiers]
+        self.last_time = None
+
+    def append(self, timestamp, value):
+        value = float(value)
+        if not np.isfinite(value):
+            return
+        for tier in self.tiers:
+            tier.append(timestamp, value)
+        self.last_time = timestamp
+
+    def tier_for(self, start, end=None, max_points=None):
+        """Finest tier that still holds start and, with max_points, needs no more buckets than that."""
+        end = self.last_time if end is None else end
+        for tier in self.tiers:
+            covers = end is None or end - start <= tier.span
+            if covers and (max_points is None or (end - start) / tier.width <= max_points):
+                return tier
+        return self.tiers[-1]
+
+    def query(self, start, end=None, max_points=None):
+        """
+        Per-bucket (times, mean, minimum, maximum, count) over [start, end]; times are bucket
+        centres. Empty buckets (no samples, e.g. nobody present) are left out.
+        """
+        end = self.last_time if end is None else end
+        if end is None:
+            empty = np.zeros(0)
+            return empty, empty, empty, empty, np.zeros(0, dtype=np.int64)
+        tier = self.tier_for(start, end, max_points)
+        slots = tier.select(start, end)
+        count = tier.count[slots]
+        times = (tier.buckets[slots] + 0.5) * tier.width
+        return times, tier.total[slots] / count, tier.minimum[slots], tier.maximum[slots], count
+
+    def stats(self, start, end=None):
+        """
+        Count, mean, (population) std, min and max of the samples in [start, end], from the
+        finest covering tier; the range is widened to whole buckets. None without samples.
+        """
+        end = self.last_time if end is None else end
+        if end is None:
+            return None
+        tier = self.tier_for(start, end)
+        slots = tier.select(start, end)
+        count = int(tier.count[slots].sum())
+        if count == 0:
+            return None
+        mean = tier.total[slots].sum() / count
+        variance = max(tier.total_sq[slots].sum() / count - mean * mean, 0.0)
+        return {'count': count, 'mean': float(mean), 'std': float(np.sqrt(variance)),
+                'min': float(tier.minimum[slots].min()), 'max': float(tier.maximum[slots].max())}
+
+    def get_state(self):
+        """Compact state as a dict of numpy arrays, used for pipeline checkpoints."""
+        state = {}
+        for i, tier in enumerate(self.tiers):
+            for name in ('buckets', 'count', 'total', 'total_sq', 'minimum', 'maximum'):
+                state[f'{i}/{name}'] = getattr(tier, name).copy()
+        state['last_time'] = np.nan if self.last_time is None else self.last_time
+        return state
+
+    def set_state(self, state):
+        for i, tier in enumerate(self.tiers):
+            if len(state[f'{i}/buckets']) != tier.capacity:
+                raise ValueError("History state does not match the configured tiers")
+        for i, tier in enumerate(self.tiers):
+            for name in ('buckets', 'count', 'total', 'total_sq', 'minimum', 'maximum'):
+                getattr(tier, name)[:] = state[f'{i}/{name}']
+        last_time = float(state['last_time'])
+        self.last_time = None if np.isnan(last_time) else last_time
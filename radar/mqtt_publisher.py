@@ -0,0 +1,136 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % Rate-limited, change-driven MQTT publishing for Home Assistant.
+# % The network loop runs in paho's background thread (automatic reconnect);
+# % each topic publishes only on change / past a deadband, at most once per
+# % min_interval, and always coalesces to the latest value.
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import threading
+import time
+
+
+class TopicPolicy:
+    """
+    min_interval: seconds between publishes.
+    deadband: smallest numeric change worth sending; smaller changes are suppressed, a change of
+    exactly deadband is sent (deadband=1 with integer b.p.m. sends every 1 b.p.m. step).
+    """
+
+    def __init__(self, min_interval=1.0, deadband=0.0, retain=True, qos=0):
+        self.min_interval = min_interval
+        self.deadband = deadband
+        self.retain = retain
+        self.qos = qos
+
+
+class MqttPublisher:
+    """
+    publish(topic, value) never blocks: it stores the latest value per topic, and the value
+    is sent when it differs from the last sent one by at least the topic's deadband and
+    the topic's min_interval has elapsed. Values held back by the rate limit are sent by
+    flush(), which the background flusher calls every `tick` seconds; with start(flush_thread=False)
+    the owner calls flush() itself (e.g. as a periodic job on its event loop).
+
+    client: a paho-compatible client (connect_async, loop_start, loop_stop, disconnect,
+        publish, reconnect_delay_set, on_connect / on_disconnect). Pass a client pointed at
+        a local broker, or any stand-in with the same methods, for testing.
+    clock: monotonic time source, injectable for tests.
+    """
+
+    def __init__(self, client, policies=None, default_policy=None, tick=0.1, clock=time.monotonic):
+        self.client = client
+        self.policies = dict(policies or {})
+        self.default_policy = default_policy or TopicPolicy()
+        self.tick = tick
+        self.clock = clock
+        self.connected = False
+        self.pending = {}  # topic -> latest value not yet sent
+        self.last_sent = {}  # topic -> (value, time)
+        self.published = 0
+        self.suppressed = 0
+        self.lock = threading.Lock()
+        self.stopping = threading.Event()
+        self.flush_thread = None
+        client.on_connect = self._on_connect
+        client.on_disconnect = self._on_disconnect
+
+    def policy(self, topic):
+        return self.policies.get(topic, self.default_policy)
+
+    def start(self, host, port=1883, keepalive=60, flush_thread=True):
+        """
+        Connect in the background; paho's loop thread reconnects with backoff when the link drops.
+        flush_thread: start the background flusher; False when the caller schedules flush() every tick.
+        """
+        self.client.reconnect_delay_set(min_delay=1, max_delay=60)
+        self.client.connect_async(host, port, keepalive)
+        self.client.loop_start()
+        self.stopping.clear()
+        if flush_thread:
+            self.flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self.flush_thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        if self.flush_thread is not None:
+            self.flush_thread.join(timeout=2)
+            self.flush_thread = None
+        self.flush()
+        try:
+            self.client.disconnect()
+        finally:
+            self.client.loop_stop()
+
+    def publish(self, topic, value):
+        with self.lock:
+            self.pending[topic] = value
+            self._send_if_due(topic, self.clock())
+
+    def flush(self, now=None):
+        """Send every pending value whose rate limit has expired."""
+        now = self.clock() if now is None else now
+        with self.lock:
+            for topic in list(self.pending):
+                self._send_if_due(topic, now)
+
+    def _changed(self, topic, value):
+        if topic not in self.last_sent:
+            return True
+        last_value = self.last_sent[topic][0]
+        try:
+            change = abs(float(value) - float(last_value))
+        except (TypeError, ValueError):
+            return value != last_value
+        return change > 0 and change >= self.policy(topic).deadband
+
+    def _send_if_due(self, topic, now):
+        value = self.pending[topic]
+        if not self._changed(topic, value):
+            del self.pending[topic]
+            self.suppressed += 1
+            return
+        policy = self.policy(topic)
+        if not self.connected or \
+                (topic in self.last_sent and now - self.last_sent[topic][1] < policy.min_interval):
+            return  # keep only the latest value, flush() sends it later
+        self.client.publish(topic, str(value), qos=policy.qos, retain=policy.retain)
+        self.last_sent[topic] = (value, now)
+        del self.pending[topic]
+        self.published += 1
+
+    def _flush_loop(self):
+        while not self.stopping.wait(self.tick):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[MQTT] flush error: {e}")
+
+    def _on_connect(self, client, userdata, flags, reason_code, *args):
+        if reason_code == 0:
+            self.connected = True
+            print("[MQTT] connected")
+        else:
+            print(f"[MQTT] connection refused: {reason_code}")
+
+    def _on_disconnect(self, client, userdata, *args):
+        self.connected = False
+        print("[MQTT] disconnected, reconnecting in the background")
@@ -0,0 +1,175 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % Multi-target range-bin tracking for the Halfmind Flow radar pipeline.
+# % Several people in the range profile are followed by a fixed set of track
+# % slots, and the slow-time / unwrap / filter / spectrum chain runs on all
+# % slots at once as a 2-D (slot x slow-time) computation.
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import numpy as np
+import scipy.signal as signal
+from scipy.signal import lfilter
+
+from spectral import interpolate_peak
+
+
+class RangeBinTracker:
+    """
+    Detect and follow up to `max_targets` range bins between start_bin and stop_bin.
+    Each slot holds one track. A track is confirmed after `confirm_frames` hits and
+    dropped after `drop_frames` consecutive misses.
+    """
+
+    def __init__(self, max_targets=3, threshold_ratio=0.3, min_separation_bins=3, gate_bins=2,
+                 confirm_frames=10, drop_frames=40, smoothing_frames=40):
+        self.max_targets = max_targets
+        self.threshold_ratio = threshold_ratio
+        self.min_separation_bins = min_separation_bins
+        self.gate_bins = gate_bins
+        self.confirm_frames = confirm_frames
+        self.drop_frames = drop_frames
+        # EMA over ~smoothing_frames, same role as the 2 s mean of range_profile_peak_indices
+        self.alpha = 2 / (smoothing_frames + 1)
+        self.positions = np.zeros(max_targets)
+        self.hits = np.zeros(max_targets, dtype=int)
+        self.misses = np.zeros(max_targets, dtype=int)
+        self.in_use = np.zeros(max_targets, dtype=bool)
+        self.track_ids = np.zeros(max_targets, dtype=int)
+        self.next_track_id = 1
+
+    @property
+    def confirmed(self):
+        return self.in_use & (self.hits >= self.confirm_frames)
+
+    @property
+    def bins(self):
+        return np.round(self.positions).astype(int)
+
+    def detect(self, range_fft_abs, start_bin, stop_bin):
+        """Return detected peak bins in the region, strongest first, at least min_separation_bins apart."""
+        region = range_fft_abs[start_bin:stop_bin]
+        if len(region) < 3:
+            return np.zeros(0, dtype=int)
+        is_peak = (region[1:-1] > region[:-2]) & (region[1:-1] >= region[2:]) & \
+                  (region[1:-1] > self.threshold_ratio * np.max(region))
+        peaks = np.flatnonzero(is_peak) + 1
+        peaks = peaks[np.argsort(region[peaks])[::-1]]
+        selected = []
+        for peak in peaks:
+            if all(abs(peak - s) >= self.min_separation_bins for s in selected):
+                selected.append(peak)
+                if len(selected) == self.max_targets:
+                    break
+        return np.array(selected, dtype=int) + start_bin
+
+    def update(self, range_fft_abs, start_bin, stop_bin):
+        """
+        Associate this frame's detections with the existing tracks.
+        Returns a boolean array marking slots that were (re)started this frame.
+        """
+        detections = self.detect(range_fft_abs, start_bin, stop_bin)
+        claimed = np.zeros(len(detections), dtype=bool)
+        started = np.zeros(self.max_targets, dtype=bool)
+        # Nearest-neighbour association, strongest tracks (most hits) first
+        for slot in np.argsort(-self.hits):
+            if not self.in_use[slot]:
+                continue
+            if len(detections):
+                distance = np.abs(detections - self.positions[slot])
+                distance[claimed] = np.inf
+                best = int(np.argmin(distance))
+                if distance[best] <= self.gate_bins:
+                    claimed[best] = True
+                    self.positions[slot] += self.alpha * (detections[best] - self.positions[slot])
+                    self.hits[slot] += 1
+                    self.misses[slot] = 0
+                    continue
+            self.misses[slot] += 1
+            if self.misses[slot] >= self.drop_frames or self.hits[slot] < self.confirm_frames:
+                self.in_use[slot] = False
+        # Unclaimed detections start new tracks in free slots
+        free_slots = np.flatnonzero(~self.in_use)
+        for detection, slot in zip(detections[~claimed], free_slots):
+            self.positions[slot] = detection
+            self.hits[slot] = 1
+            self.misses[slot] = 0
+            self.in_use[slot] = True
+            self.track_ids[slot] = self.next_track_id
+            self.next_track_id += 1
+            started[slot] = True
+        # Keep tracks inside the selected range region
+        self.positions = np.clip(self.positions, start_bin, max(start_bin, stop_bin - 1))
+        return started
+
+
+class MultiTargetVitalSigns:
+    """
+    Slow-time history and breathing-rate estimation for all track slots at once.
+    Rows of the 2-D buffers are track slots, columns are slow-time samples.
+    dtype is the slow-time complex type; the unwrapped phase is always float64.
+    """
+
+    def __init__(self, max_targets, processing_data_size, fft_size, estimation_size, epsilon=1e-8,
+                 interpolation=None, dtype=np.complex128):
+        self.processing_data_size = processing_data_size
+        self.fft_size = fft_size
+        self.interpolation = interpolation
+        self.epsilon = epsilon
+        self.slow_time = np.zeros((max_targets, processing_data_size), dtype=dtype)
+        self.valid_samples = np.zeros(max_targets, dtype=int)
+        self.rate_indices = np.zeros((max_targets, estimation_size))
+        self.window = signal.windows.blackmanharris(processing_data_size)
+
+    def reset_slots(self, slots):
+        self.slow_time[slots] = 0
+        self.valid_samples[slots] = 0
+        self.rate_indices[slots] = 0
+
+    def push(self, range_fft_antennas_buffer, bins):
+        self.slow_time[:, :-1] = self.slow_time[:, 1:]
+        self.slow_time[:, -1] = range_fft_antennas_buffer[bins]
+        self.valid_samples = np.minimum(self.valid_samples + 1, self.processing_data_size)
+
+    def estimate(self, breathing_b, index_start, index_end):
+        """
+        Run unwrap, breathing filter and spectrum on every slot as one computation.
+        Returns the mean breathing-rate spectrum index per slot (0 where not enough data).
+        """
+        unwrapped_phase = np.unwrap(np.angle(self.slow_time).astype(np.float64), axis=1)
+        filtered_breathing = lfilter(breathing_b, 1, unwrapped_phase, axis=1)
+        spectrum = 1.0 / self.fft_size * np.abs(
+            np.fft.rfft(filtered_breathing * self.window, self.fft_size, axis=1)) + self.epsilon
+        rate_index = np.argmax(spectrum[:, index_start:index_end], axis=1) + index_start
+        if self.interpolation:
+            rate_index = interpolate_peak(spectrum, rate_index, self.interpolation)
+        self.rate_indices[:, :-1] = self.rate_indices[:, 1:]
+        self.rate_indices[:, -1] = np.where(self.valid_samples >= self.processing_data_size, rate_index, 0)
+        filled = np.all(self.rate_indices > 0, axis=1)
+        return np.where(filled, np.mean(self.rate_indices, axis=1), 0)
+
+
+class MultiTargetTracker:
+    """Range-bin tracker plus vectorised vital-signs chain for several people."""
+
+    def __init__(self, max_targets, processing_data_size, fft_size, estimation_size, interpolation=None,
+                 dtype=np.complex128, **tracker_kwargs):
+        self.tracker = RangeBinTracker(max_targets=max_targets, **tracker_kwargs)
+        self.vital_signs = MultiTargetVitalSigns(max_targets, processing_data_size, fft_size, estimation_size,
+                                                 interpolation=interpolation, dtype=dtype)
+
+    def update(self, range_fft_antennas_buffer, range_fft_abs, start_bin, stop_bin,
+               breathing_b=None, index_start_breathing=None, index_end_breathing=None, estimate=True):
+        """
+        Process one frame. Returns (bins, rate_indices) per slot; rate index is 0
+        for slots without a confirmed track or without a full processing window.
+        estimate=False only tracks and appends the frame (rate_indices is None), for
+        catch-up batches where the estimation runs once on the last frame.
+        """
+        started = self.tracker.update(range_fft_abs, start_bin, stop_bin)
+        if np.any(started) or np.any(~self.tracker.in_use):
+            self.vital_signs.reset_slots(started | ~self.tracker.in_use)
+        bins = self.tracker.bins
+        self.vital_signs.push(range_fft_antennas_buffer, bins)
+        if not estimate:
+            return bins, None
+        rate_indices = self.vital_signs.estimate(breathing_b, index_start_breathing, index_end_breathing)
+        rate_indices[~self.tracker.confirmed] = 0
+        return bins, rate_indices
@@ -0,0 +1,110 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % On-demand sampling profiler for the running pipeline.
+# % Triggered by SIGUSR1, or by a UDP control datagram on localhost (an OSC
+# % /profile [seconds] message or the text "profile [seconds]"). It samples
+# % the stacks of the running threads for N seconds and writes, next to the
+# % breathlog:
+# %   profile_<time>.folded     folded stacks (flamegraph.pl / speedscope)
+# %   profile_<time>_alloc.txt  tracemalloc top allocations over the window
+# % Nothing is hooked or sampled while no profile is running.
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+from control_socket import start_control_socket
+
+
+class SamplingProfiler:
+    def __init__(self, output_folder='.', interval=0.005, thread_names=None, alloc_top=30):
+        """
+        interval: seconds between stack samples.
+        thread_names: only sample threads with these names (None = every thread but the sampler).
+        """
+        self.output_folder = output_folder
+        self.interval = interval
+        self.thread_names = thread_names
+        self.alloc_top = alloc_top
+        self.sampler = None
+        self.last_output = None
+
+    @property
+    def running(self):
+        return self.sampler is not None and self.sampler.is_alive()
+
+    def start(self, duration=10.0):
+        """Start a profile in the background; ignored (returns False) while one is running."""
+        if self.running:
+            return False
+        self.sampler = threading.Thread(target=self._run, args=(float(duration),), name='profiler', daemon=True)
+        self.sampler.start()
+        return True
+
+    def _run(self, duration):
+        stamp = time.strftime('%Y%m%d_%H%M%S')
+        print(f"[Profiler] sampling for {duration:g} s")
+        started_tracemalloc = not tracemalloc.is_tracing()
+        if started_tracemalloc:
+            tracemalloc.start(10)
+        start_snapshot = tracemalloc.take_snapshot()
+        stacks = Counter()
+        samples = 0
+        own_id = threading.get_ident()
+        end_time = time.monotonic() + duration
+        while time.monotonic() < end_time:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                name = names.get(thread_id, str(thread_id))
+                if thread_id == own_id or (self.thread_names is not None and name not in self.thread_names):
+                    continue
+                stacks[fold_stack(name, frame)] += 1
+            samples += 1
+            time.sleep(self.interval)
+        end_snapshot = tracemalloc.take_snapshot()
+        if started_tracemalloc:
+            tracemalloc.stop()
+
+        base = os.path.join(self.output_folder, f"profile_{stamp}")
+        with open(f"{base}.folded", 'w') as file:
+            for stack, count in stacks.most_common():
+                file.write(f"{stack} {count}\n")
+        with open(f"{base}_alloc.txt", 'w') as file:
+            file.write(f"# {samples} samples over {duration:.1f} s, interval {self.interval * 1000:.1f} ms\n")
+            file.write(f"# Top {self.alloc_top} allocation sites by growth during the profile\n")
+            for stat in end_snapshot.compare_to(start_snapshot, 'lineno')[:self.alloc_top]:
+                file.write(f"{stat}\n")
+        self.last_output = base
+        print(f"[Profiler] wrote {base}.folded and {base}_alloc.txt")
+
+
+def fold_stack(thread_name, frame):
+    """'thread;outer_function (file:line);...;inner_function (file:line)' for one frame chain."""
+    functions = []
+    while frame is not None:
+        code = frame.f_code
+        functions.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ';'.join([thread_name] + functions[::-1])
+
+
+def install_signal_trigger(profiler, duration=10.0, signum=None):
+    """Start a profile on SIGUSR1 (POSIX only; must be called from the main thread)."""
+    signum = signum if signum is not None else getattr(signal, 'SIGUSR1', None)
+    if signum is None:
+        return False
+    signal.signal(signum, lambda *_: profiler.start(duration))
+    return True
+
+
+def start_control_listener(profiler, port, duration=10.0, host='127.0.0.1'):
+    """UDP control socket on localhost: /profile [seconds] or 'profile [seconds]' starts a profile."""
+
+    def handle(command, params):
+        if command == 'profile':
+            profiler.start(float(params[0]) if params else duration)
+
+    return start_control_socket(handle, port, 'Profiler', host=host)
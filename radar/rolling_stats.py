@@ -0,0 +1,156 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % Streaming statistics for breathing rate (BRV and baseline).
+# % Every update is O(1): running sums for mean / variance and a fixed-bin
+# % histogram for quantiles, with ring buffers for windowed eviction.
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import numpy as np
+
+
+class RollingStats:
+    """
+    Mean, variance and quantiles over the last `window` samples, or over all
+    samples when window is None (session level).
+    Quantiles are read from a histogram with `num_bins` bins between
+    `value_min` and `value_max` (default 0-60 b.p.m. in 0.25 b.p.m. steps).
+    """
+
+    def __init__(self, window=None, value_min=0.0, value_max=60.0, num_bins=240):
+        self.window = window
+        self.value_min = value_min
+        self.bin_width = (value_max - value_min) / num_bins
+        self.histogram = np.zeros(num_bins, dtype=np.int64)
+        self.buffer = np.zeros(window) if window else None
+        self.reset()
+
+    def reset(self):
+        self.histogram.fill(0)
+        self.count = 0
+        self.index = 0
+        # Sums are kept relative to a shift value to limit cancellation in the variance
+        self.shift = None
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def _bin(self, value):
+        return min(max(int((value - self.value_min) / self.bin_width), 0), len(self.histogram) - 1)
+
+    def push(self, value):
+        value = float(value)
+        if self.shift is None:
+            self.shift = value
+        if self.window:
+            if self.count == self.window:
+                old = self.buffer[self.index]
+                self.total -= old - self.shift
+                self.total_sq -= (old - self.shift) ** 2
+                self.histogram[self._bin(old)] -= 1
+            else:
+                self.count += 1
+            self.buffer[self.index] = value
+            self.index = (self.index + 1) % self.window
+            if self.index == 0:
+                # Recompute the sums once per window, O(1) amortised, to stop float drift
+                self.total = float(np.sum(self.buffer - self.shift))
+                self.total_sq = float(np.sum((self.buffer - self.shift) ** 2))
+                self.total -= value - self.shift
+                self.total_sq -= (value - self.shift) ** 2
+        else:
+            self.count += 1
+        self.total += value - self.shift
+        self.total_sq += (value - self.shift) ** 2
+        self.histogram[self._bin(value)] += 1
+
+    def get_state(self):
+        """Compact state as a dict of numpy values, used for pipeline checkpoints."""
+        return {
+            'histogram': self.histogram.copy(),
+            'buffer': self.buffer.copy() if self.buffer is not None else np.zeros(0),
+            'count': self.count,
+            'index': self.index,
+            'shift': np.nan if self.shift is None else self.shift,
+            'total': self.total,
+            'total_sq': self.total_sq,
+        }
+
+    def set_state(self, state):
+        if len(state['histogram']) != len(self.histogram) or \
+                len(state['buffer']) != (len(self.buffer) if self.buffer is not None else 0):
+            raise ValueError("Statistics state does not match the configured window or bins")
+        self.histogram[:] = state['histogram']
+        if self.buffer is not None:
+            self.buffer[:] = state['buffer']
+        self.count = int(state['count'])
+        self.index = int(state['index'])
+        self.shift = None if np.isnan(state['shift']) else float(state['shift'])
+        self.total = float(state['total'])
+        self.total_sq = float(state['total_sq'])
+
+    @property
+    def full(self):
+        return self.window is not None and self.count == self.window
+
+    def mean(self):
+        if self.count == 0:
+            return None
+        return self.shift + self.total / self.count
+
+    def variance(self):
+        if self.count == 0:
+            return None
+        mean_shifted = self.total / self.count
+        return max(self.total_sq / self.count - mean_shifted ** 2, 0.0)
+
+    def std(self):
+        variance = self.variance()
+        return None if variance is None else float(np.sqrt(variance))
+
+    def quantile(self, q):
+        """Quantile from the histogram, linearly interpolated inside the bin."""
+        if self.count == 0:
+            return None
+        cumulative = np.cumsum(self.histogram)
+        target = q * self.count
+        bin_index = int(np.searchsorted(cumulative, target, side='left'))
+        bin_index = min(bin_index, len(self.histogram) - 1)
+        below = cumulative[bin_index - 1] if bin_index > 0 else 0
+        in_bin = self.histogram[bin_index]
+        fraction = (target - below) / in_bin if in_bin > 0 else 0.0
+        return self.value_min + (bin_index + fraction) * self.bin_width
+
+
+class MultiHorizonStats:
+    """
+    RollingStats over several horizons fed by one stream.
+    horizons: dict name -> window size in samples (None for session level).
+    """
+
+    def __init__(self, horizons, **kwargs):
+        self.horizons = {name: RollingStats(window, **kwargs) for name, window in horizons.items()}
+
+    def __getitem__(self, name):
+        return self.horizons[name]
+
+    def push(self, value):
+        for stats in self.horizons.values():
+            stats.push(value)
+
+    def reset(self):
+        for stats in self.horizons.values():
+            stats.reset()
+
+    def get_state(self):
+        """Flattened state of all horizons, keys are '<horizon>/<field>'."""
+        return {f'{name}/{key}': value for name, stats in self.horizons.items()
+                for key, value in stats.get_state().items()}
+
+    def set_state(self, state):
+        for name, stats in self.horizons.items():
+            prefix = f'{name}/'
+            stats.set_state({key[len(prefix):]: value for key, value in state.items() if key.startswith(prefix)})
+
+    def horizon_for(self, window):
+        """Return the stats whose window equals `window` samples, or None."""
+        for stats in self.horizons.values():
+            if stats.window == window:
+                return stats
+        return None
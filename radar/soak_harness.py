@@ -0,0 +1,338 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % Soak test: run the processing pipeline (RadarDataProcessor) on synthetic or
+# % replayed frames at accelerated speed under a simulated clock, e.g. 24 h of
+# % frames in well under an hour, with no device and no GUI event loop.
+# % Frames go through the same bounded data queue, drain / catch-up path and
+# % periodic jobs (re-anchor, BRV, checkpoints) as the threaded runtime; OSC
+# % goes to a local UDP socket and the breathlog CSVs to a work folder.
+# % Every --interval simulated minutes it records RSS, open fds, queue size,
+# % per-pass latency (p50 / p99, wall clock) and output rates (OSC datagrams per
+# % address, CSV rows) to soak_metrics.csv. After a warm-up, a Theil-Sen slope
+# % is fitted to every series: RSS, fds and latency must not grow, output rates
+# % must not drift. Exit status 1 on failure.
+# % Needs the same environment as HalfmindFlow_BGT60TR13C.py (ifxradarsdk is
+# % imported but no device is opened); Qt runs offscreen.
+# % Usage: python soak_harness.py [--hours 24] [--replay frames.npy] [--workdir DIR]
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import argparse
+import contextlib
+import csv
+import gc
+import glob
+import os
+import socket
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+import numpy as np
+from scipy.stats import theilslopes
+
+import HalfmindFlow_BGT60TR13C as flow
+
+wavelength = 3e8 / 60.75e9
+chirp_bandwidth = 5.5e9  # Hz, 58 - 63.5 GHz
+
+
+class SimulatedClock:
+    """Stands in for time.time in the pipeline; advanced by the harness frame by frame."""
+
+    def __init__(self, start):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class SyntheticRadar:
+    """
+    FMCW frames (frame x antenna x chirp x sample, real ADC samples around 0.5): a static
+    reflector near the radar, a person at target_range whose chest moves with breathing
+    (slowly drifting rate) and heartbeat, receiver noise, and an absence of absent_seconds
+    every presence_period seconds so the presence / focus / reset paths are exercised too.
+    """
+
+    def __init__(self, max_range, target_range=0.7, clutter_range=0.25, presence_period=3600,
+                 absent_seconds=300, noise=0.002, seed=0):
+        self.max_range = max_range
+        self.target_range = target_range
+        self.clutter_range = clutter_range
+        self.presence_period = presence_period
+        self.absent_seconds = absent_seconds
+        self.noise = noise
+        self.rng = np.random.default_rng(seed)
+        self.samples = np.arange(flow.samples_per_chirp)
+        self.breathing_phase = 0.0  # radians, carried across calls (frames are consecutive)
+
+    def beat(self, distance):
+        """One chirp's beat tone for a reflector at distance (cycles per sample from the range axis)."""
+        return 2 * np.pi * 0.5 * distance / self.max_range * self.samples
+
+    def frames(self, times):
+        times = np.asarray(times, dtype=float)
+        breathing_rate = 0.25 + 0.05 * np.sin(2 * np.pi * times / 5400)  # Hz, 12 - 18 bpm
+        breathing_phase = self.breathing_phase + 2 * np.pi * np.cumsum(breathing_rate) / flow.frame_rate
+        self.breathing_phase = float(breathing_phase[-1]) % (2 * np.pi)
+        chest = 4e-3 * np.sin(breathing_phase) + 2e-4 * np.sin(2 * np.pi * 1.2 * times)
+        present = (times % self.presence_period) >= self.absent_seconds
+        phase = 4 * np.pi * (self.target_range + chest) / wavelength
+        signal = (0.05 * present[:, None] * np.cos(self.beat(self.target_range)[None, :] + phase[:, None])
+                  + 0.02 * np.cos(self.beat(self.clutter_range) + 0.3)[None, :])
+        shape = (len(times), flow.num_rx_antennas, flow.number_of_chirps, flow.samples_per_chirp)
+        frames = 0.5 + np.broadcast_to(signal[:, None, None, :], shape)
+        return frames + self.noise * self.rng.standard_normal(shape)
+
+
+class ReplayRadar:
+    """Frames from a recording (.npy, or .npz with a 'frames' array), looped for as long as needed."""
+
+    def __init__(self, path):
+        data = np.load(path)
+        self.recording = data['frames'] if isinstance(data, np.lib.npyio.NpzFile) else data
+        expected = (flow.num_rx_antennas, flow.number_of_chirps, flow.samples_per_chirp)
+        if self.recording.ndim != 4 or self.recording.shape[1:] != expected:
+            raise ValueError(f"Recording must be frames x {expected}, got {self.recording.shape}")
+        self.position = 0
+
+    def frames(self, times):
+        indices = (self.position + np.arange(len(times))) % len(self.recording)
+        self.position = int(indices[-1]) + 1
+        return self.recording[indices]
+
+
+class OscSink:
+    """Local UDP socket the pipeline's OSC clients send to; counts datagrams per address."""
+
+    def __init__(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+        self.socket.bind(('127.0.0.1', 0))
+        self.socket.setblocking(False)
+        self.counts = {}
+
+    @property
+    def target(self):
+        return self.socket.getsockname()
+
+    def drain(self):
+        while True:
+            try:
+                datagram = self.socket.recv(65536)
+            except BlockingIOError:
+                return
+            address = datagram.split(b'\0', 1)[0].decode('ascii', 'replace')
+            self.counts[address] = self.counts.get(address, 0) + 1
+
+    def close(self):
+        self.socket.close()
+
+
+class CsvRowCounter:
+    """Rows appended to the breathlog CSVs since the last call (new daily files included)."""
+
+    def __init__(self, pattern='breathlog_*.csv'):
+        self.pattern = pattern
+        self.offsets = {}
+
+    def new_rows(self):
+        rows = 0
+        for path in glob.glob(self.pattern):
+            offset = self.offsets.get(path, 0)
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                data = f.read()
+            rows += data.count(b'\n') - (1 if offset == 0 and data else 0)  # header
+            self.offsets[path] = offset + len(data)
+        return rows
+
+
+def resident_memory_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except OSError:
+        import resource  # no /proc (macOS): peak RSS, still catches steady growth
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == 'darwin' else peak / 2 ** 10
+
+
+def open_file_descriptors():
+    for folder in ('/proc/self/fd', '/dev/fd'):
+        if os.path.isdir(folder):
+            return len(os.listdir(folder))
+    return -1
+
+
+def setup_pipeline(clock, osc_target, outputs_only):
+    """Module state normally set up in HalfmindFlow_BGT60TR13C's main block, minus the device."""
+    flow.clock = clock
+    flow.start_time = clock()
+    flow.osc_targets = [osc_target]
+    flow.osc_clients = None
+    flow.max_range = 3e8 / (2 * chirp_bandwidth) * flow.samples_per_chirp / 2
+    flow.min_range_index = int(0.15 * flow.fft_size_range_profile / 2)
+    flow.init_buffers(flow.max_range)
+    flow.init_dsp_plan(flow.max_range)
+    if outputs_only:
+        for name in list(flow.stage_graph.sinks):
+            if name != 'outputs':
+                flow.stage_graph.set_active(name, False)
+    processor = flow.RadarDataProcessor()
+    flow.radar_processor = processor
+    return processor
+
+
+def check_trends(rows, warmup, duration_hours, rss_tolerance_mb, latency_tolerance, latency_floor_ms,
+                 rate_tolerance, event_ratio, event_slack=5):
+    """
+    Theil-Sen slope per series after warm-up, projected over the whole run. Returns failure messages.
+    Streams averaging under 0.5 messages/s (/status, /brvsignal) are event-driven: their rate follows
+    the data, so they are checked by count instead; the second half of the run may not send more than
+    event_ratio times the first half plus event_slack (a sender stuck re-sending every pass would).
+    """
+    rows = [row for row in rows if row['hours'] >= warmup * duration_hours]
+    if len(rows) < 5:
+        return ["not enough samples after warm-up for a trend check"]
+    hours = np.array([row['hours'] for row in rows])
+    failures = []
+
+    def growth(name, lower_bound=False):
+        """Projected change over the run; lower_bound: the 95 % confidence bound's, for noisy series."""
+        values = np.array([row[name] for row in rows], dtype=float)
+        slope, _, low_slope, _ = theilslopes(values, hours)
+        return (low_slope if lower_bound else slope) * duration_hours, float(np.median(values))
+
+    change, median = growth('rss_mb')
+    if change > max(rss_tolerance_mb, 0.05 * median):
+        failures.append(f"RSS grows {change:.1f} MB over the run (median {median:.1f} MB)")
+    change, _ = growth('open_fds')
+    if change >= 1 or rows[-1]['open_fds'] > rows[0]['open_fds']:
+        failures.append(f"open file descriptors grow from {rows[0]['open_fds']} to {rows[-1]['open_fds']}")
+    for name in ('latency_p50_ms', 'latency_p99_ms'):
+        # Wall-clock latency jitters with the machine's load: only growth that is significant counts
+        change, median = growth(name, lower_bound=True)
+        if change > max(latency_tolerance * median, latency_floor_ms):
+            failures.append(f"{name} grows at least {change:.2f} ms over the run (median {median:.2f} ms)")
+    seconds = np.diff(np.concatenate(([rows[0]['hours'] - (hours[1] - hours[0])], hours))) * 3600
+    half = len(rows) // 2
+    for name in [key for key in rows[0] if key.endswith('_per_s')]:
+        change, median = growth(name)
+        if median < 0.5:
+            counts = np.array([row[name] for row in rows]) * seconds
+            first, second = counts[:half].sum(), counts[half:].sum()
+            if second > event_ratio * first + event_slack:
+                failures.append(f"{name} events rise from {first:.0f} to {second:.0f} between the run halves")
+        elif abs(change) > max(rate_tolerance * median, 0.05):
+            failures.append(f"{name} drifts {change:+.2f}/s over the run (median {median:.2f}/s)")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Accelerated soak test of the radar processing pipeline")
+    parser.add_argument('--hours', type=float, default=24.0, help="simulated run time")
+    parser.add_argument('--interval', type=float, default=10.0, help="simulated minutes per metrics sample")
+    parser.add_argument('--frames-per-pass', type=int, default=flow.decimation_factor,
+                        help="frames queued between processing passes (> catch_up_threshold exercises catch-up)")
+    parser.add_argument('--replay', help="recorded frames (.npy / .npz) instead of synthetic ones")
+    parser.add_argument('--workdir', help="folder for CSVs, events, checkpoints and metrics (default: temporary)")
+    parser.add_argument('--log', action='store_true', help="keep the pipeline's console output in soak_stdout.log")
+    parser.add_argument('--outputs-only', action='store_true', help="switch off the plot sinks' stages")
+    parser.add_argument('--warmup', type=float, default=0.1, help="fraction of the run left out of the trend check")
+    parser.add_argument('--rss-tolerance', type=float, default=5.0, help="MB of RSS growth allowed over the run")
+    parser.add_argument('--latency-tolerance', type=float, default=0.25, help="relative latency growth allowed")
+    parser.add_argument('--latency-floor', type=float, default=0.2,
+                        help="ms of latency growth always allowed (timer resolution / scheduler jitter)")
+    parser.add_argument('--event-ratio', type=float, default=2.0,
+                        help="event-driven OSC addresses: second-half / first-half count ratio allowed")
+    parser.add_argument('--rate-tolerance', type=float, default=0.1, help="relative output-rate drift allowed")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix='soak_')
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+    console = sys.stdout
+    clock = SimulatedClock(time.time())
+    sink = OscSink()
+    rows = []
+    with open('soak_stdout.log' if args.log else os.devnull, 'w') as log, contextlib.redirect_stdout(log):
+        processor = setup_pipeline(clock, sink.target, args.outputs_only)
+        max_range = flow.max_range
+        radar = ReplayRadar(args.replay) if args.replay else SyntheticRadar(max_range)
+        csv_rows = CsvRowCounter()
+        frame_time = 1 / flow.frame_rate
+        block = max(args.frames_per_pass, flow.frame_rate)  # frames generated at a time
+        total_passes = int(args.hours * 3600 * flow.frame_rate / args.frames_per_pass)
+        interval_passes = max(1, int(args.interval * 60 * flow.frame_rate / args.frames_per_pass))
+        latencies = []
+        run_start = interval_start = clock()  # flow.start_time moves with the pipeline's time base
+        frames = []
+        started = time.perf_counter()
+        print(f"Soak test: {args.hours} h simulated, {total_passes} passes, work folder {workdir}", file=console)
+        for index in range(1, total_passes + 1):
+            if len(frames) < args.frames_per_pass:
+                times = clock() + frame_time * (len(frames) + np.arange(block))
+                frames = list(frames) + list(radar.frames(times))
+            for frame in frames[:args.frames_per_pass]:
+                flow.enqueue_frame(frame)
+            frames = frames[args.frames_per_pass:]
+            clock.advance(args.frames_per_pass * frame_time)
+
+            begin = time.perf_counter()
+            now = clock()
+            processor.run_periodic_jobs(now)
+            while not flow.data_queue.empty():
+                processor.process_frames(processor.drain_frames(flow.data_queue), now)
+            latencies.append(time.perf_counter() - begin)
+            if index % 100 == 0:
+                sink.drain()
+
+            if index % interval_passes == 0:
+                sink.drain()
+                elapsed = clock() - interval_start
+                interval_start = clock()
+                gc.collect()
+                row = {'hours': (clock() - run_start) / 3600,
+                       'wall_seconds': time.perf_counter() - started,
+                       'rss_mb': resident_memory_mb(),
+                       'open_fds': open_file_descriptors(),
+                       'queue_size': flow.data_queue.qsize(),
+                       'dropped_frames': flow.dropped_frames,
+                       'latency_p50_ms': 1e3 * float(np.percentile(latencies, 50)),
+                       'latency_p99_ms': 1e3 * float(np.percentile(latencies, 99)),
+                       'csv_rows_per_s': csv_rows.new_rows() / elapsed}
+                for address, count in sorted(sink.counts.items()):
+                    row[f"osc{address.replace('/', '_')}_per_s"] = count / elapsed
+                sink.counts = {}
+                latencies = []
+                rows.append(row)
+                print(f"[{row['hours']:6.2f} h] RSS {row['rss_mb']:.1f} MB, fds {row['open_fds']}, "
+                      f"p50 {row['latency_p50_ms']:.2f} ms, p99 {row['latency_p99_ms']:.2f} ms, "
+                      f"CSV {row['csv_rows_per_s']:.2f} rows/s, dropped {row['dropped_frames']}", file=console)
+        processor.stop()
+    sink.close()
+
+    # An OSC address may only show up in some samples (e.g. /brvsignal): zero where missing
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    rows = [{key: row.get(key, 0.0) for key in columns} for row in rows]
+    if rows:
+        with open('soak_metrics.csv', 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=columns)
+            writer.writeheader()
+            writer.writerows(rows)
+    failures = check_trends(rows, args.warmup, args.hours, args.rss_tolerance, args.latency_tolerance,
+                            args.latency_floor, args.rate_tolerance, args.event_ratio)
+    print(f"Metrics: {os.path.join(workdir, 'soak_metrics.csv')}")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if failures:
+        sys.exit(1)
+    print("PASS: no upward trend in memory, file descriptors or latency, output rates steady")
+
+
+if __name__ == "__main__":
+    main()
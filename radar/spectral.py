@@ -0,0 +1,116 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % Vital-signs spectrum helpers: windowed FFT, peak picking and sub-bin peak
+# % interpolation (fractional bin + confidence), so small FFTs keep the rate
+# % resolution that used to need 4x zero padding.
+# % `dtype` (np.float32 / np.float64) selects the compute precision; FFTs go
+# % through scipy.fft, which keeps single precision instead of upcasting.
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+from functools import lru_cache
+
+import numpy as np
+import scipy.fft
+import scipy.signal as signal
+from scipy.signal import find_peaks
+
+
+@lru_cache(maxsize=16)
+def blackmanharris(length, dtype=np.float64):
+    window = signal.windows.blackmanharris(length).astype(dtype)
+    window.flags.writeable = False
+    return window
+
+
+def as_precision(data, dtype=None):
+    """Cast real data to `dtype` and complex data to the matching complex type; None keeps data as is."""
+    data = np.asarray(data)
+    if dtype is None:
+        return data
+    if np.iscomplexobj(data):
+        return data.astype(np.result_type(dtype, np.complex64), copy=False)
+    return data.astype(dtype, copy=False)
+
+
+def range_fft(frames, fft_size, num_rx_antennas, dtype=None):
+    """
+    Range profiles of a stack of frames (frame x antenna x chirp x sample) in one FFT call.
+    Returns (frames x fft_size / 2) complex profiles, chirp-summed and antenna-averaged.
+    """
+    frames = as_precision(np.asarray(frames)[:, :num_rx_antennas], dtype)
+    num_samples_per_chirp = frames.shape[-1]
+    mat = frames - np.mean(frames, axis=-1, keepdims=True)
+    mat = mat * blackmanharris(num_samples_per_chirp, mat.real.dtype.type)
+    profiles = scipy.fft.fft(mat, fft_size, axis=-1)[..., :int(fft_size / 2)]
+    return np.sum(profiles, axis=(1, 2)) * (2 / num_samples_per_chirp / num_rx_antennas)
+
+
+def vital_signs_fft(data, nFFT, data_length, epsilon=1e-8, dtype=None):
+    data = as_precision(data, dtype)
+    windowed_signal = data * blackmanharris(data_length, data.real.dtype.type)
+    return 1.0 / nFFT * np.abs(scipy.fft.fft(windowed_signal, nFFT)) + epsilon
+
+
+def find_signal_peaks(spectrum, index_start, index_end, distance_bins=1):
+    """Integer bin of the strongest peak between index_start and index_end, 0 if there is none."""
+    signal_region = spectrum[index_start: index_end]
+    peaks, _ = find_peaks(signal_region, distance=int(max(1, distance_bins)))
+    if len(peaks) == 0:
+        return 0
+    return peaks[np.argmax(signal_region[peaks])] + index_start
+
+
+def interpolate_peak(spectrum, index, method='gaussian'):
+    """
+    Sub-bin refinement of a magnitude-spectrum peak from its two neighbours.
+    'quadratic' fits a parabola to the magnitudes; 'gaussian' fits it to the log
+    magnitudes, which is close to exact for the Blackman-Harris main lobe.
+    `spectrum` may be 1-D with a scalar index, or 2-D (rows) with one index per row.
+    Returns the fractional bin index (same shape as index).
+    """
+    spectrum = np.asarray(spectrum)
+    index = np.asarray(index)
+    rows = np.arange(spectrum.shape[0]) if spectrum.ndim == 2 else None
+    last = spectrum.shape[-1] - 1
+    inner = np.clip(index, 1, last - 1)
+
+    def take(offset):
+        if rows is None:
+            return spectrum[inner + offset]
+        return spectrum[rows, inner + offset]
+
+    left, centre, right = take(-1), take(0), take(1)
+    if method == 'gaussian':
+        left, centre, right = np.log(left), np.log(centre), np.log(right)
+    denominator = left - 2 * centre + right
+    with np.errstate(divide='ignore', invalid='ignore'):
+        delta = np.where(denominator < 0, 0.5 * (left - right) / denominator, 0.0)
+    delta = np.clip(delta, -0.5, 0.5)
+    # Peaks on the spectrum edge cannot be refined
+    delta = np.where((index >= 1) & (index <= last - 1), delta, 0.0)
+    return index + delta
+
+
+def peak_confidence(spectrum, index, index_start, index_end):
+    """
+    Peak prominence in [0, 1): 1 - (mean band magnitude / peak magnitude).
+    Close to 1 for a clean single breathing tone, close to 0 for a flat band.
+    """
+    band = spectrum[index_start:index_end]
+    peak = spectrum[int(round(index))]
+    if peak <= 0 or len(band) == 0:
+        return 0.0
+    return float(max(0.0, 1.0 - np.mean(band) / peak))
+
+
+def estimate_spectral_peak(spectrum, index_start, index_end, distance_bins=1, method='gaussian'):
+    """
+    Strongest peak in the band with sub-bin refinement.
+    Returns (fractional_index, confidence); (0, 0.0) when no peak was found.
+    method=None skips the refinement (integer bins, legacy behaviour).
+    """
+    index = find_signal_peaks(spectrum, index_start, index_end, distance_bins)
+    if index == 0:
+        return 0, 0.0
+    confidence = peak_confidence(spectrum, index, index_start, index_end)
+    if method is None:
+        return index, confidence
+    return float(interpolate_peak(spectrum, index, method)), confidence
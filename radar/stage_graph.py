@@ -0,0 +1,55 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % Demand-driven processing stages.
+# % The processing chain is described as named stages with the stages they
+# % depend on; every output (OSC / CSV / MQTT stream, plot curve) is a sink
+# % that declares the stages it needs. Only stages reachable from active
+# % sinks run, so hidden plots and unused paths cost nothing per frame.
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import threading
+
+
+class StageGraph:
+    """
+    stages: {stage: [stages it depends on]}.
+    Sinks are switched on and off (e.g. from a plot's visibleChanged signal in the GUI
+    thread); `active` is rebuilt on every change and replaced as a whole, so the
+    processing thread reads a consistent frozenset without locking.
+    """
+
+    def __init__(self, stages):
+        self.stages = {name: list(needs) for name, needs in stages.items()}
+        for name, needs in self.stages.items():
+            unknown = [need for need in needs if need not in self.stages]
+            if unknown:
+                raise ValueError(f"Stage {name} depends on unknown stages {unknown}")
+        self.sinks = {}  # sink -> (needed stages, active)
+        self.lock = threading.Lock()
+        self.active = frozenset()
+
+    def add_sink(self, name, needs, active=True):
+        unknown = [need for need in needs if need not in self.stages]
+        if unknown:
+            raise ValueError(f"Sink {name} needs unknown stages {unknown}")
+        with self.lock:
+            self.sinks[name] = (list(needs), bool(active))
+            self._rebuild()
+
+    def set_active(self, name, active):
+        with self.lock:
+            needs, was_active = self.sinks[name]
+            if was_active != bool(active):
+                self.sinks[name] = (needs, bool(active))
+                self._rebuild()
+
+    def _rebuild(self):
+        active = set()
+        pending = [stage for needs, is_active in self.sinks.values() if is_active for stage in needs]
+        while pending:
+            stage = pending.pop()
+            if stage not in active:
+                active.add(stage)
+                pending.extend(self.stages[stage])
+        self.active = frozenset(active)
+
+    def __contains__(self, stage):
+        return stage in self.active
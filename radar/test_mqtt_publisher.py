@@ -0,0 +1,113 @@
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# % MqttPublisher against a local broker stand-in: a client with paho's
+# % interface that records publishes, driven by an injected clock.
+# % Usage: python -m pytest test_mqtt_publisher.py (or python -m unittest)
+# % ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+import unittest
+
+from mqtt_publisher import MqttPublisher, TopicPolicy
+
+
+class BrokerStandIn:
+    """paho-compatible client: connects immediately and records (topic, payload, retain) per publish."""
+
+    def __init__(self):
+        self.messages = []
+        self.on_connect = None
+        self.on_disconnect = None
+
+    def reconnect_delay_set(self, min_delay, max_delay):
+        pass
+
+    def connect_async(self, host, port, keepalive):
+        self.on_connect(self, None, {}, 0)
+
+    def loop_start(self):
+        pass
+
+    def loop_stop(self):
+        pass
+
+    def disconnect(self):
+        self.on_disconnect(self, None, 0)
+
+    def publish(self, topic, payload, qos=0, retain=False):
+        self.messages.append((topic, payload, retain))
+
+    def drop(self):
+        self.on_disconnect(self, None, 1)
+
+    def reconnect(self):
+        self.on_connect(self, None, {}, 0)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class MqttPublisherTest(unittest.TestCase):
+    def setUp(self):
+        self.client = BrokerStandIn()
+        self.clock = FakeClock()
+        self.publisher = MqttPublisher(self.client, {'rate': TopicPolicy(min_interval=5.0, deadband=1),
+                                                     'presence': TopicPolicy(min_interval=1.0, deadband=0)},
+                                       clock=self.clock)
+        self.client.on_connect(self.client, None, {}, 0)
+
+    def publish_at(self, time, topic, value):
+        self.clock.now = time
+        self.publisher.publish(topic, value)
+
+    def payloads(self, topic):
+        return [payload for sent_topic, payload, _ in self.client.messages if sent_topic == topic]
+
+    def test_change_of_one_deadband_is_sent(self):
+        self.publish_at(0, 'rate', 14)
+        for time in (5, 10, 15):
+            self.publish_at(time, 'rate', 15)
+        self.assertEqual(self.payloads('rate'), ['14', '15'])
+        self.assertEqual(self.publisher.suppressed, 2)
+
+    def test_change_below_deadband_is_suppressed(self):
+        self.publish_at(0, 'rate', 14)
+        self.publish_at(6, 'rate', 14.5)
+        self.assertEqual(self.payloads('rate'), ['14'])
+        self.assertEqual(self.publisher.suppressed, 1)
+
+    def test_unchanged_value_is_not_republished_with_zero_deadband(self):
+        for time in range(5):
+            self.publish_at(time, 'presence', 1)
+        self.assertEqual(self.payloads('presence'), ['1'])
+
+    def test_rate_limit_coalesces_to_latest_value(self):
+        self.publish_at(0, 'rate', 14)
+        for time, value in ((1, 16), (2, 18), (3, 20)):
+            self.publish_at(time, 'rate', value)
+        self.assertEqual(self.payloads('rate'), ['14'])
+        self.publisher.flush(now=5.0)
+        self.assertEqual(self.payloads('rate'), ['14', '20'])
+
+    def test_flush_thread_is_optional(self):
+        publisher = MqttPublisher(BrokerStandIn(), clock=self.clock)
+        publisher.start('localhost', flush_thread=False)
+        self.assertIsNone(publisher.flush_thread)
+        publisher.start('localhost')
+        self.assertTrue(publisher.flush_thread.is_alive())
+        publisher.stop()
+        self.assertIsNone(publisher.flush_thread)
+
+    def test_values_held_while_disconnected_are_sent_after_reconnect(self):
+        self.client.drop()
+        self.publish_at(0, 'presence', 1)
+        self.assertEqual(self.client.messages, [])
+        self.client.reconnect()
+        self.publisher.flush(now=0.0)
+        self.assertEqual(self.payloads('presence'), ['1'])
+
+
+if __name__ == "__main__":
+    unittest.main()
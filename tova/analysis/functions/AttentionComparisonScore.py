@@ -1,10 +1,22 @@
 import sys
+import numpy as np
 sys.path.append('.')
 try:
     from functions.dataset_visual_norm import tova_selected_data
 except Exception:
     from dataset_visual_norm import tova_selected_data
 
+# Norm tables as arrays for vectorized scoring: [decade index, sex index, metric] -> mean / sd
+NORM_DECADES = np.array(sorted(tova_selected_data))
+NORM_SEXES = ['Male', 'Female']
+NORM_METRICS = ['response_time_H1', 'd_prime_H2', 'variability_total']
+NORM_MEANS = np.array([[[tova_selected_data[decade][sex][metric]['mean'] for metric in NORM_METRICS]
+                        for sex in NORM_SEXES] for decade in NORM_DECADES])
+NORM_SDS = np.array([[[tova_selected_data[decade][sex][metric]['sd'] for metric in NORM_METRICS]
+                      for sex in NORM_SEXES] for decade in NORM_DECADES])
+# +1: higher is better (d'), -1: lower is better (response time, variability), as in z_score / z_score_reverse
+NORM_DIRECTIONS = np.array([-1.0, 1.0, -1.0])
+
 
 def z_score(x, mean, std):
     return (x - mean) / std
@@ -29,30 +41,73 @@ def calculate_attention_score(meanHitRT_LF, dprime_HF, SDHitRT, age, sex, debug=
         print(f"SDHitRT {SDHitRT:.2f},z score: {SDHitRT_z:.2f}, standard score: {standard_score(SDHitRT_z):.2f}")
     return meanHitRT_LF_z + dprime_HF_z + SDHitRT_z + 1.8
 
+def calculate_attention_scores(meanHitRT_LF, dprime_HF, SDHitRT, age, sex, out_of_table='nan'):
+    # Vectorized calculate_attention_score for a whole cohort (arrays or lists, one entry per session).
+    # sex: 'Male' / 'Female' (case insensitive); age: years, looked up by decade (23 -> 20)
+    # out_of_table: what to do with ages outside the norm decades or unknown sex
+    #   'nan'   -> NaN scores for those rows (default)
+    #   'clip'  -> use the nearest norm decade (unknown sex or missing age still gives NaN)
+    #   'raise' -> ValueError listing the rows
+    # Returns a dict of arrays: z-scores, standard scores, composite, norm_decade used and in_table mask
+    values = np.column_stack([np.asarray(meanHitRT_LF, dtype=float), np.asarray(dprime_HF, dtype=float),
+                              np.asarray(SDHitRT, dtype=float)])
+    decades = (np.asarray(age, dtype=float) // 10) * 10
+    sex_names = np.char.lower(np.asarray(sex, dtype=str))
+    sex_index = np.select([sex_names == 'male', sex_names == 'female'], [0, 1], -1)
+    decade_index = np.clip(np.searchsorted(NORM_DECADES, decades), 0, len(NORM_DECADES) - 1)
+    age_in_table = NORM_DECADES[decade_index] == decades
+    in_table = age_in_table & (sex_index >= 0)
+    if out_of_table == 'raise' and not np.all(in_table):
+        raise ValueError(f"rows outside the norm tables (age / sex): {np.flatnonzero(~in_table).tolist()}")
+    if out_of_table == 'clip':
+        # The clipped searchsorted index is already the youngest / oldest decade for out-of-table ages;
+        # a NaN age would land on the oldest decade too, so it is excluded
+        usable = (sex_index >= 0) & np.isfinite(decades)
+    elif out_of_table == 'nan':
+        usable = in_table
+    else:
+        raise ValueError(f"Unknown out_of_table mode: {out_of_table}")
+    means = NORM_MEANS[decade_index, np.maximum(sex_index, 0)]
+    sds = NORM_SDS[decade_index, np.maximum(sex_index, 0)]
+    z = NORM_DIRECTIONS * (values - means) / sds
+    z[~usable] = np.nan
+    standard = standard_score(z)
+    return {
+        'meanHitRT_LF_z': z[:, 0], 'dprime_HF_z': z[:, 1], 'SDHitRT_z': z[:, 2],
+        'meanHitRT_LF_standard': standard[:, 0], 'dprime_HF_standard': standard[:, 1],
+        'SDHitRT_standard': standard[:, 2],
+        'composite': z.sum(axis=1) + 1.8,
+        'norm_decade': np.where(usable, NORM_DECADES[decade_index], -1),
+        'in_table': in_table,
+    }
+
+def score_dataframe(df, out_of_table='nan'):
+    # calculate_attention_scores on a DataFrame with meanHitRT_LF, dprime_HF, SDHitRT, age and gender (or sex)
+    # columns; returns a copy with the score columns added
+    sex = df['gender'] if 'gender' in df.columns else df['sex']
+    scores = calculate_attention_scores(df['meanHitRT_LF'], df['dprime_HF'], df['SDHitRT'], df['age'], sex,
+                                        out_of_table)
+    return df.assign(**scores)
+
 def load_iqdat_file(file_path):
-    # Read the file as text and replace single quotes with periods
-    import pandas as pd
-    import io
+    # Stream the header and first row (decimal commas are converted for .iqdat)
     import os
-    with open(file_path, 'r', encoding='utf-8') as file:
-        content = file.read()
-    if file_path.lower().endswith('.iqdat'):
-        content = content.replace(",", ".")
-        df = pd.read_csv(io.StringIO(content), sep='\t')
-    elif file_path.lower().endswith('.csv'):
-        df = pd.read_csv(io.StringIO(content), sep=',')
-    # Try to get age and sex, if not found, ask for input
     try:
-        age = int(df['age'].iloc[0])
+        from functions.batch_scoring import read_summary
     except Exception:
-        age = int(input('Please input the subject\'s age: '))
+        from batch_scoring import read_summary
+    row = read_summary(file_path)
+    # Try to get age and sex, if not found, ask for input (batch runs use a manifest, see batch_scoring)
     try:
-        sex = df['gender'].iloc[0]
+        age = int(float(row['age']))
     except Exception:
+        age = int(input('Please input the subject\'s age: '))
+    sex = row.get('gender')
+    if not sex:
         sex = input('Please input the subject\'s gender (Male/Female, case sensitive): ')
-    meanHitRT_LF = float(df['meanHitRT_LF'].iloc[0])
-    dprime_HF = float(df['dprime_HF'].iloc[0])
-    SDHitRT = float(df['SDHitRT'].iloc[0])
+    meanHitRT_LF = float(row['meanHitRT_LF'] or 0)
+    dprime_HF = float(row['dprime_HF'] or 0)
+    SDHitRT = float(row['SDHitRT'] or 0)
     # Parse user name from file name (after second underscore)
     base = os.path.basename(file_path)
     parts = base.split('_', 2)
@@ -0,0 +1,167 @@
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+try:
+    from functions.AttentionComparisonScore import calculate_attention_score
+except Exception:
+    from AttentionComparisonScore import calculate_attention_score
+
+SUMMARY_FIELDS = ['meanHitRT_LF', 'dprime_HF', 'SDHitRT']
+CACHE_VERSION = 2
+
+
+def read_summary(file_path):
+    # Stream only the header and the first data row of a summary file.
+    # .iqdat: tab separated with decimal commas; .csv: tova.js summary export
+    is_iqdat = str(file_path).lower().endswith('.iqdat')
+    with open(file_path, 'r', encoding='utf-8', newline='') as file:
+        lines = (line.replace(',', '.') for line in file) if is_iqdat else file
+        reader = csv.reader(lines, delimiter='\t' if is_iqdat else ',')
+        header = next(reader, None)
+        row = next(reader, None)
+    if header is None or row is None:
+        raise ValueError('no summary row')
+    return dict(zip([name.strip() for name in header], [value.strip() for value in row]))
+
+
+def user_name_from_file(file_path):
+    # tova_summary_<name>_<timestamp>.csv / <prefix>_<prefix>_<name>.iqdat: user name after the second underscore
+    parts = os.path.basename(file_path).split('_', 2)
+    if len(parts) >= 3:
+        return parts[2].split('.', 1)[0]
+    return ''
+
+
+def load_manifest(manifest_path):
+    # Participant manifest (csv): participant, age, gender.
+    # `participant` matches the summary subjectId, the user name in the file name or the file stem.
+    manifest = {}
+    with open(manifest_path, 'r', encoding='utf-8-sig', newline='') as file:
+        for row in csv.DictReader(file):
+            key = (row.get('participant') or row.get('subjectId') or '').strip()
+            if key:
+                manifest[key] = {'age': int(float(row['age'])), 'gender': row['gender'].strip()}
+    return manifest
+
+
+def manifest_keys(file_path, summary):
+    # Manifest keys a summary file may be listed under, in lookup order
+    return [key for key in (summary.get('subjectId', ''), user_name_from_file(file_path), Path(file_path).stem) if key]
+
+
+def match_manifest(keys, manifest):
+    # First manifest entry listed under one of keys, None when the file is not in the manifest
+    for key in keys:
+        if manifest and key in manifest:
+            return manifest[key]
+    return None
+
+
+def lookup_demographics(file_path, summary, manifest):
+    # Age / gender from the summary when present, otherwise from the manifest
+    age, sex = summary.get('age', ''), summary.get('gender', '')
+    entry = match_manifest(manifest_keys(file_path, summary), manifest)
+    try:
+        age = int(float(age))
+    except ValueError:
+        age = entry['age'] if entry else None
+    if not sex:
+        sex = entry['gender'] if entry else None
+    return age, sex
+
+
+def score_file(file_path, manifest=None):
+    # Score one summary file. Never prompts; problems are reported in record['error'].
+    record = {'file': os.path.basename(file_path), 'path': str(file_path), 'data': None, 'error': None,
+              'manifest_keys': manifest_keys(file_path, {})}
+    try:
+        summary = read_summary(file_path)
+        record['manifest_keys'] = manifest_keys(file_path, summary)
+        # tova.js writes 0 as an empty field; a missing column is an error (KeyError)
+        values = [float(summary[name] or 0) for name in SUMMARY_FIELDS]
+        age, sex = lookup_demographics(file_path, summary, manifest)
+        record.update(zip(SUMMARY_FIELDS, values))
+        record.update({'age': age, 'sex': sex})
+        if age is None or not sex:
+            raise ValueError('age / gender missing from file and manifest')
+        record['data'] = calculate_attention_score(*values, age=age, sex=sex, debug=False)
+    except Exception as e:
+        record['error'] = f"{type(e).__name__}: {e}"
+    return record
+
+
+def _score_files(args):
+    paths, manifest = args
+    return [score_file(path, manifest) for path in paths]
+
+
+def find_summary_files(folder_path, min_size_kb=1.5, max_size_kb=3.0):
+    files = []
+    for root, _, names in os.walk(folder_path):
+        for name in sorted(names):
+            if name.endswith('.iqdat') or name.endswith('.csv'):
+                stat = (Path(root) / name).stat()
+                if min_size_kb <= stat.st_size / 1024 <= max_size_kb:
+                    files.append((str(Path(root) / name), stat.st_mtime_ns, stat.st_size))
+    return files
+
+
+def load_cache(cache_path):
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as file:
+            cache = json.load(file)
+        if cache.get('version') == CACHE_VERSION:
+            return cache['entries']
+    except (OSError, ValueError, KeyError):
+        pass
+    return {}
+
+
+def save_cache(cache_path, entries):
+    tmp_path = f"{cache_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump({'version': CACHE_VERSION, 'entries': entries}, file)
+    os.replace(tmp_path, cache_path)
+
+
+def score_folder(folder_path, manifest_path=None, min_size_kb=1.5, max_size_kb=3.0, workers=None,
+                 cache_path=None, chunk_size=16):
+    # Score every summary file under folder_path in a process pool.
+    # Results are cached by (path, mtime, size) plus the file's own manifest entry, so reruns only score
+    # changed files and editing one participant in the manifest only rescores that participant's files.
+    manifest = load_manifest(manifest_path) if manifest_path else None
+    if cache_path is None:
+        cache_path = Path(folder_path) / '.tova_scores_cache.json'
+    entries = load_cache(cache_path) if cache_path else {}
+
+    files = find_summary_files(folder_path, min_size_kb, max_size_kb)
+    results, stale = {}, []
+    for path, mtime_ns, size in files:
+        entry = entries.get(path)
+        if (entry and entry['mtime_ns'] == mtime_ns and entry['size'] == size
+                and entry['manifest'] == match_manifest(entry['record']['manifest_keys'], manifest)):
+            results[path] = entry['record']
+        else:
+            stale.append(path)
+
+    if stale:
+        chunks = [(stale[i:i + chunk_size], manifest) for i in range(0, len(stale), chunk_size)]
+        if workers == 1 or len(chunks) == 1:
+            scored = map(_score_files, chunks)
+            records = [record for chunk in scored for record in chunk]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                records = [record for chunk in executor.map(_score_files, chunks) for record in chunk]
+        for record in records:
+            results[record['path']] = record
+
+    if cache_path:
+        current = {path: (mtime_ns, size) for path, mtime_ns, size in files}
+        entries = {path: {'mtime_ns': mtime_ns, 'size': size, 'record': results[path],
+                          'manifest': match_manifest(results[path]['manifest_keys'], manifest)}
+                   for path, (mtime_ns, size) in current.items()}
+        save_cache(cache_path, entries)
+    return [results[path] for path, _, _ in files]
@@ -0,0 +1,223 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+try:
+    from functions.batch_scoring import read_summary
+except Exception:
+    from batch_scoring import read_summary
+
+# Time-indexed join between TOVA sessions and the radar breathlog_*.csv files
+# (timestamp, readable_time, breathing_rate, filtered_breath, presence; one row per second while a
+# valid breathing rate exists, present or not; presence is the radar's presence state, missing in logs
+# written before the column was added). BreathingLogIndex keeps every sample of every log in one sorted
+# time index with prefix sums, so as-of lookups and window features cost O(log n) per session.
+# The index is saved next to the logs and extended incrementally: new files are added and
+# growing files (the log being written) are read from their last byte offset only.
+
+LOG_INTERVAL = 1.0  # seconds between breathlog rows (1 Hz CSV logging)
+
+
+class BreathingLogIndex:
+    def __init__(self, log_folder, index_path=None):
+        self.log_folder = log_folder
+        self.index_path = index_path if index_path is not None else os.path.join(log_folder, '.breathlog_index.npz')
+        self.files = {}  # file name -> {'id', 'offset', 'size', 'mtime_ns'}
+        self.times = np.zeros(0)
+        self.rates = np.zeros(0)
+        self.presence = np.zeros(0)  # 1 / 0, NaN for rows from logs without a presence column
+        self.file_ids = np.zeros(0, dtype=int)
+        self._prefix = None
+        if self.index_path:
+            self.load()
+
+    # ~~~ index maintenance ~~~
+    def load(self):
+        try:
+            with np.load(self.index_path) as data:
+                self.files = json.loads(str(data['files']))
+                self.times, self.rates, self.presence, self.file_ids = \
+                    data['times'], data['rates'], data['presence'], data['file_ids']
+        except (OSError, KeyError, ValueError):
+            self.files = {}
+
+    def save(self):
+        if not self.index_path:
+            return
+        tmp_path = f"{self.index_path}.tmp.npz"
+        np.savez(tmp_path, files=json.dumps(self.files), times=self.times, rates=self.rates, presence=self.presence,
+                 file_ids=self.file_ids)
+        os.replace(tmp_path, self.index_path)
+
+    def update(self):
+        # Add new logs and the new rows of growing logs; re-read logs that were rewritten.
+        # Returns the number of rows added.
+        added_times, added_rates, added_presence, added_ids = [], [], [], []
+        next_id = max([entry['id'] for entry in self.files.values()], default=-1) + 1
+        for name in sorted(os.listdir(self.log_folder)):
+            if not (name.startswith('breathlog_') and name.endswith('.csv')):
+                continue
+            stat = os.stat(os.path.join(self.log_folder, name))
+            entry = self.files.get(name)
+            if entry is not None and stat.st_size == entry['size'] and stat.st_mtime_ns == entry['mtime_ns']:
+                continue
+            if entry is None or stat.st_size < entry['offset']:
+                if entry is not None:
+                    self._drop_file(entry['id'])
+                entry = {'id': next_id, 'offset': 0}
+                next_id += 1
+            times, rates, presence, entry['offset'] = read_breathlog(os.path.join(self.log_folder, name), entry['offset'])
+            entry.update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+            self.files[name] = entry
+            added_times.append(times)
+            added_rates.append(rates)
+            added_presence.append(presence)
+            added_ids.append(np.full(len(times), entry['id']))
+        added = sum(len(times) for times in added_times)
+        if added:
+            times = np.concatenate([self.times] + added_times)
+            rates = np.concatenate([self.rates] + added_rates)
+            presence = np.concatenate([self.presence] + added_presence)
+            file_ids = np.concatenate([self.file_ids] + added_ids)
+            if np.any(np.diff(times) < 0):  # new rows usually come after the existing ones
+                order = np.argsort(times, kind='stable')
+                times, rates, presence, file_ids = times[order], rates[order], presence[order], file_ids[order]
+            self.times, self.rates, self.presence, self.file_ids = times, rates, presence, file_ids
+            self._prefix = None
+        if added or not os.path.exists(self.index_path or ''):
+            self.save()
+        return added
+
+    def _drop_file(self, file_id):
+        keep = self.file_ids != file_id
+        self.times, self.rates, self.presence, self.file_ids = \
+            self.times[keep], self.rates[keep], self.presence[keep], self.file_ids[keep]
+        self._prefix = None
+
+    def prefix_sums(self):
+        # Prefix sums of the rate and its square over rows not logged as absent, of those rows, of the
+        # rows logged as present and of the rows with a presence value
+        if self._prefix is None:
+            used = (self.presence != 0).astype(float)  # NaN != 0: rows without presence are kept
+            self._prefix = tuple(np.concatenate(([0.0], np.cumsum(values))) for values in
+                                 (self.rates * used, self.rates ** 2 * used, used, self.presence == 1,
+                                  np.isfinite(self.presence)))
+        return self._prefix
+
+    # ~~~ joins ~~~
+    def asof(self, times, tolerance=None):
+        # Last breathing sample at or before each time. Returns (rate, age_seconds); NaN when there is
+        # no sample, or it is older than tolerance seconds.
+        times = np.asarray(times, dtype=float)
+        index = np.searchsorted(self.times, times, side='right') - 1
+        found = index >= 0
+        safe_index = np.maximum(index, 0)
+        age = np.where(found, times - self.times[safe_index] if len(self.times) else np.inf, np.inf)
+        if tolerance is not None:
+            found &= age <= tolerance
+        return np.where(found, self.rates[safe_index] if len(self.rates) else np.nan, np.nan), \
+            np.where(found, age, np.nan)
+
+    def window_features(self, starts, ends):
+        # Mean rate, BRV (population SD of the rate) and sample count over the rows not logged as absent,
+        # and presence fraction (seconds logged as present / window seconds) for each [start, end) window.
+        # The presence fraction is NaN when the window has rows from logs without a presence column.
+        starts, ends = np.asarray(starts, dtype=float), np.asarray(ends, dtype=float)
+        first = np.searchsorted(self.times, starts, side='left')
+        last = np.searchsorted(self.times, ends, side='left')
+        sums, squares, used, present, known = self.prefix_sums()
+        counts = (used[last] - used[first]).astype(int)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = (sums[last] - sums[first]) / counts
+            variance = np.maximum((squares[last] - squares[first]) / counts - mean ** 2, 0.0)
+            presence = np.clip((present[last] - present[first]) * LOG_INTERVAL / (ends - starts), 0.0, 1.0)
+        presence = np.where(known[last] - known[first] == last - first, presence, np.nan)
+        return {
+            'samples': counts,
+            'mean_rate': np.where(counts > 0, mean, np.nan),
+            'brv': np.where(counts > 1, np.sqrt(variance), np.nan),
+            'presence_fraction': np.where(ends > starts, presence, np.nan),
+        }
+
+    def session_features(self, starts, ends, before_seconds=300, asof_tolerance=60):
+        # Per-session features: during the run, in the before_seconds leading up to it, and the
+        # as-of breathing rate at the start
+        starts, ends = np.asarray(starts, dtype=float), np.asarray(ends, dtype=float)
+        features = {f'during_{key}': value for key, value in self.window_features(starts, ends).items()}
+        features.update({f'before_{key}': value
+                         for key, value in self.window_features(starts - before_seconds, starts).items()})
+        features['start_rate'], features['start_rate_age'] = self.asof(starts, asof_tolerance)
+        return features
+
+
+def read_breathlog(file_path, offset=0):
+    # Complete rows from byte offset on. Returns (times, rates, presence, new_offset); presence is NaN
+    # for rows without a presence column. A partly written last line is left for the next call.
+    with open(file_path, 'rb') as file:
+        file.seek(offset)
+        data = file.read()
+    end = data.rfind(b'\n') + 1
+    text = data[:end].decode('utf-8', errors='replace')
+    times, rates, presence = [], [], []
+    for row in csv.reader(io.StringIO(text)):
+        if len(row) < 3 or row[0] == 'timestamp':
+            continue
+        try:
+            row_time, row_rate = float(row[0]), float(row[2])
+            row_presence = float(row[4]) if len(row) > 4 and row[4] != '' else np.nan
+        except ValueError:
+            continue
+        times.append(row_time)
+        rates.append(row_rate)
+        presence.append(row_presence)
+    return np.array(times), np.array(rates), np.array(presence), offset + end
+
+
+def parse_session_start(summary):
+    # Session start (epoch seconds, local time) from a tova.js / Inquisit summary row
+    date = summary.get('startDate') or summary.get('script.startdate', '')
+    clock = summary.get('startTime') or summary.get('script.starttime', '')
+    for date_format in ('%Y-%m-%d', '%m/%d/%Y', '%Y/%m/%d'):
+        try:
+            return datetime.strptime(f"{date} {clock}", f"{date_format} %H:%M:%S").timestamp()
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised session start: {date!r} {clock!r}")
+
+
+def read_sessions(file_paths, default_duration=900):
+    # (starts, ends) in epoch seconds for TOVA summary files; the end is start + elapsedTime (ms)
+    # when present, otherwise start + default_duration seconds. Unreadable files give NaN.
+    starts, ends = [], []
+    for file_path in file_paths:
+        try:
+            summary = read_summary(file_path)
+            start = parse_session_start(summary)
+            elapsed = float(summary.get('elapsedTime') or 0) / 1000
+            starts.append(start)
+            ends.append(start + (elapsed if elapsed > 0 else default_duration))
+        except (OSError, ValueError):
+            starts.append(np.nan)
+            ends.append(np.nan)
+    return np.array(starts), np.array(ends)
+
+
+def join_sessions(session_files, log_folder, before_seconds=300, asof_tolerance=60, as_dataframe=False):
+    # Breathing features for every TOVA summary file, from the (incrementally updated) log index
+    index = BreathingLogIndex(log_folder)
+    index.update()
+    starts, ends = read_sessions(session_files)
+    valid = ~np.isnan(starts)
+    features = {key: np.full(len(starts), np.nan) for key in
+                index.session_features(np.zeros(0), np.zeros(0), before_seconds, asof_tolerance)}
+    for key, value in index.session_features(starts[valid], ends[valid], before_seconds, asof_tolerance).items():
+        features[key][valid] = value
+    features.update(file=np.array([os.path.basename(path) for path in session_files]), start=starts, end=ends)
+    if as_dataframe:
+        import pandas as pd
+        return pd.DataFrame(features).set_index('file')
+    return features
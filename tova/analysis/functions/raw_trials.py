@@ -0,0 +1,154 @@
+import csv
+import os
+
+import numpy as np
+
+# Re-score TOVA sessions from the tova_raw_*.csv trial exports (tova.js downloadRawData()).
+# Recomputes the summary columns of downloadSummaryData() with grouped NumPy operations over all
+# trials of many files at once, so validity rules (minValidLatency) can be changed for a whole cohort.
+#
+# Rules follow tova.js endTrial() / calculateSummaryData():
+#   - anticipatory: responded and latency < minValidLatency; excluded from all rates and RTs
+#   - hit RT: latency of correct target trials; SD is the population SD
+#   - commissionRate = 1 - mean(nontarget correct); empty groups give mean 0 as in tova.js mean()
+#   - z / d': rates of 0 (or empty) -> 0.005, 1 -> 0.995, inverse normal CDF (Acklam)
+# The raw file stores rounded latencies, so RT means can differ from the browser summary by < 0.5 ms.
+# meanPostCommissionRT uses the postCommissionHit flag as recorded in the file.
+
+TEST_BLOCKS = ['lowFrequency1', 'lowFrequency2', 'hiFrequency1', 'hiFrequency2']
+BLOCK_GROUPS = {
+    '': [0, 1, 2, 3],
+    '_LF': [0, 1],
+    '_HF': [2, 3],
+    '_LF1': [0],
+    '_LF2': [1],
+    '_HF1': [2],
+    '_HF2': [3],
+}
+RAW_COLUMNS = ['blockcode', 'trialcode', 'response', 'correct', 'latency', 'postCommissionHit']
+
+
+def read_raw_trials(file_paths):
+    # Stream the trial rows of every file into flat arrays; `session` is the index into file_paths.
+    # tova.js writes 0 as an empty field, so empty numbers read as 0.
+    columns = {name: [] for name in RAW_COLUMNS}
+    session = []
+    for index, file_path in enumerate(file_paths):
+        with open(file_path, 'r', encoding='utf-8', newline='') as file:
+            for row in csv.DictReader(file):
+                for name in RAW_COLUMNS:
+                    columns[name].append(row.get(name) or '')
+                session.append(index)
+    trials = {'session': np.array(session, dtype=int)}
+    block_index = {block: i for i, block in enumerate(TEST_BLOCKS)}
+    blockcode = columns['blockcode']
+    trials['block'] = np.array([block_index.get(block, -1) for block in blockcode], dtype=int)
+    trials['practice'] = np.array([block == 'practice' for block in blockcode], dtype=bool)
+    trials['target'] = np.array([code == 'target' for code in columns['trialcode']], dtype=bool)
+    for name in ['response', 'correct', 'latency', 'postCommissionHit']:
+        trials[name] = np.array([float(value or 0) for value in columns[name]])
+    trials['num_sessions'] = len(file_paths)
+    return trials
+
+
+def normal_inverse(p):
+    # Vectorized inverse normal CDF, Peter John Acklam's approximation as in tova.js normalInverse()
+    a = [-3.969683028665376e+01, 2.209460984245205e+02, -2.759285104469687e+02,
+         1.383577518672690e+02, -3.066479806614716e+01, 2.506628277459239e+00]
+    b = [-5.447609879822406e+01, 1.615858368580409e+02, -1.556989798598866e+02,
+         6.680131188771972e+01, -1.328068155288572e+01]
+    c = [-7.784894002430293e-03, -3.223964580411365e-01, -2.400758277161838e+00,
+         -2.549732539343734e+00, 4.374664141464968e+00, 2.938163982698783e+00]
+    d = [7.784695709041462e-03, 3.224671290700398e-01, 2.445134137142996e+00,
+         3.754408661907416e+00]
+    p = np.asarray(p, dtype=float)
+    valid = (p > 0) & (p < 1)
+    p = np.where(valid, p, 0.5)
+    p_low = 0.02425
+    q_tail = np.sqrt(-2 * np.log(np.minimum(p, 1 - p)))
+    tail = (((((c[0] * q_tail + c[1]) * q_tail + c[2]) * q_tail + c[3]) * q_tail + c[4]) * q_tail + c[5]) / \
+        ((((d[0] * q_tail + d[1]) * q_tail + d[2]) * q_tail + d[3]) * q_tail + 1)
+    q = p - 0.5
+    r = q * q
+    central = (((((a[0] * r + a[1]) * r + a[2]) * r + a[3]) * r + a[4]) * r + a[5]) * q / \
+        (((((b[0] * r + b[1]) * r + b[2]) * r + b[3]) * r + b[4]) * r + 1)
+    result = np.where(p < p_low, tail, np.where(p <= 1 - p_low, central, -tail))
+    return np.where(valid, result, 0.0)
+
+
+def adjust_rate(rate):
+    # Gregg & Sedikides (2010) adjustment, as tova.js adjustRate()
+    rate = np.where(np.isnan(rate) | (rate == 0), 0.005, rate)
+    return np.where(rate == 1, 0.995, rate)
+
+
+def grouped_mean(values, session, mask, num_sessions):
+    counts = np.bincount(session[mask], minlength=num_sessions)
+    sums = np.bincount(session[mask], weights=values[mask], minlength=num_sessions)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, sums / counts, 0.0), counts
+
+
+def grouped_sd(values, session, mask, num_sessions):
+    mean, counts = grouped_mean(values, session, mask, num_sessions)
+    deviations = values[mask] - mean[session[mask]]
+    squares = np.bincount(session[mask], weights=deviations ** 2, minlength=num_sessions)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(counts > 0, np.sqrt(squares / counts), 0.0)
+
+
+def score_trials(trials, min_valid_latency=200):
+    # Summary columns (one array entry per session) from read_raw_trials() output
+    session, num_sessions = trials['session'], trials['num_sessions']
+    responded = trials['response'] > 0
+    anticipatory = responded & (trials['latency'] < min_valid_latency)
+    valid = ~anticipatory
+    correct = trials['correct']
+    target = trials['target']
+    test = trials['block'] >= 0
+    summary = {'minValidLatency': np.full(num_sessions, float(min_valid_latency))}
+
+    summary['sum_anticipatoryResponses'] = np.bincount(session[anticipatory & test],
+                                                       minlength=num_sessions).astype(float)
+    test_trials = np.bincount(session[test], minlength=num_sessions)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        summary['percentAnticipatoryResponses'] = summary['sum_anticipatoryResponses'] / test_trials * 100
+    summary['propcorrect_practice'] = grouped_mean(correct, session, trials['practice'] & valid, num_sessions)[0]
+    summary['overallproportioncorrect'] = grouped_mean(correct, session, test & valid, num_sessions)[0]
+    summary['meanPostCommissionRT'] = grouped_mean(trials['latency'], session, trials['postCommissionHit'] > 0,
+                                                   num_sessions)[0]
+
+    for suffix, blocks in BLOCK_GROUPS.items():
+        in_group = np.isin(trials['block'], blocks) & valid
+        hits = in_group & target & (correct > 0)
+        summary[f'meanHitRT{suffix}'] = grouped_mean(trials['latency'], session, hits, num_sessions)[0]
+        summary[f'SDHitRT{suffix}'] = grouped_sd(trials['latency'], session, hits, num_sessions)
+        hit_rate = grouped_mean(correct, session, in_group & target, num_sessions)[0]
+        commission_rate = 1 - grouped_mean(correct, session, in_group & ~target, num_sessions)[0]
+        summary[f'hitRate{suffix}'] = hit_rate
+        summary[f'omissionsRate{suffix}'] = 1 - hit_rate
+        summary[f'commissionRate{suffix}'] = commission_rate
+        summary[f'z_hr{suffix}'] = normal_inverse(adjust_rate(hit_rate))
+        summary[f'z_FAr{suffix}'] = normal_inverse(adjust_rate(commission_rate))
+        summary[f'dprime{suffix}'] = summary[f'z_hr{suffix}'] - summary[f'z_FAr{suffix}']
+    return summary
+
+
+def rescore_raw_files(file_paths, min_valid_latency=200, as_dataframe=False):
+    # Re-score many tova_raw_*.csv files in one pass. Returns {column: array} (plus 'file'),
+    # or a DataFrame indexed by file name with as_dataframe=True.
+    file_paths = [str(path) for path in file_paths]
+    summary = score_trials(read_raw_trials(file_paths), min_valid_latency)
+    summary['file'] = np.array([os.path.basename(path) for path in file_paths])
+    if as_dataframe:
+        import pandas as pd
+        return pd.DataFrame(summary).set_index('file')
+    return summary
+
+
+def find_raw_files(folder_path):
+    raw_files = []
+    for root, _, names in os.walk(folder_path):
+        raw_files += [os.path.join(root, name) for name in sorted(names)
+                      if name.startswith('tova_raw_') and name.endswith('.csv')]
+    return raw_files
@@ -1,26 +1,23 @@
 import functions.AttentionComparisonScore as acs
-import os
-from pathlib import Path
+from functions.batch_scoring import score_folder
 
-def process_folder(folder_path, min_size_kb=1.5, max_size_kb=3.0, debug=True):
+def process_folder(folder_path, min_size_kb=1.5, max_size_kb=3.0, debug=True, manifest_path=None, workers=None,
+                   use_cache=True):
+    # Files are scored in a process pool and cached by path / mtime / size (see functions/batch_scoring.py);
+    # missing age / gender come from the participant manifest instead of input() prompts
+    records = score_folder(folder_path, manifest_path, min_size_kb, max_size_kb, workers=workers,
+                           cache_path=None if use_cache else '')
     results = []
-    for root, _, files in os.walk(folder_path):
-        for file in files:
-            if file.endswith('.iqdat') or file.endswith('.csv'):
-                file_path = Path(root) / file
-                file_size_kb = file_path.stat().st_size / 1024  # Convert to KB
-                if min_size_kb <= file_size_kb <= max_size_kb:
-                    try:
-                        acs_sub = acs.load_iqdat_file(str(file_path))
-                        participant = acs.calculate_attention_score(
-                            acs_sub[0], acs_sub[1], acs_sub[2], age=acs_sub[3], sex=acs_sub[4], debug=debug)
-                        results.append({
-                            'file': str(file),
-                            'data': participant
-                        })
-                    except Exception as e:
-                        print(f"Error processing {file_path}: {e}")
-    
+    for record in records:
+        if record['error'] is not None:
+            print(f"Error processing {record['path']}: {record['error']}")
+            continue
+        if debug:
+            print([record['meanHitRT_LF'], record['dprime_HF'], record['SDHitRT'], record['age'], record['sex']])
+        results.append({
+            'file': record['file'],
+            'data': record['data']
+        })
     return results
 
 if __name__ == "__main__":
@@ -36,7 +33,8 @@ if __name__ == "__main__":
 
     # automate a folder calculation
     folder_path = "/Users/zhengyang/Documents/ADHD/Experiment-1/Result/other/02-letian"
-    results = process_folder(folder_path, debug=debug)
+    manifest_path = None  # csv with participant, age, gender for files without demographics
+    results = process_folder(folder_path, debug=debug, manifest_path=manifest_path)
     for result in results:
         print(f"\nFile: {result['file']}")
         print(result['data'])